@@ -0,0 +1,130 @@
+# benchmarks/bench_backup.py
+"""
+在线备份基准测试: 备份耗时与吞吐量 (MiB/秒)，以及备份期间对编辑保存的影响
+生成指定大小的数据库 (主要为图片数据)，分别测量:
+- 文件直接复制 (参考值，应用运行时不安全)
+- 备份 API 不暂停 / 默认每步暂停
+- 默认参数备份期间另一连接持续保存笔记: 备份耗时与保存延迟
+- 校验备份 (SHA-256 + quick_check)
+
+用法 (在项目根目录执行):
+    python -m benchmarks.bench_backup --size-mb 2048 [--keep 数据库路径]
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from db.backup import BACKUP_PAGES, BACKUP_SLEEP, create_backup, verify_backup
+from db.database import Database
+from models.category_model import CategoryModel
+from models.note_model import NoteModel
+
+IMAGE_SIZE = 256 * 1024
+
+
+def generate_database(path, size_mb, notes=2000):
+    """建立应用的表结构并填充笔记与随机图片数据，直到文件达到 size_mb"""
+    db = Database(path)
+    category_id = CategoryModel(db).add("基准测试")
+    note_model = NoteModel(db)
+    note_ids = []
+    for i in range(notes):
+        note_id = note_model.add(category_id, f"笔记 {i}")
+        note_model.update_content(note_id, f"<p>{'正文内容 ' * 200}{i}</p>")
+        note_ids.append(note_id)
+    count = max(0, size_mb * 2 ** 20 // IMAGE_SIZE)
+    for start in range(0, count, 64):
+        rows = []
+        for i in range(start, min(start + 64, count)):
+            data = os.urandom(IMAGE_SIZE)
+            rows.append((hashlib.sha256(data).hexdigest(), "image/png", 512, 512, len(data), data))
+        db.conn.executemany(
+            "INSERT INTO images (hash, mime, width, height, size, data) VALUES (?, ?, ?, ?, ?, ?)", rows
+        )
+        db.commit()
+    db.checkpoint("TRUNCATE")
+    db.close()
+    return note_ids
+
+
+def _measure(label, size, fn):
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    print(f"{label:<28}{seconds:>9.2f} 秒{size / 2 ** 20 / seconds:>10.1f} MiB/秒")
+    return result
+
+
+def _writer(path, note_ids, stop, latencies):
+    """模拟自动保存: 每 50 毫秒保存一篇笔记，记录每次保存的耗时"""
+    db = Database(path)
+    note_model = NoteModel(db)
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        note_model.update_content(note_ids[i % len(note_ids)], f"<p>备份期间的修改 {i}</p>")
+        latencies.append(time.perf_counter() - start)
+        i += 1
+        time.sleep(0.05)
+    db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="在线备份基准测试")
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--pages", type=int, default=BACKUP_PAGES)
+    parser.add_argument("--sleep", type=float, default=BACKUP_SLEEP)
+    parser.add_argument("--keep", default=None, help="复用 (不存在时生成并保留) 该路径的数据库")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench_backup_")
+    path = args.keep or os.path.join(workdir, "bench.db")
+    try:
+        if not os.path.exists(path):
+            start = time.perf_counter()
+            generate_database(path, args.size_mb)
+            print(f"生成数据库 {time.perf_counter() - start:.1f} 秒")
+        db = Database(path)
+        note_ids = [row['id'] for row in db.query("SELECT id FROM notes")]
+        db.close()
+        size = os.path.getsize(path)
+        backup_dir = os.path.join(workdir, "backups")
+        print(f"数据库大小 {size / 2 ** 20:.0f} MiB，每步 {args.pages} 页，步间暂停 {args.sleep * 1000:.0f} 毫秒")
+
+        _measure("文件复制 (参考)", size, lambda: shutil.copyfile(path, os.path.join(workdir, "copy.db")))
+        os.remove(os.path.join(workdir, "copy.db"))
+        backup = _measure("备份 API，不暂停", size,
+                          lambda: create_backup(path, backup_dir, args.pages, 0, label="-a"))
+        os.remove(backup['path'])
+        backup = _measure("备份 API，步间暂停", size,
+                          lambda: create_backup(path, backup_dir, args.pages, args.sleep, label="-b"))
+
+        stop, latencies = threading.Event(), []
+        writer = threading.Thread(target=_writer, args=(path, note_ids, stop, latencies))
+        writer.start()
+        time.sleep(0.5)
+        latencies.clear()
+        try:
+            concurrent = _measure("备份 API，同时保存笔记", size,
+                                  lambda: create_backup(path, backup_dir, args.pages, args.sleep, label="-c"))
+        finally:
+            stop.set()
+            writer.join()
+        latencies.sort()
+        print(f"  备份期间保存 {len(latencies)} 次，耗时中位数 {statistics.median(latencies) * 1000:.1f} 毫秒，"
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} 毫秒，最大 {latencies[-1] * 1000:.1f} 毫秒")
+        os.remove(concurrent['path'])
+
+        ok, message = _measure("校验备份", size, lambda: verify_backup(backup['path']))
+        print(f"  {message}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
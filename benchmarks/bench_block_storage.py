@@ -0,0 +1,102 @@
+# benchmarks/bench_block_storage.py
+"""
+长笔记分块存储基准测试: 修改一处内容后通过 NoteModel.update_content 保存，
+对比整体存放与分块存放的保存耗时和 WAL 增长；分块存放的全文索引在停止编辑后补写，单独统计
+
+用法 (在项目根目录执行):
+    python -m benchmarks.bench_block_storage --size-mb 5 --edits 20
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import models.note_model as note_model_module
+from benchmarks.bench_content_codec import generate_note
+from db.database import Database
+from models.category_model import CategoryModel
+from models.note_model import NoteModel
+from utils.content_blocks import BLOCK_THRESHOLD
+
+
+def generate_large_note(rng, size):
+    parts = []
+    total = 0
+    while total < size:
+        # 去掉文档头尾，拼接多段正文
+        body = generate_note(rng, 200).split("<body", 1)[1].split(">\n", 1)[1].rsplit("</body>", 1)[0]
+        parts.append(body)
+        total += len(body)
+    return "".join(parts)
+
+
+def edit(rng, content):
+    """在随机位置的段落中插入一段文字"""
+    position = content.index("</p>", rng.randint(0, len(content) - 64))
+    return content[:position] + f"编辑{rng.randint(0, 9999)}" + content[position:]
+
+
+def wal_size(path):
+    wal = path + "-wal"
+    return os.path.getsize(wal) if os.path.exists(wal) else 0
+
+
+def run(path, content, edits, seed, threshold):
+    """
+    通过 NoteModel.update_content 保存 (含历史版本、图片引用与全文索引)
+    threshold 为分块阈值，设为无穷大时即分块前的整体存放 (全文索引随保存重建)
+    返回 (平均保存耗时 ms, 平均每次保存的 WAL 增长字节数, (补写索引耗时 ms, WAL 增长字节数))
+    """
+    saved_threshold = note_model_module.BLOCK_THRESHOLD
+    note_model_module.BLOCK_THRESHOLD = threshold
+    db = Database(path)
+    try:
+        note_model = NoteModel(db)
+        note_id = note_model.add(CategoryModel(db).add("基准"), "长笔记")
+        note_model.update_content(note_id, content)
+        note_model.index_pending()
+        rng = random.Random(seed)
+        elapsed = wal_growth = 0
+        for _ in range(edits):
+            content = edit(rng, content)
+            db.checkpoint('TRUNCATE')
+            start = time.perf_counter()
+            note_model.update_content(note_id, content)
+            elapsed += time.perf_counter() - start
+            wal_growth += wal_size(path)
+        # 停止编辑后补写一次延后的全文索引
+        db.checkpoint('TRUNCATE')
+        start = time.perf_counter()
+        note_model.index_pending()
+        index = ((time.perf_counter() - start) * 1000, wal_size(path))
+        assert note_model.get_by_id(note_id).content == content
+    finally:
+        db.close()
+        note_model_module.BLOCK_THRESHOLD = saved_threshold
+    return elapsed * 1000 / edits, wal_growth / edits, index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="长笔记分块存储基准测试")
+    parser.add_argument("--size-mb", type=float, default=5)
+    parser.add_argument("--edits", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    content = generate_large_note(random.Random(args.seed), int(args.size_mb * 1024 * 1024))
+    print(f"笔记长度: {len(content.encode('utf-8')) / 1024 / 1024:.1f} MiB, 每次保存修改一处")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, threshold in (("整体存放", float('inf')), ("分块存放", BLOCK_THRESHOLD)):
+            latency, growth, (index_ms, index_wal) = run(
+                os.path.join(tmp_dir, f"{threshold}.db"), content, args.edits, args.seed, threshold
+            )
+            print(f"{name}: 保存 {latency:.1f} ms/次, WAL 增长 {growth / 1024:.0f} KiB/次", end="")
+            if index_wal:
+                print(f"; 停止编辑后补写索引 {index_ms:.0f} ms, WAL {index_wal / 1024:.0f} KiB")
+            else:
+                print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# benchmarks/bench_content_codec.py
+"""
+正文编码基准测试: 原文、普通 zlib 与预置字典 zlib 的存储大小及编解码耗时
+
+用法 (在项目根目录执行):
+    python -m benchmarks.bench_content_codec --notes 2000
+
+测试数据按 Qt toHtml() 的输出格式生成 (段落样式、格式化片段、带行号的代码块)
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import zlib
+
+from db.database import Database
+from models.note_model import NoteModel
+from utils.content_codec import decode_content, encode_content
+
+_HEADER = (
+    '<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.0//EN" "http://www.w3.org/TR/REC-html40/strict.dtd">\n'
+    '<html><head><meta name="qrichtext" content="1" /><style type="text/css">\n'
+    'p, li { white-space: pre-wrap; }\n'
+    '</style></head><body style=" font-family:\'微软雅黑\'; font-size:16pt; font-weight:400; font-style:normal;">\n'
+)
+_P = ('<p style=" margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px;'
+      ' -qt-block-indent:0; text-indent:0px;">')
+_EMPTY_P = ('<p style="-qt-paragraph-type:empty; margin-top:0px; margin-bottom:0px; margin-left:0px;'
+            ' margin-right:0px; -qt-block-indent:0; text-indent:0px;"><br /></p>\n')
+_SPANS = [
+    '<span style=" font-weight:600;">{}</span>',
+    '<span style=" font-style:italic; color:#ff0000;">{}</span>',
+    '<span style=" font-size:12pt; text-decoration: underline;">{}</span>',
+    '<span style=" color:#000000;">{}</span>',
+]
+_WORDS = ("笔记 数据库 索引 查询 缓存 编辑器 图片 同步 the quick brown fox jumps over lazy dog "
+          "select insert update delete commit rollback").split()
+
+
+def _text(rng, words):
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def _code_block(rng, lines):
+    rows = []
+    for i in range(1, lines + 1):
+        rows.append(
+            '<tr>\n<td style=" padding-right:8;">\n'
+            '<pre align="right" style=" margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px;'
+            ' -qt-block-indent:0; text-indent:0px;"><span style=" font-family:\'monospace\'; font-size:13px;'
+            f' color:#316dfb;">{i}</span></pre></td>\n<td bgcolor="#f0f0f0">\n' + _P +
+            '<span style=" font-family:\'monospace\'; font-size:13px; background-color:#f0f0f0;">'
+            f'{_text(rng, 6)}</span></p></td></tr>\n'
+        )
+    return ('<table border="0" style=" margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px;'
+            ' border-collapse:collapse;" cellspacing="2" cellpadding="0">\n' + "".join(rows) + '</table>')
+
+
+def generate_note(rng, paragraphs):
+    """生成一篇与 Qt toHtml() 输出结构相同的笔记"""
+    parts = [_HEADER]
+    for _ in range(paragraphs):
+        roll = rng.random()
+        if roll < 0.1:
+            parts.append(_EMPTY_P)
+        elif roll < 0.15:
+            parts.append(_code_block(rng, rng.randint(3, 15)))
+        else:
+            runs = "".join(rng.choice(_SPANS).format(_text(rng, rng.randint(2, 12))) for _ in range(rng.randint(1, 4)))
+            parts.append(_P + runs + '</p>\n')
+    parts.append('</body></html>')
+    return "".join(parts)
+
+
+def timed(fn, items):
+    start = time.perf_counter()
+    results = [fn(item) for item in items]
+    return time.perf_counter() - start, results
+
+
+def file_size(path, contents, compress):
+    """写入全部正文后的数据库文件大小；compress=False 时按改动前的方式存储原文"""
+    db = Database(path)
+    try:
+        note_model = NoteModel(db)
+        db.execute("INSERT INTO categories (name) VALUES ('基准')", commit=True)
+        for content in contents:
+            note_id = note_model.add(1, "笔记")
+            if compress:
+                note_model.update_content(note_id, content)
+            else:
+                db.execute("INSERT INTO note_contents (note_id, content) VALUES (?, ?)", (note_id, content))
+        db.commit()
+        db.checkpoint('TRUNCATE')
+        db.execute("VACUUM")
+    finally:
+        db.close()
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="正文编码基准测试")
+    parser.add_argument("--notes", type=int, default=2000)
+    parser.add_argument("--min-paragraphs", type=int, default=5)
+    parser.add_argument("--max-paragraphs", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    notes = [generate_note(rng, rng.randint(args.min_paragraphs, args.max_paragraphs)) for _ in range(args.notes)]
+    raw = [note.encode('utf-8') for note in notes]
+    raw_size = sum(len(data) for data in raw)
+
+    plain_time, plain = timed(lambda data: zlib.compress(data, 6), raw)
+    encode_time, encoded = timed(encode_content, notes)
+    decode_time, decoded = timed(lambda item: decode_content(*item), encoded)
+    assert decoded == notes
+    plain_size = sum(len(data) for data in plain)
+    dict_size = sum(len(value) if isinstance(value, bytes) else len(value.encode('utf-8')) for _, value in encoded)
+
+    print(f"笔记数: {args.notes}, 原文合计: {raw_size / 1024:.0f} KiB")
+    print(f"zlib (无字典):     {plain_size / 1024:.0f} KiB  ({raw_size / plain_size:.2f}x)  编码 {plain_time * 1e6 / len(notes):.0f} µs/篇")
+    print(f"zlib (预置字典):   {dict_size / 1024:.0f} KiB  ({raw_size / dict_size:.2f}x)  "
+          f"编码 {encode_time * 1e6 / len(notes):.0f} µs/篇  解码 {decode_time * 1e6 / len(notes):.0f} µs/篇")
+
+    # 短笔记最能体现预置字典的作用：样式样板在单篇内重复次数少，普通 zlib 难以压缩
+    short = [note for note in notes if len(note) < 4096] or notes[:1]
+    short_raw = sum(len(note.encode('utf-8')) for note in short)
+    short_plain = sum(len(zlib.compress(note.encode('utf-8'), 6)) for note in short)
+    short_dict = sum(len(value) if isinstance(value, bytes) else len(value.encode('utf-8'))
+                     for value in (encode_content(note)[1] for note in short))
+    print(f"短笔记 (<4 KiB, {len(short)} 篇): 原文 {short_raw / 1024:.0f} KiB, "
+          f"无字典 {short_plain / 1024:.0f} KiB, 预置字典 {short_dict / 1024:.0f} KiB")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        raw_file = file_size(os.path.join(tmp_dir, "raw.db"), notes, compress=False)
+        compressed_file = file_size(os.path.join(tmp_dir, "compressed.db"), notes, compress=True)
+    print(f"数据库文件: 原文 {raw_file / 1024:.0f} KiB, 压缩 {compressed_file / 1024:.0f} KiB "
+          f"({raw_file / compressed_file:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
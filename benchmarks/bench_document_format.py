@@ -0,0 +1,68 @@
+# benchmarks/bench_document_format.py
+"""
+文档序列化基准测试: Qt toHtml() 原文与规范紧凑 HTML 的大小、解析耗时对比
+
+用法 (在项目根目录执行):
+    python -m benchmarks.bench_document_format --notes 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from benchmarks.bench_content_codec import generate_note
+from utils.content_codec import encode_content
+from utils.document_format import serialize_document
+
+
+def stored_size(content):
+    value = encode_content(content)[1]
+    return len(value) if isinstance(value, bytes) else len(value.encode('utf-8'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文档序列化基准测试")
+    parser.add_argument("--notes", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=300, help="每篇笔记的段落数上限")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from utils.rich_text_edit import RichTextEdit
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    editor = RichTextEdit()
+    rng = random.Random(args.seed)
+    # 生成的 HTML 先经 Qt 解析再输出，得到真实的 toHtml() 原文
+    originals = [
+        editor.create_document(generate_note(rng, rng.randint(10, args.paragraphs))).toHtml()
+        for _ in range(args.notes)
+    ]
+
+    start = time.perf_counter()
+    compacts = [serialize_document(editor.create_document(html)) for html in originals]
+    serialize_time = time.perf_counter() - start
+
+    def load_all(contents):
+        begin = time.perf_counter()
+        documents = [editor.create_document(content) for content in contents]
+        return time.perf_counter() - begin, documents
+
+    original_time, original_docs = load_all(originals)
+    compact_time, compact_docs = load_all(compacts)
+    mismatched = sum(a.toHtml() != b.toHtml() for a, b in zip(original_docs, compact_docs))
+
+    original_size = sum(len(html.encode('utf-8')) for html in originals)
+    compact_size = sum(len(html.encode('utf-8')) for html in compacts)
+    print(f"笔记数: {args.notes}")
+    print(f"toHtml 原文:  {original_size / 1024:.0f} KiB, 压缩存储 {sum(map(stored_size, originals)) / 1024:.0f} KiB, "
+          f"解析 {original_time * 1000 / args.notes:.2f} ms/篇")
+    print(f"紧凑 HTML:    {compact_size / 1024:.0f} KiB, 压缩存储 {sum(map(stored_size, compacts)) / 1024:.0f} KiB, "
+          f"解析 {compact_time * 1000 / args.notes:.2f} ms/篇")
+    print(f"序列化耗时 (含解析): {serialize_time * 1000 / args.notes:.2f} ms/篇, 往返不一致: {mismatched} 篇")
+
+
+if __name__ == "__main__":
+    main()
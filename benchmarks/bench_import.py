@@ -0,0 +1,98 @@
+# benchmarks/bench_import.py
+"""
+批量导入吞吐量基准测试 (篇/秒)
+对比逐篇 NoteModel.add + update (每篇两次提交) 与 db.importer 的进程池转换 + 批量事务
+
+用法 (在项目根目录执行):
+    python -m benchmarks.bench_import --notes 10000 --batch-size 500
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from db.database import Database
+from db.importer import import_tree, read_note, walk_files
+from models.category_model import CategoryModel
+from models.note_model import NoteModel
+
+_WORDS = ("笔记 数据库 索引 查询 缓存 编辑器 图片 同步 the quick brown fox jumps over lazy dog "
+          "select insert update delete commit rollback").split()
+
+
+def _sentence(rng):
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(5, 20)))
+
+
+def generate_tree(root, notes, folders, seed):
+    """生成 Markdown / 纯文本 / HTML 混合的笔记目录"""
+    rng = random.Random(seed)
+    for i in range(notes):
+        folder = os.path.join(root, f"分类{i % folders}", f"子目录{i % 3}")
+        os.makedirs(folder, exist_ok=True)
+        kind = rng.random()
+        if kind < 0.6:
+            lines = [f"# 笔记 {i}", ""]
+            for _ in range(rng.randint(3, 30)):
+                lines += [_sentence(rng) + " **重点** `code`", "", f"- {_sentence(rng)}", ""]
+            name, text = f"note{i}.md", "\n".join(lines)
+        elif kind < 0.8:
+            name, text = f"note{i}.txt", "\n".join(_sentence(rng) for _ in range(rng.randint(3, 60)))
+        else:
+            body = "".join(f"<p>{_sentence(rng)}</p>\n" for _ in range(rng.randint(3, 60)))
+            name, text = f"note{i}.html", f"<html><head><title>网页 {i}</title></head><body>{body}</body></html>"
+        with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def import_one_by_one(db, root, limit):
+    """改动前唯一的建笔记方式：每篇 add + update，各自提交"""
+    category_model = CategoryModel(db)
+    note_model = NoteModel(db)
+    categories = {}
+    count = 0
+    for folder, _, path in walk_files(root):
+        if count >= limit:
+            break
+        if folder not in categories:
+            categories[folder] = category_model.add(folder or "根目录")
+        title, content = read_note(path)
+        note_id = note_model.add(categories[folder], title)
+        note_model.update(note_id, content=content)
+        count += 1
+    return count
+
+
+def timed_run(label, path, fn):
+    db = Database(path, profile='performance')
+    try:
+        start = time.perf_counter()
+        count = fn(db)
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+    print(f"{label}: {count} 篇, {elapsed:.2f} 秒, {count / elapsed:.0f} 篇/秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量导入吞吐量基准测试")
+    parser.add_argument("--notes", type=int, default=10000)
+    parser.add_argument("--folders", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--baseline-notes", type=int, default=1000, help="逐篇导入只测前若干篇")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source = os.path.join(tmp_dir, "notes")
+        generate_tree(source, args.notes, args.folders, args.seed)
+        timed_run("逐篇 add + update", os.path.join(tmp_dir, "baseline.db"),
+                  lambda db: import_one_by_one(db, source, args.baseline_notes))
+        for workers in sorted({1, os.cpu_count() or 1}):
+            timed_run(f"批量导入 ({workers} 进程, 每批 {args.batch_size})", os.path.join(tmp_dir, f"import{workers}.db"),
+                      lambda db: import_tree(db, source, args.batch_size, workers)[0])
+
+
+if __name__ == "__main__":
+    main()
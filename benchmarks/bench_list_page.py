@@ -0,0 +1,83 @@
+# benchmarks/bench_list_page.py
+"""
+超大分类的分页列表基准测试: 键集分页 list_page 与 LIMIT/OFFSET 分页在不同翻页深度下的单页耗时
+
+用法 (在项目根目录执行):
+    python -m benchmarks.bench_list_page --notes 200000 --page-size 200
+
+键集分页每页从索引中上一页的位置继续读取，单页耗时与深度无关；OFFSET 需要先跳过前面的所有行
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from db.database import Database
+from models.note_model import SORT_ORDERS, NoteModel
+
+
+def populate(db, note_count, seed=42):
+    """所有笔记放在同一个分类下"""
+    rng = random.Random(seed)
+    with db.conn:
+        db.conn.execute("INSERT INTO categories (name) VALUES ('大分类')")
+        db.conn.executemany(
+            "INSERT INTO notes (category_id, title, updated_at, created_at) VALUES (1, ?, ?, ?)",
+            (
+                (f"笔记-{rng.randrange(note_count):08d}",
+                 f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 00:00:00",
+                 f"2023-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 00:00:00")
+                for _ in range(note_count)
+            )
+        )
+
+
+def keyset_page(note_model, order, depth, page_size):
+    """翻到第 depth 页，返回最后一页的耗时"""
+    after = None
+    elapsed = 0.0
+    for _ in range(depth + 1):
+        start = time.perf_counter()
+        rows = note_model.list_page(1, order, after=after, limit=page_size)
+        elapsed = time.perf_counter() - start
+        after = (rows[-1].sort_key, rows[-1].id)
+    return elapsed
+
+
+def offset_page(db, order, depth, page_size):
+    column, direction = SORT_ORDERS[order]
+    sql = f"""
+        SELECT id, title, {column} FROM notes WHERE category_id = 1
+        ORDER BY {column} {direction}, id {direction} LIMIT ? OFFSET ?
+    """
+    start = time.perf_counter()
+    list(db.iterate(sql, (page_size, depth * page_size), as_tuple=True))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分页列表基准测试")
+    parser.add_argument("--notes", type=int, default=200000)
+    parser.add_argument("--page-size", type=int, default=200)
+    args = parser.parse_args()
+
+    pages = args.notes // args.page_size
+    depths = sorted({0, pages // 10, pages // 2, pages - 1})
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, "bench.db"))
+        try:
+            populate(db, args.notes)
+            note_model = NoteModel(db)
+            print(f"单个分类 {args.notes} 篇笔记，每页 {args.page_size} 篇")
+            for order in SORT_ORDERS:
+                for depth in depths:
+                    keyset = keyset_page(note_model, order, depth, args.page_size)
+                    offset = offset_page(db, order, depth, args.page_size)
+                    print(f"{order:8s} 第 {depth + 1:5d} 页: 键集 {keyset * 1000:6.2f} ms, OFFSET {offset * 1000:7.2f} ms")
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# benchmarks/bench_record_memory.py
+"""
+笔记头结果表示方式的内存与耗时基准测试
+对比 sqlite3.Row、dict (改动前 get_by_id 的返回形式)、tuple 与 __slots__ 记录 NoteHeader
+分别统计构造全部结果的耗时、结果常驻内存 (tracemalloc) 与按字段名逐行读取的耗时
+
+用法 (在项目根目录执行):
+    python -m benchmarks.bench_record_memory --notes 100000 1000000
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from db.database import Database
+from models.records import NoteHeader
+
+SQL = "SELECT id, category_id, title, updated_at, created_at FROM notes"
+
+
+def populate(db, note_count):
+    with db.conn:
+        db.conn.execute("INSERT INTO categories (name) VALUES ('分类')")
+        db.conn.executemany(
+            "INSERT INTO notes (category_id, title, updated_at, created_at) VALUES (1, ?, ?, ?)",
+            ((f"笔记-{i}", f"2024-01-01 00:{i // 60 % 60:02d}:{i % 60:02d}", "2023-01-01 00:00:00")
+             for i in range(note_count))
+        )
+
+
+def load_rows(db):
+    return db.query(SQL)
+
+
+def load_dicts(db):
+    return [dict(row) for row in db.query(SQL)]
+
+
+def load_tuples(db):
+    return list(db.iterate(SQL, as_tuple=True))
+
+
+def load_records(db):
+    return db.query(SQL, record=NoteHeader)
+
+
+def read_mapping(results):
+    total = 0
+    for row in results:
+        total += row['category_id'] + len(row['title'])
+    return total
+
+
+def read_tuple(results):
+    total = 0
+    for row in results:
+        total += row[1] + len(row[2])
+    return total
+
+
+def read_attribute(results):
+    total = 0
+    for row in results:
+        total += row.category_id + len(row.title)
+    return total
+
+
+VARIANTS = (
+    ("sqlite3.Row", load_rows, read_mapping),
+    ("dict", load_dicts, read_mapping),
+    ("tuple", load_tuples, read_tuple),
+    ("NoteHeader", load_records, read_attribute),
+)
+
+
+def measure(db, load, read):
+    """返回 (构造耗时, 常驻内存字节, 读取耗时)；内存单独统计一次，tracemalloc 会拖慢构造"""
+    gc.collect()
+    tracemalloc.start()
+    results = load(db)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del results
+    gc.collect()
+    start = time.perf_counter()
+    results = load(db)
+    load_time = time.perf_counter() - start
+    start = time.perf_counter()
+    read(results)
+    read_time = time.perf_counter() - start
+    del results
+    return load_time, size, read_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="结果记录类型内存基准测试")
+    parser.add_argument("--notes", type=int, nargs="+", default=[100000, 1000000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for note_count in args.notes:
+            db = Database(os.path.join(tmp_dir, f"bench{note_count}.db"))
+            try:
+                populate(db, note_count)
+                print(f"{note_count} 篇笔记头:")
+                for label, load, read in VARIANTS:
+                    load_time, size, read_time = measure(db, load, read)
+                    print(f"  {label:12s} 构造 {load_time * 1000:8.1f} ms, 内存 {size / 2 ** 20:7.1f} MiB "
+                          f"({size / note_count:5.0f} 字节/行), 读取 {read_time * 1000:6.1f} ms")
+            finally:
+                db.close()
+
+
+if __name__ == "__main__":
+    main()
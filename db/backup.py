@@ -0,0 +1,304 @@
+# db/backup.py
+"""
+在线备份与恢复，基于 sqlite3 备份 API 按页分批复制，应用运行时也可以执行
+
+- 源连接先开启读事务固定 WAL 快照: 备份内容是开始时刻的一致快照，其他连接的写入既不被阻塞，
+  也不会让备份从头重新开始 (不固定快照时每次其他连接提交都会使备份重启，写入频繁时可能永远完成不了)
+- 每复制 pages 页暂停 sleep 秒，限制对磁盘与 CPU 的占用
+- 先写入 .partial 临时文件，完整性检查通过后计算 SHA-256 写入同名 .sha256 文件，再改名为正式备份
+- 备份文件按时间命名 (同一秒内的多个备份加序号)，轮换时按分层保留策略 (与笔记历史版本相同的规则) 删除多余的备份
+- 恢复前校验备份，并先为当前数据库做一次 pre-restore 备份，再通过备份 API 写回 (由 SQLite 处理目标的 WAL)
+  pre-restore 备份不计入定时备份，作为单独的一组按同一保留策略轮换
+
+用法 (在项目根目录执行):
+    python -m db.backup create [数据库路径] [--dir 备份目录] [--pages 1024] [--sleep 0.005]
+    python -m db.backup list [数据库路径] [--dir 备份目录]
+    python -m db.backup verify 备份文件
+    python -m db.backup restore 备份文件 [数据库路径]   (需先关闭应用)
+"""
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import time
+
+from models.revision_model import select_retained
+
+# 每步复制的页数 (默认页大小 4 KiB 时为 4 MiB) 与步间暂停秒数
+BACKUP_PAGES = 1024
+BACKUP_SLEEP = 0.005
+# 定时备份间隔
+BACKUP_INTERVAL = 24 * 3600
+# 保留策略: (最大时长, 间隔)，两天内全部保留，两周内每天一个，半年内每周一个
+BACKUP_RETENTION = [
+    (2 * 24 * 3600, 0),
+    (14 * 24 * 3600, 86400),
+    (180 * 24 * 3600, 7 * 86400),
+]
+
+PRE_RESTORE_LABEL = "-pre-restore"
+# 超过该时长仍未完成的 .partial 文件视为中断遗留，轮换时删除
+STALE_PARTIAL_AGE = 24 * 3600
+
+_TIME_FORMAT = "%Y%m%d-%H%M%S"
+# 备份文件名: 数据库名-时间[-序号][标签].db
+_NAME_SUFFIX = r"-(\d{8}-\d{6})(?:-(\d+))?(-[a-z][a-z-]*)?\.db"
+
+
+class BackupCancelled(Exception):
+    pass
+
+
+def default_backup_dir(db_path):
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), "backups")
+
+
+def _stem(db_path):
+    return os.path.splitext(os.path.basename(db_path))[0]
+
+
+def _reserve_path(backup_dir, db_path, when, label=""):
+    """
+    选择未被占用的备份文件名并以独占方式创建其 .partial 文件，返回 (备份路径, .partial 路径)
+    同一秒内开始的备份 (定时备份与手动备份、多个进程) 依次加序号，不会相互覆盖
+    """
+    base = f"{_stem(db_path)}-{time.strftime(_TIME_FORMAT, time.localtime(when))}"
+    sequence = 1
+    while True:
+        name = f"{base}{label}.db" if sequence == 1 else f"{base}-{sequence}{label}.db"
+        path = os.path.join(backup_dir, name)
+        sequence += 1
+        if os.path.exists(path):
+            continue
+        try:
+            os.close(os.open(path + ".partial", os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            continue
+        return path, path + ".partial"
+
+
+def file_checksum(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _copy(source, target, pages, sleep, progress, should_stop):
+    """按页分批复制，返回复制的总页数；progress(已复制页数, 总页数)"""
+    copied = [0]
+
+    def step(status, remaining, total):
+        copied[0] = total
+        if progress is not None:
+            progress(total - remaining, total)
+        if should_stop is not None and should_stop():
+            raise BackupCancelled()
+        if sleep and remaining:
+            time.sleep(sleep)
+
+    source.backup(target, pages=pages, progress=step)
+    return copied[0]
+
+
+def create_backup(db_path, backup_dir=None, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP,
+                  progress=None, should_stop=None, label=""):
+    """
+    备份数据库，返回 {'path', 'bytes', 'seconds', 'throughput' (字节/秒)}
+    should_stop: 可选回调，返回真时取消备份并删除临时文件 (抛出 BackupCancelled)
+    """
+    backup_dir = backup_dir or default_backup_dir(db_path)
+    os.makedirs(backup_dir, exist_ok=True)
+    start = time.time()
+    path, partial = _reserve_path(backup_dir, db_path, start, label)
+
+    source = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True, isolation_level=None)
+    target = sqlite3.connect(partial, isolation_level=None)
+    try:
+        source.execute("PRAGMA busy_timeout = 5000")
+        # 开启读事务并读取一次，固定 WAL 快照
+        source.execute("BEGIN")
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        page_count = _copy(source, target, pages, sleep, progress, should_stop)
+        page_size = source.execute("PRAGMA page_size").fetchone()[0]
+        source.execute("COMMIT")
+        # 备份文件独立存放，不需要 WAL
+        target.execute("PRAGMA journal_mode = DELETE")
+        result = target.execute("PRAGMA quick_check").fetchone()[0]
+        if result != "ok":
+            raise sqlite3.DatabaseError(f"备份文件完整性检查失败: {result}")
+    except BaseException:
+        target.close()
+        source.close()
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    target.close()
+    source.close()
+
+    checksum = file_checksum(partial)
+    os.replace(partial, path)
+    with open(path + ".sha256", 'w', encoding='utf-8') as f:
+        f.write(f"{checksum}  {os.path.basename(path)}\n")
+    seconds = time.time() - start
+    size = page_count * page_size
+    return {'path': path, 'bytes': size, 'seconds': seconds, 'throughput': size / seconds if seconds else 0.0}
+
+
+def verify_backup(path):
+    """校验备份文件的 SHA-256 与数据库结构，返回 (是否通过, 说明)"""
+    try:
+        with open(path + ".sha256", encoding='utf-8') as f:
+            expected = f.read().split()[0]
+    except (FileNotFoundError, IndexError):
+        return False, "缺少校验文件"
+    if file_checksum(path) != expected:
+        return False, "校验和不一致，备份文件已损坏"
+    conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+    try:
+        result = conn.execute("PRAGMA quick_check").fetchone()[0]
+    except sqlite3.DatabaseError as e:
+        return False, f"无法读取备份文件: {e}"
+    finally:
+        conn.close()
+    if result != "ok":
+        return False, f"完整性检查失败: {result}"
+    return True, "校验通过"
+
+
+def _scan_backups(db_path, backup_dir=None):
+    """按标签分组的备份文件: {标签: [(路径, 创建时间_秒), ...]}，组内按时间 (及序号) 升序；定时备份的标签为空"""
+    backup_dir = backup_dir or default_backup_dir(db_path)
+    pattern = re.compile(re.escape(_stem(db_path)) + _NAME_SUFFIX)
+    try:
+        names = os.listdir(backup_dir)
+    except FileNotFoundError:
+        return {}
+    groups = {}
+    for name in names:
+        match = pattern.fullmatch(name)
+        if match:
+            created = time.mktime(time.strptime(match.group(1), _TIME_FORMAT))
+            groups.setdefault(match.group(3) or "", []).append(
+                (created, int(match.group(2) or 1), os.path.join(backup_dir, name))
+            )
+    return {
+        label: [(path, created) for created, _, path in sorted(entries)]
+        for label, entries in groups.items()
+    }
+
+
+def list_backups(db_path, backup_dir=None, label=""):
+    """指定标签的备份文件 (默认为定时备份)，按时间升序: [(路径, 创建时间_秒), ...]"""
+    return _scan_backups(db_path, backup_dir).get(label, [])
+
+
+def rotate_backups(db_path, backup_dir=None, now=None, retention=BACKUP_RETENTION):
+    """
+    按保留策略删除多余的备份，定时备份与各标签的备份分组轮换 (每组最新一个总是保留)
+    同时删除中断遗留的 .partial 文件；返回删除的备份路径列表
+    """
+    now = time.time() if now is None else now
+    removed = []
+    for backups in _scan_backups(db_path, backup_dir).values():
+        keep = select_retained(backups, now, retention)
+        for path, _ in backups:
+            if path in keep:
+                continue
+            for file_path in (path, path + ".sha256"):
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+            removed.append(path)
+    backup_dir = backup_dir or default_backup_dir(db_path)
+    for name in os.listdir(backup_dir) if os.path.isdir(backup_dir) else ():
+        path = os.path.join(backup_dir, name)
+        if name.startswith(_stem(db_path)) and name.endswith(".partial") \
+                and now - os.path.getmtime(path) > STALE_PARTIAL_AGE:
+            os.remove(path)
+    return removed
+
+
+def latest_backup_time(db_path, backup_dir=None):
+    backups = list_backups(db_path, backup_dir)
+    return backups[-1][1] if backups else None
+
+
+def restore_backup(backup_path, db_path, backup_dir=None, pages=BACKUP_PAGES, progress=None):
+    """
+    用备份替换当前数据库，必须在应用关闭时执行；返回恢复前当前数据库的 pre-restore 备份路径
+    备份校验失败时抛出 ValueError，不修改当前数据库
+    """
+    ok, message = verify_backup(backup_path)
+    if not ok:
+        raise ValueError(message)
+    saved = None
+    if os.path.exists(db_path):
+        saved = create_backup(db_path, backup_dir, pages, sleep=0, label=PRE_RESTORE_LABEL)['path']
+    source = sqlite3.connect(f"file:{os.path.abspath(backup_path)}?mode=ro", uri=True)
+    target = sqlite3.connect(db_path)
+    try:
+        target.execute("PRAGMA busy_timeout = 5000")
+        _copy(source, target, pages, 0, progress, None)
+    finally:
+        target.close()
+        source.close()
+    return saved
+
+
+def _format_result(result):
+    return (f"{result['path']}: {result['bytes'] / 2 ** 20:.1f} MiB，耗时 {result['seconds']:.1f} 秒，"
+            f"{result['throughput'] / 2 ** 20:.1f} MiB/秒")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="在线备份与恢复")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="创建备份并按保留策略轮换")
+    create.add_argument("db_path", nargs="?", default="glacier_notes.db")
+    create.add_argument("--dir", default=None, help="备份目录，默认为数据库所在目录下的 backups")
+    create.add_argument("--pages", type=int, default=BACKUP_PAGES, help="每步复制的页数")
+    create.add_argument("--sleep", type=float, default=BACKUP_SLEEP, help="步与步之间暂停的秒数")
+    create.add_argument("--no-rotate", action="store_true")
+    listing = commands.add_parser("list", help="列出备份")
+    listing.add_argument("db_path", nargs="?", default="glacier_notes.db")
+    listing.add_argument("--dir", default=None)
+    verify = commands.add_parser("verify", help="校验备份文件")
+    verify.add_argument("backup_path")
+    restore = commands.add_parser("restore", help="用备份替换数据库 (需先关闭应用)")
+    restore.add_argument("backup_path")
+    restore.add_argument("db_path", nargs="?", default="glacier_notes.db")
+    restore.add_argument("--dir", default=None)
+    args = parser.parse_args(argv)
+
+    progress = lambda done, total: print(f"\r已复制 {done}/{total} 页", end="", flush=True)
+    if args.command == "create":
+        result = create_backup(args.db_path, args.dir, args.pages, args.sleep, progress=progress)
+        print("\n完成：" + _format_result(result))
+        if not args.no_rotate:
+            for path in rotate_backups(args.db_path, args.dir):
+                print(f"已删除过期备份 {path}")
+    elif args.command == "list":
+        for label, backups in sorted(_scan_backups(args.db_path, args.dir).items()):
+            print(label.lstrip("-") or "定时备份")
+            for path, created in backups:
+                print(f"  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(created))}  "
+                      f"{os.path.getsize(path) / 2 ** 20:8.1f} MiB  {path}")
+    elif args.command == "verify":
+        ok, message = verify_backup(args.backup_path)
+        print(message)
+        return 0 if ok else 1
+    elif args.command == "restore":
+        try:
+            saved = restore_backup(args.backup_path, args.db_path, args.dir, progress=progress)
+        except ValueError as e:
+            print(f"恢复失败: {e}")
+            return 1
+        print(f"\n已恢复 {args.db_path}" + (f"，恢复前的数据库已备份为 {saved}" if saved else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
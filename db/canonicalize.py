@@ -0,0 +1,94 @@
+# db/canonicalize.py
+"""
+把已有笔记正文转换为规范紧凑 HTML (见 utils/document_format.py)
+
+每篇笔记都做往返校验：紧凑形式解析出的文档必须与原正文解析出的文档一致，否则保留原正文
+需要 Qt (解析 HTML)；每批在一个短写事务中完成，中断后重新执行会跳过已转换的笔记
+不修改 updated_at，笔记列表顺序保持不变
+
+用法 (在项目根目录执行):
+    python -m db.canonicalize [数据库路径] [--batch-size 100]
+"""
+import argparse
+import os
+import sys
+
+from db.database import Database
+from utils.content_codec import FORMAT_BLOCKS, decode_content, encode_content
+from utils.document_format import is_compact, serialize_document
+
+
+def canonicalize_contents(db, create_document, batch_size=100, progress=None):
+    """
+    create_document: 与编辑器相同的文档构造函数 (RichTextEdit.create_document)
+    返回 (检查行数, 转换行数, 未通过校验行数)
+    """
+    checked = converted = rejected = 0
+    last_id = 0
+    while True:
+        db.conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = db.conn.execute("""
+                SELECT note_id, content, format FROM note_contents
+                WHERE note_id > ?
+                ORDER BY note_id LIMIT ?
+            """, (last_id, batch_size)).fetchall()
+            for note_id, value, fmt in rows:
+                # 分块存放的正文由编辑器保存时写入，已是紧凑形式
+                if fmt == FORMAT_BLOCKS:
+                    continue
+                content = decode_content(fmt, value)
+                if not content or is_compact(content):
+                    continue
+                original = create_document(content)
+                compact = serialize_document(original)
+                if create_document(compact).toHtml() != original.toHtml():
+                    rejected += 1
+                    continue
+                new_fmt, new_value = encode_content(compact)
+                db.conn.execute(
+                    "UPDATE note_contents SET content = ?, format = ? WHERE note_id = ?",
+                    (new_value, new_fmt, note_id)
+                )
+                # 正文字符数随之变化，触发器据此更新分类聚合统计 (不修改 updated_at)
+                db.conn.execute("UPDATE notes SET content_size = ? WHERE id = ?", (len(compact), note_id))
+                converted += 1
+            db.conn.commit()
+        except BaseException:
+            db.conn.rollback()
+            raise
+        if not rows:
+            break
+        checked += len(rows)
+        last_id = rows[-1][0]
+        if progress is not None:
+            progress(checked, converted)
+    return checked, converted, rejected
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="转换笔记正文为规范紧凑 HTML")
+    parser.add_argument("db_path", nargs="?", default="glacier_notes.db")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from utils.rich_text_edit import RichTextEdit
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    editor = RichTextEdit()
+    db = Database(args.db_path)
+    try:
+        checked, converted, rejected = canonicalize_contents(
+            db, editor.create_document, args.batch_size,
+            progress=lambda done, changed: print(f"\r已检查 {done} 行，转换 {changed} 行", end="", flush=True)
+        )
+    finally:
+        db.close()
+    print(f"\n完成：检查 {checked} 行，转换 {converted} 行，{rejected} 行未通过往返校验保持原样")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
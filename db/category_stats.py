@@ -0,0 +1,43 @@
+# db/category_stats.py
+"""
+检查并重建分类聚合统计 (笔记数、正文总字符数、最近修改时间)
+
+聚合列由 notes 上的触发器增量维护；绕过触发器的外部修改 (如旧版本程序、手工改库) 会导致不一致，
+检查结果不一致时可加 --rebuild 只重建出错的分类
+
+用法 (在项目根目录执行):
+    python -m db.category_stats [数据库路径] [--rebuild] [--all]
+"""
+import argparse
+import sys
+
+from db.database import Database
+from models.category_model import CategoryModel
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="检查并重建分类聚合统计")
+    parser.add_argument("db_path", nargs="?", default="glacier_notes.db")
+    parser.add_argument("--rebuild", action="store_true", help="重建不一致的分类")
+    parser.add_argument("--all", action="store_true", help="与 --rebuild 一起使用时重建全部分类")
+    args = parser.parse_args(argv)
+
+    db = Database(args.db_path)
+    try:
+        category_model = CategoryModel(db)
+        mismatched = category_model.check_stats()
+        for category, (count, size, last_updated) in mismatched:
+            print(f"[{category.id}] {category.name}: 笔记数 {category.note_count} → {count}，"
+                  f"总字符数 {category.total_size} → {size}，最近修改 {category.last_updated} → {last_updated}")
+        if args.rebuild and (mismatched or args.all):
+            category_model.rebuild_stats(None if args.all else [category.id for category, _ in mismatched])
+            print(f"已重建 {'全部' if args.all else len(mismatched)} 个分类的统计")
+        elif not mismatched:
+            print("分类统计一致")
+    finally:
+        db.close()
+    return 1 if mismatched and not args.rebuild else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,48 +1,853 @@
 import sqlite3
 import os
+import queue
+import re
+from contextlib import contextmanager
+from itertools import starmap
+
+from models.image_model import IMAGE_URL_SCHEME, extract_image_keys, image_key, image_url
+from models.revision_model import KIND_SNAPSHOT, apply_delta
+from utils.content_blocks import unpack_manifest
+from utils.content_codec import FORMAT_BLOCKS, decode_content
+from utils.text_index import html_to_text, segment_cjk
+
+
+def _migration_001_base_schema(conn):
+    """基础表结构；对引入版本号之前创建的数据库同样幂等"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS notes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            content TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE CASCADE
+        )
+    """)
+
+
+def _migration_002_note_listing_index(conn):
+    """
+    分类树加载、分类内笔记分页按 updated_at 倒序读取，级联删除按 category_id 查找
+    覆盖索引 (含 title) 避免全表扫描、临时排序以及回表读取大字段 content 所在的页
+    """
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_notes_category_updated
+        ON notes (category_id, updated_at DESC, id DESC, title)
+    """)
+
+
+def _migration_003_notes_fts(conn):
+    """
+    笔记全文索引：标题与正文 HTML 提取出的纯文本，rowid 与 notes.id 一致
+    由 NoteModel 在写入时同步维护；此处为已有笔记回填索引
+    """
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+            title, body, tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    cursor = conn.execute("SELECT id, title, content FROM notes")
+    while True:
+        rows = cursor.fetchmany(500)
+        if not rows:
+            break
+        conn.executemany(
+            "INSERT OR REPLACE INTO notes_fts (rowid, title, body) VALUES (?, ?, ?)",
+            [(row[0], segment_cjk(row[1]), segment_cjk(html_to_text(row[2]))) for row in rows]
+        )
+
+
+# 大批量数据迁移每批处理的行数，批与批之间提交，避免长时间持有写锁
+MIGRATION_BATCH_SIZE = 1000
+
+
+def _migration_004_split_note_contents(conn):
+    """
+    正文移出 notes 表，存入以 note_id 为主键的 note_contents
+    列表、计数、重命名只读写紧凑的标题行，不再触碰大字段所在的页
+    数据按 id 区间分批复制并提交，中断后重新执行会从剩余部分继续
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS note_contents (
+            note_id INTEGER PRIMARY KEY,
+            content TEXT,
+            FOREIGN KEY (note_id) REFERENCES notes(id) ON DELETE CASCADE
+        )
+    """)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(notes)")]
+    if 'content' not in columns:
+        return
+    conn.commit()
+
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id FROM notes WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, MIGRATION_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        batch_end = rows[-1][0]
+        conn.execute("""
+            INSERT OR IGNORE INTO note_contents (note_id, content)
+            SELECT id, content FROM notes
+            WHERE id > ? AND id <= ? AND content IS NOT NULL
+        """, (last_id, batch_end))
+        conn.execute(
+            "UPDATE notes SET content = NULL WHERE id > ? AND id <= ? AND content IS NOT NULL",
+            (last_id, batch_end)
+        )
+        conn.commit()
+        last_id = batch_end
+
+    # 正文已全部清空，删除列的重写代价很小；与版本号更新在同一事务中提交
+    conn.execute("BEGIN")
+    conn.execute("ALTER TABLE notes DROP COLUMN content")
+
+
+def _migration_005_purge_orphan_notes(conn):
+    """
+    此前连接未开启外键约束，删除分类时的级联从未生效，遗留了分类已不存在的笔记
+    开启外键约束前分批清理这些孤立数据
+    """
+    conn.commit()
+    while True:
+        rows = conn.execute("""
+            SELECT id FROM notes
+            WHERE category_id NOT IN (SELECT id FROM categories)
+            LIMIT ?
+        """, (MIGRATION_BATCH_SIZE,)).fetchall()
+        if not rows:
+            break
+        ids = [(row[0],) for row in rows]
+        conn.executemany("DELETE FROM notes_fts WHERE rowid = ?", ids)
+        conn.executemany("DELETE FROM note_contents WHERE note_id = ?", ids)
+        conn.executemany("DELETE FROM notes WHERE id = ?", ids)
+        conn.commit()
+    conn.execute("BEGIN")
+
+
+_IMG_SRC = re.compile(r'(<img\b[^>]*?\bsrc=")([^"]+)(")', re.IGNORECASE)
+_LEGACY_IMAGE_MIME = {
+    '.png': 'image/png', '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg',
+    '.bmp': 'image/bmp', '.gif': 'image/gif',
+}
+
+
+def _import_legacy_image(conn, src):
+    """把旧版本写在临时目录中的图片文件导入图片库，返回新的 src；文件已丢失时原样返回"""
+    path = src[len("file://"):] if src.startswith("file://") else src
+    mime = _LEGACY_IMAGE_MIME.get(os.path.splitext(path)[1].lower())
+    if mime is None or not os.path.isfile(path):
+        return src
+    with open(path, 'rb') as f:
+        data = f.read()
+    key = image_key(data)
+    conn.execute("""
+        INSERT INTO images (hash, mime, size, data) VALUES (?, ?, ?, ?)
+        ON CONFLICT (hash) DO NOTHING
+    """, (key, mime, len(data), data))
+    return image_url(key)
+
+
+def _migration_006_image_store(conn):
+    """
+    图片库：图片按内容哈希存储在数据库中，笔记通过 glacier-image:<hash> 引用
+    旧版本把图片写入临时目录，仍存在的文件导入图片库并改写笔记中的引用
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS images (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hash TEXT NOT NULL UNIQUE,
+            mime TEXT NOT NULL,
+            width INTEGER,
+            height INTEGER,
+            size INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS note_images (
+            note_id INTEGER NOT NULL,
+            image_id INTEGER NOT NULL,
+            PRIMARY KEY (note_id, image_id),
+            FOREIGN KEY (note_id) REFERENCES notes(id) ON DELETE CASCADE,
+            FOREIGN KEY (image_id) REFERENCES images(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    # 引用计数与垃圾回收按图片查询引用
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_note_images_image ON note_images (image_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_images_created ON images (created_at)")
+    conn.commit()
+
+    last_id = 0
+    while True:
+        rows = conn.execute("""
+            SELECT note_id, content FROM note_contents
+            WHERE note_id > ? AND content LIKE '%<img%'
+            ORDER BY note_id LIMIT ?
+        """, (last_id, MIGRATION_BATCH_SIZE)).fetchall()
+        if not rows:
+            break
+        for note_id, content in rows:
+            new_content = _IMG_SRC.sub(
+                lambda m: m.group(1) + _import_legacy_image(conn, m.group(2)) + m.group(3)
+                if not m.group(2).startswith(IMAGE_URL_SCHEME) else m.group(0),
+                content
+            )
+            if new_content != content:
+                conn.execute("UPDATE note_contents SET content = ? WHERE note_id = ?", (new_content, note_id))
+            keys = extract_image_keys(new_content)
+            if keys:
+                conn.execute(f"""
+                    INSERT OR IGNORE INTO note_images (note_id, image_id)
+                    SELECT ?, id FROM images WHERE hash IN ({", ".join("?" for _ in keys)})
+                """, (note_id, *keys))
+        conn.commit()
+        last_id = rows[-1][0]
+    conn.execute("BEGIN")
+
+
+def _migration_007_image_thumbnails(conn):
+    """
+    图片缩略图：完整图片解码完成前先显示缩略图
+    新图片在插入时生成缩略图，旧图片在首次完整解码后补全
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(images)")]
+    if 'thumb' not in columns:
+        conn.execute("ALTER TABLE images ADD COLUMN thumb BLOB")
+
+
+def _migration_008_content_format(conn):
+    """
+    正文编码格式标记 (见 utils/content_codec.py)
+    已有正文保持原文 (format = 0)，由 python -m db.recompress 在后台分批重新压缩
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(note_contents)")]
+    if 'format' not in columns:
+        conn.execute("ALTER TABLE note_contents ADD COLUMN format INTEGER NOT NULL DEFAULT 0")
+
+
+def _migration_009_note_revisions(conn):
+    """
+    笔记历史版本 (见 models/revision_model.py)
+    kind = 0 为完整快照 (data 按 format 编码)，kind = 1 为相对上一版本的差量：
+    保留旧正文的前 prefix 个字符与后 suffix 个字符，中间替换为 data
+    chain 为距最近快照的差量个数
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS note_revisions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            note_id INTEGER NOT NULL,
+            revision INTEGER NOT NULL,
+            kind INTEGER NOT NULL,
+            chain INTEGER NOT NULL,
+            prefix INTEGER NOT NULL,
+            suffix INTEGER NOT NULL,
+            format INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            digest BLOB NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (note_id, revision),
+            FOREIGN KEY (note_id) REFERENCES notes(id) ON DELETE CASCADE
+        )
+    """)
+    # 重建版本时按类型查找最近的快照
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_note_revisions_kind ON note_revisions (note_id, kind, revision)")
+
+
+def _migration_010_content_blocks(conn):
+    """
+    长笔记分块存储 (见 models/content_block_model.py)
+    块按内容哈希存放，note_blocks 记录笔记引用的块；引用删除 (包括笔记级联删除) 后无引用的块由触发器删除
+    已有正文保持整体存放，下次保存时再按长度决定是否分块
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS content_blocks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hash BLOB NOT NULL UNIQUE,
+            format INTEGER NOT NULL,
+            data BLOB NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS note_blocks (
+            note_id INTEGER NOT NULL,
+            block_hash BLOB NOT NULL,
+            PRIMARY KEY (note_id, block_hash),
+            FOREIGN KEY (note_id) REFERENCES notes(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_note_blocks_hash ON note_blocks (block_hash)")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_note_blocks_release AFTER DELETE ON note_blocks
+        BEGIN
+            DELETE FROM content_blocks
+            WHERE hash = OLD.block_hash
+              AND NOT EXISTS (SELECT 1 FROM note_blocks WHERE block_hash = OLD.block_hash);
+        END
+    """)
+
+
+def _migration_011_import_journal(conn):
+    """
+    批量导入记录 (见 db/importer.py)：每个已导入的源文件一行，与导入的笔记在同一事务中写入
+    中断后重新导入同一目录时跳过已记录的文件
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS import_files (
+            source TEXT NOT NULL,
+            path TEXT NOT NULL,
+            note_id INTEGER NOT NULL,
+            imported_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source, path)
+        ) WITHOUT ROWID
+    """)
+
+
+def _migration_012_note_updated_index(conn):
+    """增量导出按 updated_at 顺序读取上次导出之后修改过的笔记"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_notes_updated ON notes (updated_at, id)")
+
+
+def _migration_013_note_sort_orders(conn):
+    """
+    笔记创建时间与分类内的其他排序方式 (见 NoteModel.list_page)
+    ALTER TABLE 新增的列不能以 CURRENT_TIMESTAMP 为默认值，由 NoteModel.add 写入；
+    已有笔记的创建时间未知，以 updated_at 回填
+    每种排序各有一个 (category_id, 排序键, id, title) 覆盖索引，分页查询不回表、不排序
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(notes)")]
+    if 'created_at' not in columns:
+        conn.execute("ALTER TABLE notes ADD COLUMN created_at TIMESTAMP")
+    conn.commit()
+    last_id = 0
+    while True:
+        row = conn.execute(
+            "SELECT MAX(id) FROM (SELECT id FROM notes WHERE id > ? ORDER BY id LIMIT ?)",
+            (last_id, MIGRATION_BATCH_SIZE)
+        ).fetchone()
+        if row[0] is None:
+            break
+        conn.execute(
+            "UPDATE notes SET created_at = updated_at WHERE id > ? AND id <= ? AND created_at IS NULL",
+            (last_id, row[0])
+        )
+        conn.commit()
+        last_id = row[0]
+    conn.execute("BEGIN")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_notes_category_title
+        ON notes (category_id, title, id)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_notes_category_created
+        ON notes (category_id, created_at DESC, id DESC, title)
+    """)
+
+
+def _stored_content_length(conn, fmt, value):
+    """迁移时还原已存正文并返回其字符数；分块存放的正文按块清单逐块累加"""
+    if fmt != FORMAT_BLOCKS:
+        return len(decode_content(fmt, value) or "")
+    total = 0
+    for block in unpack_manifest(value):
+        row = conn.execute("SELECT format, data FROM content_blocks WHERE hash = ?", (block,)).fetchone()
+        if row is not None:
+            total += len(decode_content(row[0], row[1]))
+    return total
+
+
+def _migration_014_category_stats(conn):
+    """
+    分类聚合统计: 笔记数、正文总字符数、最近修改时间，分类树加载时随分类一并读取
+    notes.content_size 为正文字符数，由 NoteModel 写正文时维护；聚合列由 notes 上的触发器增量维护
+    已有数据分批回填，可用 python -m db.category_stats 检查并重建
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(notes)")]
+    if 'content_size' not in columns:
+        conn.execute("ALTER TABLE notes ADD COLUMN content_size INTEGER NOT NULL DEFAULT 0")
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(categories)")]
+    if 'note_count' not in columns:
+        conn.execute("ALTER TABLE categories ADD COLUMN note_count INTEGER NOT NULL DEFAULT 0")
+        conn.execute("ALTER TABLE categories ADD COLUMN total_size INTEGER NOT NULL DEFAULT 0")
+        conn.execute("ALTER TABLE categories ADD COLUMN last_updated TIMESTAMP")
+    conn.commit()
+    last_id = 0
+    while True:
+        rows = conn.execute("""
+            SELECT note_id, content, format FROM note_contents
+            WHERE note_id > ? ORDER BY note_id LIMIT ?
+        """, (last_id, MIGRATION_BATCH_SIZE)).fetchall()
+        if not rows:
+            break
+        conn.executemany(
+            "UPDATE notes SET content_size = ? WHERE id = ?",
+            [(_stored_content_length(conn, fmt, value), note_id) for note_id, value, fmt in rows]
+        )
+        conn.commit()
+        last_id = rows[-1][0]
+    conn.execute("BEGIN")
+    conn.execute("""
+        UPDATE categories SET (note_count, total_size, last_updated) = (
+            SELECT COUNT(*), COALESCE(SUM(content_size), 0), MAX(updated_at)
+            FROM notes WHERE category_id = categories.id
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_notes_stats_insert AFTER INSERT ON notes
+        BEGIN
+            UPDATE categories SET
+                note_count = note_count + 1,
+                total_size = total_size + NEW.content_size,
+                last_updated = CASE WHEN last_updated IS NULL OR NEW.updated_at > last_updated
+                                    THEN NEW.updated_at ELSE last_updated END
+            WHERE id = NEW.category_id;
+        END
+    """)
+    # 删除或移出的笔记可能是分类中最近修改的一篇，最近修改时间沿 idx_notes_category_updated 重新取最大值
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_notes_stats_delete AFTER DELETE ON notes
+        BEGIN
+            UPDATE categories SET
+                note_count = note_count - 1,
+                total_size = total_size - OLD.content_size,
+                last_updated = (SELECT MAX(updated_at) FROM notes WHERE category_id = OLD.category_id)
+            WHERE id = OLD.category_id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_notes_stats_update
+        AFTER UPDATE OF updated_at, content_size ON notes
+        WHEN NEW.category_id = OLD.category_id
+        BEGIN
+            UPDATE categories SET
+                total_size = total_size + NEW.content_size - OLD.content_size,
+                last_updated = CASE WHEN last_updated IS NULL OR NEW.updated_at > last_updated
+                                    THEN NEW.updated_at
+                                    WHEN OLD.updated_at >= last_updated
+                                    THEN (SELECT MAX(updated_at) FROM notes WHERE category_id = NEW.category_id)
+                                    ELSE last_updated END
+            WHERE id = NEW.category_id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_notes_stats_move AFTER UPDATE OF category_id ON notes
+        WHEN NEW.category_id != OLD.category_id
+        BEGIN
+            UPDATE categories SET
+                note_count = note_count - 1,
+                total_size = total_size - OLD.content_size,
+                last_updated = (SELECT MAX(updated_at) FROM notes WHERE category_id = OLD.category_id)
+            WHERE id = OLD.category_id;
+            UPDATE categories SET
+                note_count = note_count + 1,
+                total_size = total_size + NEW.content_size,
+                last_updated = CASE WHEN last_updated IS NULL OR NEW.updated_at > last_updated
+                                    THEN NEW.updated_at ELSE last_updated END
+            WHERE id = NEW.category_id;
+        END
+    """)
+
+
+def _migration_015_trash(conn):
+    """
+    回收站: 删除分类或笔记只记录 deleted_at，由 models/trash_model.py 的清理任务分批物理删除
+    分类内列表的三个覆盖索引末尾加入 deleted_at，过滤已删除笔记不回表
+    聚合统计只计入未删除的笔记，重建统计触发器；最近修改时间按索引倒序取第一篇未删除笔记
+    """
+    for table in ('notes', 'categories'):
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if 'deleted_at' not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN deleted_at TIMESTAMP")
+    conn.execute("DROP INDEX IF EXISTS idx_notes_category_updated")
+    conn.execute("DROP INDEX IF EXISTS idx_notes_category_title")
+    conn.execute("DROP INDEX IF EXISTS idx_notes_category_created")
+    conn.execute("""
+        CREATE INDEX idx_notes_category_updated
+        ON notes (category_id, updated_at DESC, id DESC, title, deleted_at)
+    """)
+    conn.execute("""
+        CREATE INDEX idx_notes_category_title
+        ON notes (category_id, title, id, deleted_at)
+    """)
+    conn.execute("""
+        CREATE INDEX idx_notes_category_created
+        ON notes (category_id, created_at DESC, id DESC, title, deleted_at)
+    """)
+    # 清理任务按删除时间查找过期条目，部分索引只包含回收站中的行
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_notes_trash ON notes (deleted_at) WHERE deleted_at IS NOT NULL")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_categories_trash ON categories (deleted_at) WHERE deleted_at IS NOT NULL
+    """)
+
+    for trigger in ('insert', 'delete', 'update', 'move'):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_notes_stats_{trigger}")
+    latest = """(SELECT updated_at FROM notes WHERE category_id = {0}.category_id AND deleted_at IS NULL
+                 ORDER BY updated_at DESC LIMIT 1)"""
+    add = """
+            UPDATE categories SET
+                note_count = note_count + 1,
+                total_size = total_size + NEW.content_size,
+                last_updated = CASE WHEN last_updated IS NULL OR NEW.updated_at > last_updated
+                                    THEN NEW.updated_at ELSE last_updated END
+            WHERE id = NEW.category_id;"""
+    remove = f"""
+            UPDATE categories SET
+                note_count = note_count - 1,
+                total_size = total_size - OLD.content_size,
+                last_updated = {latest.format('OLD')}
+            WHERE id = OLD.category_id;"""
+    conn.execute(f"""
+        CREATE TRIGGER trg_notes_stats_insert AFTER INSERT ON notes
+        WHEN NEW.deleted_at IS NULL
+        BEGIN{add}
+        END
+    """)
+    # 回收站中的笔记已在移入时扣除，物理删除时不再计算
+    conn.execute(f"""
+        CREATE TRIGGER trg_notes_stats_delete AFTER DELETE ON notes
+        WHEN OLD.deleted_at IS NULL
+        BEGIN{remove}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_notes_stats_update
+        AFTER UPDATE OF updated_at, content_size ON notes
+        WHEN NEW.category_id = OLD.category_id AND NEW.deleted_at IS NULL AND OLD.deleted_at IS NULL
+        BEGIN
+            UPDATE categories SET
+                total_size = total_size + NEW.content_size - OLD.content_size,
+                last_updated = CASE WHEN last_updated IS NULL OR NEW.updated_at > last_updated
+                                    THEN NEW.updated_at
+                                    WHEN OLD.updated_at >= last_updated
+                                    THEN {latest.format('NEW')}
+                                    ELSE last_updated END
+            WHERE id = NEW.category_id;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_notes_stats_move AFTER UPDATE OF category_id ON notes
+        WHEN NEW.category_id != OLD.category_id AND NEW.deleted_at IS NULL AND OLD.deleted_at IS NULL
+        BEGIN{remove}{add}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_notes_stats_trash AFTER UPDATE OF deleted_at ON notes
+        WHEN OLD.deleted_at IS NULL AND NEW.deleted_at IS NOT NULL
+        BEGIN{remove}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_notes_stats_restore AFTER UPDATE OF deleted_at ON notes
+        WHEN OLD.deleted_at IS NOT NULL AND NEW.deleted_at IS NULL
+        BEGIN{add}
+        END
+    """)
+
+
+def _migration_016_revision_images(conn):
+    """
+    历史版本引用的图片: 只在历史版本中出现的图片也不被垃圾回收，恢复旧版本时图片仍然可用
+    逐篇重放已有的历史版本并记录其中引用的图片
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS revision_images (
+            note_id INTEGER NOT NULL,
+            image_id INTEGER NOT NULL,
+            PRIMARY KEY (note_id, image_id),
+            FOREIGN KEY (note_id) REFERENCES notes(id) ON DELETE CASCADE,
+            FOREIGN KEY (image_id) REFERENCES images(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_revision_images_image ON revision_images (image_id)")
+    conn.commit()
+    last_id = 0
+    while True:
+        note_ids = [row[0] for row in conn.execute("""
+            SELECT DISTINCT note_id FROM note_revisions WHERE note_id > ? ORDER BY note_id LIMIT ?
+        """, (last_id, MIGRATION_BATCH_SIZE))]
+        if not note_ids:
+            break
+        for note_id in note_ids:
+            keys = set()
+            content = None
+            for kind, prefix, suffix, fmt, data in conn.execute("""
+                SELECT kind, prefix, suffix, format, data FROM note_revisions
+                WHERE note_id = ? ORDER BY revision
+            """, (note_id,)):
+                if kind == KIND_SNAPSHOT:
+                    content = decode_content(fmt, data)
+                else:
+                    content = apply_delta(content, prefix, suffix, data)
+                keys |= extract_image_keys(content)
+            if keys:
+                placeholders = ", ".join("?" for _ in keys)
+                conn.execute(f"""
+                    INSERT OR IGNORE INTO revision_images (note_id, image_id)
+                    SELECT ?, id FROM images WHERE hash IN ({placeholders})
+                """, (note_id, *keys))
+        conn.commit()
+        last_id = note_ids[-1]
+    conn.execute("BEGIN")
+
+
+def _migration_017_fts_pending(conn):
+    """
+    延后写入全文索引的笔记: 分块存放的长正文保存时不重建索引，只记录笔记 id，
+    由 NoteModel.index_pending 在编辑停止后 (以及检索前) 补写
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS fts_pending (
+            note_id INTEGER PRIMARY KEY,
+            FOREIGN KEY (note_id) REFERENCES notes(id) ON DELETE CASCADE
+        )
+    """)
+
+
+# 按版本号升序排列的迁移步骤: (版本号, 说明, 迁移函数)
+# 只能追加新版本，不能修改已发布的步骤
+MIGRATIONS = [
+    (1, "基础表结构", _migration_001_base_schema),
+    (2, "笔记列表覆盖索引", _migration_002_note_listing_index),
+    (3, "笔记全文索引", _migration_003_notes_fts),
+    (4, "正文拆分到 note_contents", _migration_004_split_note_contents),
+    (5, "清理孤立笔记", _migration_005_purge_orphan_notes),
+    (6, "图片库", _migration_006_image_store),
+    (7, "图片缩略图", _migration_007_image_thumbnails),
+    (8, "正文编码格式", _migration_008_content_format),
+    (9, "笔记历史版本", _migration_009_note_revisions),
+    (10, "长笔记分块存储", _migration_010_content_blocks),
+    (11, "批量导入记录", _migration_011_import_journal),
+    (12, "笔记修改时间索引", _migration_012_note_updated_index),
+    (13, "笔记排序方式", _migration_013_note_sort_orders),
+    (14, "分类聚合统计", _migration_014_category_stats),
+    (15, "回收站", _migration_015_trash),
+    (16, "历史版本图片引用", _migration_016_revision_images),
+    (17, "延后全文索引", _migration_017_fts_pending),
+]
+
+# 连接级性能参数配置
+# journal_mode 只由读写连接设置 (WAL 模式持久保存在数据库文件中)
+# cache_size 为负数时单位为 KiB；wal_autocheckpoint 单位为页
+PROFILES = {
+    # 默认：WAL + NORMAL 同步，读写互不阻塞，断电最多丢失最近一次提交
+    'default': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'foreign_keys': 'ON',
+        'busy_timeout': 5000,
+        'cache_size': -16 * 1024,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 1000,
+        'journal_size_limit': 64 * 1024 * 1024,
+    },
+    # 安全优先：每次提交都同步到磁盘，不使用内存映射
+    'safe': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'foreign_keys': 'ON',
+        'busy_timeout': 10000,
+        'cache_size': -8 * 1024,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'wal_autocheckpoint': 1000,
+        'journal_size_limit': 32 * 1024 * 1024,
+    },
+    # 大库性能优先：更大的页缓存与内存映射，检查点间隔更长
+    'performance': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'foreign_keys': 'ON',
+        'busy_timeout': 5000,
+        'cache_size': -64 * 1024,
+        'mmap_size': 1024 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 4000,
+        'journal_size_limit': 128 * 1024 * 1024,
+    },
+}
 
 
 class Database:
-    def __init__(self, db_path='glacier_notes.db'):
+    def __init__(self, db_path='glacier_notes.db', read_only=False, profile='default'):
+        """
+        read_only: 以只读方式打开已存在的数据库，不执行迁移
+                   用于后台线程的独立读连接；由连接池保证同一时刻只被一个线程使用
+        profile: PROFILES 中的性能参数配置名
+        """
         self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path)
+        self.read_only = read_only
+        self.profile = profile
+        if read_only:
+            self.conn = sqlite3.connect(
+                f"file:{os.path.abspath(db_path)}?mode=ro", uri=True, check_same_thread=False
+            )
+        else:
+            self.conn = sqlite3.connect(self.db_path)
         self.conn.row_factory = sqlite3.Row  # 返回字典式结果
-        self._init_schema()
+        self._apply_pragmas(PROFILES[profile])
+        # 非 None 时记录执行过的 SQL 及首次参数，供执行计划检查使用
+        self.statement_log = None
+        if not read_only:
+            self._init_schema()
+
+    def _apply_pragmas(self, settings):
+        """应用连接级参数；PRAGMA 不支持参数绑定，取值均来自 PROFILES 常量"""
+        # busy_timeout 最先设置，后续切换日志模式时也能等待其他连接
+        self.conn.execute(f"PRAGMA busy_timeout = {int(settings['busy_timeout'])}")
+        if not self.read_only:
+            if not self.conn.execute("SELECT 1 FROM sqlite_master").fetchone():
+                # 新数据库: 只能在建表和切换日志模式前设置
+                # 回收站清理后释放的页由 incremental_vacuum 分批归还，不需要阻塞式 VACUUM
+                self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            self.conn.execute(f"PRAGMA journal_mode = {settings['journal_mode']}")
+            self.conn.execute(f"PRAGMA wal_autocheckpoint = {int(settings['wal_autocheckpoint'])}")
+            self.conn.execute(f"PRAGMA journal_size_limit = {int(settings['journal_size_limit'])}")
+        self.conn.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+        self.conn.execute(f"PRAGMA foreign_keys = {settings['foreign_keys']}")
+        self.conn.execute(f"PRAGMA cache_size = {int(settings['cache_size'])}")
+        self.conn.execute(f"PRAGMA mmap_size = {int(settings['mmap_size'])}")
+        self.conn.execute(f"PRAGMA temp_store = {settings['temp_store']}")
+
+    def open_reader(self):
+        """为其他线程打开同一数据库的只读连接"""
+        return Database(self.db_path, read_only=True, profile=self.profile)
+
+    def reader_pool(self, size=4):
+        """创建只读连接池，WAL 模式下写事务进行中也能并发查询"""
+        return ReaderPool(self.db_path, size=size, profile=self.profile)
+
+    def checkpoint(self, mode='PASSIVE'):
+        """
+        执行 WAL 检查点，返回 (busy, WAL 总页数, 已写回页数)
+        PASSIVE 不等待读写连接，不会阻塞；TRUNCATE 在 busy_timeout 内等待并截断 WAL 文件
+        """
+        if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+            raise ValueError(f"未知的检查点模式: {mode}")
+        return tuple(self.conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone())
 
     def _init_schema(self):
-        """初始化数据库表结构"""
-        with self.conn:
-            self.conn.execute("""
-                CREATE TABLE IF NOT EXISTS categories (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE NOT NULL
-                )
-            """)
-            self.conn.execute("""
-                CREATE TABLE IF NOT EXISTS notes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    category_id INTEGER NOT NULL,
-                    title TEXT NOT NULL,
-                    content TEXT,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE CASCADE
-                )
-            """)
+        """初始化数据库表结构，按 PRAGMA user_version 依次执行未应用的迁移"""
+        self.migrate()
+
+    @property
+    def auto_vacuum(self):
+        """0 = NONE，1 = FULL，2 = INCREMENTAL"""
+        return self.conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+
+    def free_pages(self):
+        return self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    def incremental_vacuum(self, pages):
+        """
+        把最多 pages 个空闲页归还给文件系统，返回实际释放的页数
+        auto_vacuum 不是 INCREMENTAL 时不做任何事
+        """
+        before = self.free_pages()
+        # PRAGMA 不支持参数绑定；每执行一步释放一页，sqlite3 模块对不返回列的语句只执行第一步，
+        # executescript 才会执行到结束 (它会先提交未完成的事务，清理步骤之间没有打开的事务)
+        self.conn.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+        return before - self.free_pages()
+
+    def enable_incremental_vacuum(self):
+        """
+        把旧数据库切换为 auto_vacuum = INCREMENTAL；需要一次完整 VACUUM 重写数据库文件，
+        耗时与数据库大小成正比且期间独占数据库，只应在应用关闭时通过 python -m db.purge --convert 执行
+        """
+        self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.conn.execute("VACUUM")
+
+    @property
+    def schema_version(self):
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def migrate(self, target_version=None):
+        """
+        执行迁移直至 target_version (默认最新)
+        每个迁移步骤与版本号更新在同一事务中提交，失败时回滚并保持原版本
+        大批量数据迁移可在步骤内部分批提交，但必须保证可重复执行
+        """
+        current = self.schema_version
+        for version, description, step in MIGRATIONS:
+            if version <= current or (target_version is not None and version > target_version):
+                continue
+            try:
+                self.conn.execute("BEGIN")
+                step(self.conn)
+                # PRAGMA 不支持参数绑定，version 来自常量列表
+                self.conn.execute(f"PRAGMA user_version = {int(version)}")
+                self.conn.commit()
+            except sqlite3.Error as e:
+                self.conn.rollback()
+                print(f"[migrate] 迁移 {version} ({description}) 失败: {e}")
+                raise
+            current = version
 
     def execute(self, sql, params=(), commit=False):
         """通用执行方法，适用于 INSERT、UPDATE、DELETE"""
+        self._log_statement(sql, params)
         cursor = self.conn.cursor()
         cursor.execute(sql, params)
         if commit:
             self.conn.commit()
         return cursor
 
-    def query(self, sql, params=()):
-        """通用查询方法"""
+    def query(self, sql, params=(), record=None):
+        """
+        通用查询方法
+        record: 记录类型 (见 models.records)，按列顺序以原始 tuple 行构造，不经过 sqlite3.Row
+        """
+        self._log_statement(sql, params)
         cursor = self.conn.cursor()
+        if record is not None:
+            cursor.row_factory = None
+            cursor.execute(sql, params)
+            return list(starmap(record, cursor))
         cursor.execute(sql, params)
         return cursor.fetchall()
 
+    def iterate(self, sql, params=(), as_tuple=False, record=None):
+        """
+        流式查询方法，逐行产出结果，避免一次性 fetchall
+        as_tuple: 返回普通 tuple 而非 sqlite3.Row，适合大量行的热路径
+        record: 同 query，逐行产出记录对象
+        """
+        self._log_statement(sql, params)
+        cursor = self.conn.cursor()
+        if as_tuple or record is not None:
+            cursor.row_factory = None
+        cursor.execute(sql, params)
+        try:
+            if record is not None:
+                yield from starmap(record, cursor)
+            else:
+                yield from cursor
+        finally:
+            cursor.close()
+
+    def commit(self):
+        """提交当前事务，配合 execute(commit=False) 将多条语句合并为一个事务"""
+        self.conn.commit()
+
+    def _log_statement(self, sql, params):
+        if self.statement_log is not None and sql not in self.statement_log:
+            self.statement_log[sql] = params
+
+    def explain(self, sql, params=()):
+        """返回语句的 EXPLAIN QUERY PLAN 明细列表"""
+        return [row['detail'] for row in self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
     def execute_transaction(self, operations):
         """
         执行一个事务操作列表
@@ -63,3 +868,39 @@ class Database:
     def close(self):
         """关闭连接"""
         self.conn.close()
+
+
+class ReaderPool:
+    """
+    只读连接池：连接按需借出，同一时刻只被一个线程使用
+    WAL 模式下读连接读取的是事务开始时的快照，不会被写事务阻塞
+    """
+
+    def __init__(self, db_path, size=4, profile='default'):
+        self._connections = []
+        self._available = queue.Queue()
+        for _ in range(size):
+            db = Database(db_path, read_only=True, profile=profile)
+            self._connections.append(db)
+            self._available.put(db)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """借出一个只读 Database，使用完毕自动归还"""
+        db = self._available.get(timeout=timeout)
+        try:
+            yield db
+        finally:
+            # 归还前结束可能残留的读事务，释放其持有的 WAL 快照
+            if db.conn.in_transaction:
+                db.conn.rollback()
+            self._available.put(db)
+
+    def query(self, sql, params=(), record=None):
+        with self.connection() as db:
+            return db.query(sql, params, record)
+
+    def close(self):
+        for db in self._connections:
+            db.close()
+        self._connections = []
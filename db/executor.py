@@ -0,0 +1,108 @@
+# db/executor.py
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from db.database import Database, ReaderPool
+
+
+class DatabaseExecutor:
+    """
+    数据库执行器：写操作在专用写线程中按提交顺序串行执行，读操作在只读连接池中并发执行
+    提交的函数签名为 fn(db, *args, **kwargs)，db 为该线程独占的 Database 实例
+    返回 concurrent.futures.Future
+
+    写线程空闲时执行 PASSIVE 检查点；WAL 超过上限时改用 TRUNCATE，限制 WAL 文件增长
+    """
+    # 写队列空闲多久后执行检查点 (秒)
+    CHECKPOINT_IDLE_SECONDS = 2.0
+    # WAL 页数超过该值时截断 WAL 文件
+    CHECKPOINT_TRUNCATE_PAGES = 4000
+
+    def __init__(self, db_path, events=None, read_workers=2, profile='default'):
+        self.db_path = db_path
+        self.profile = profile
+        # 线程中创建的模型共享同一个事件中心
+        self.events = events
+        self._readers = ReaderPool(db_path, size=read_workers, profile=profile)
+        self._read_pool = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="db-reader")
+        self._write_queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="db-writer", daemon=True)
+        self._closed = False
+        self._writer.start()
+
+    # ---------- 提交 ----------
+    def submit_read(self, fn, *args, **kwargs):
+        if self._closed:
+            raise RuntimeError("DatabaseExecutor 已关闭")
+        return self._read_pool.submit(self._run_read, fn, args, kwargs)
+
+    def submit_write(self, fn, *args, **kwargs):
+        """写操作进入单一队列，严格按提交顺序执行"""
+        if self._closed:
+            raise RuntimeError("DatabaseExecutor 已关闭")
+        future = Future()
+        self._write_queue.put((future, fn, args, kwargs))
+        return future
+
+    def call_model(self, model_cls, method, *args, write=False, **kwargs):
+        """在后台线程中调用 CategoryModel / NoteModel 等模型的方法"""
+        def job(db):
+            model = model_cls(db, self.events)
+            return getattr(model, method)(*args, **kwargs)
+        return self.submit_write(job) if write else self.submit_read(job)
+
+    def shutdown(self, wait=True):
+        """停止接收新任务；已提交的写操作全部执行完毕后写线程退出"""
+        if self._closed:
+            return
+        self._closed = True
+        self._write_queue.put(None)
+        self._read_pool.shutdown(wait=wait)
+        if wait:
+            self._writer.join()
+            self._readers.close()
+
+    # ---------- 线程执行 ----------
+    def _run_read(self, fn, args, kwargs):
+        # 连接池大小与读线程数相同，借出连接不会等待
+        with self._readers.connection() as db:
+            return fn(db, *args, **kwargs)
+
+    def _write_loop(self):
+        db = Database(self.db_path, profile=self.profile)
+        # 上次检查点之后是否有写入
+        dirty = False
+        try:
+            while True:
+                try:
+                    item = self._write_queue.get(timeout=self.CHECKPOINT_IDLE_SECONDS if dirty else None)
+                except queue.Empty:
+                    self._checkpoint(db)
+                    dirty = False
+                    continue
+                if item is None:
+                    break
+                dirty = True
+                future, fn, args, kwargs = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    result = fn(db, *args, **kwargs)
+                except BaseException as e:
+                    # 失败的写操作不能留下未提交的事务影响后续写入
+                    if db.conn.in_transaction:
+                        db.conn.rollback()
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+        finally:
+            db.close()
+
+    def _checkpoint(self, db):
+        try:
+            busy, wal_pages, _ = db.checkpoint('PASSIVE')
+            if not busy and wal_pages > self.CHECKPOINT_TRUNCATE_PAGES:
+                db.checkpoint('TRUNCATE')
+        except Exception as e:
+            print(f"[checkpoint] WAL 检查点失败: {e}")
@@ -0,0 +1,322 @@
+# db/exporter.py
+"""
+批量导出笔记为 HTML / Markdown 文件，写入目录树或单个 zip 文件
+
+- 笔记元数据由 NoteModel.iter_changed 的游标流式读取，不一次性读入全部笔记
+- 正文的读取、解码与格式转换在进程池中执行，每个子进程持有自己的只读连接
+- 在途任务数有上限，写入端逐篇写出，内存占用与笔记总量无关
+- 分类映射为目录 (分类名中的 / 表示子目录)，笔记引用的图片写入 images/，已存在的图片不重复写入
+- 导出记录保存在清单文件中 (目录导出为 目标目录/.glacier-export.json，zip 导出为 zip 路径 + .json)
+  --incremental 时只导出上次导出开始之后修改过的笔记、清单中没有的笔记 (如从回收站恢复的笔记)
+  与所在分类改名后目录发生变化的笔记，并删除已删除笔记的文件和改名前的旧文件；
+  zip 条目不能原地替换，增量导出生成新归档并从旧归档复制未变化的条目
+
+用法 (在项目根目录执行):
+    python -m db.exporter 目标目录或zip路径 [数据库路径] [--format html|markdown] [--incremental] [--workers 4]
+"""
+import argparse
+import html
+import json
+import mimetypes
+import os
+import re
+import shutil
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from db.database import Database
+from models.image_model import IMAGE_URL_SCHEME, ImageModel, extract_image_keys
+from models.note_model import NoteModel
+from utils.document_format import DEFAULT_STYLESHEET
+from utils.markup import html_to_markdown
+
+IMAGE_DIR = "images"
+MANIFEST_NAME = ".glacier-export.json"
+
+# 每个进程池任务导出的笔记数
+CHUNK_SIZE = 32
+
+_UNSAFE_NAME = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+_IMAGE_URL = re.compile(IMAGE_URL_SCHEME + r":([0-9a-f]{64})")
+
+# 子进程中的只读连接，由进程池初始化函数打开
+_worker_db = None
+
+
+def safe_name(name, limit=100):
+    name = _UNSAFE_NAME.sub("_", name).strip().strip(".")
+    return name[:limit] or "_"
+
+
+def image_file_name(key, mime):
+    return f"{key}{mimetypes.guess_extension(mime or '') or '.bin'}"
+
+
+def _init_worker(db_path):
+    global _worker_db
+    _worker_db = Database(db_path, read_only=True)
+
+
+def render_note(db, note_id, title, fmt, image_prefix):
+    """
+    读取并转换一篇笔记，返回 (文件内容字节, {图片键: 文件名})
+    正文中的图片 URL 改写为 image_prefix 下的相对路径
+    """
+    note = NoteModel(db).get_by_id(note_id)
+    content = (note.content if note else None) or ""
+    keys = extract_image_keys(content)
+    images = {}
+    if keys:
+        mimes = ImageModel(db).get_mimes(keys)
+        images = {key: image_file_name(key, mimes.get(key)) for key in keys}
+        content = _IMAGE_URL.sub(lambda m: f"{image_prefix}{images[m.group(1)]}", content)
+    if fmt == 'markdown':
+        text = f"# {title}\n\n{html_to_markdown(content)}"
+    else:
+        text = (
+            f'<!DOCTYPE html>\n<html><head><meta charset="utf-8" /><title>{html.escape(title)}</title>\n'
+            f'<style>{DEFAULT_STYLESHEET}</style></head><body>\n{content}\n</body></html>\n'
+        )
+    return text.encode('utf-8'), images
+
+
+def _render_chunk(items, fmt):
+    return [render_note(_worker_db, note_id, title, fmt, prefix) for note_id, title, prefix in items]
+
+
+class _DirectorySink:
+    def __init__(self, root):
+        self.root = root
+
+    def exists(self, path):
+        return os.path.exists(os.path.join(self.root, path))
+
+    def write(self, path, data):
+        target = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(data)
+
+    def remove(self, path):
+        try:
+            os.remove(os.path.join(self.root, path))
+        except FileNotFoundError:
+            pass
+
+    def close(self, discard=False):
+        pass
+
+
+class _ZipSink:
+    """
+    逐个条目写入临时 zip，完成后替换目标文件；导出失败时保留原归档
+    incremental 时把旧归档中未被重写、未被删除的条目 (未变化的笔记与图片) 复制到新归档
+    """
+
+    def __init__(self, path, incremental=False):
+        self.path = path
+        self.temp = path + ".tmp"
+        self.previous = zipfile.ZipFile(path) if incremental and os.path.exists(path) else None
+        self.previous_names = set(self.previous.namelist()) if self.previous is not None else set()
+        self.zip = zipfile.ZipFile(self.temp, 'w', compression=zipfile.ZIP_DEFLATED)
+        self.names = set()
+        self.removed = set()
+
+    def exists(self, path):
+        return path in self.names or (path in self.previous_names and path not in self.removed)
+
+    def write(self, path, data):
+        self.names.add(path)
+        # 图片已是压缩格式，直接存储
+        compress = zipfile.ZIP_STORED if path.startswith(IMAGE_DIR + "/") else zipfile.ZIP_DEFLATED
+        self.zip.writestr(path, data, compress_type=compress)
+
+    def remove(self, path):
+        self.removed.add(path)
+
+    def close(self, discard=False):
+        try:
+            if self.previous is not None and not discard:
+                for info in self.previous.infolist():
+                    if info.filename in self.names or info.filename in self.removed:
+                        continue
+                    entry = zipfile.ZipInfo(info.filename, info.date_time)
+                    entry.compress_type = info.compress_type
+                    entry.external_attr = info.external_attr
+                    entry.file_size = info.file_size
+                    with self.previous.open(info) as src, self.zip.open(entry, 'w') as dst:
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+        finally:
+            if self.previous is not None:
+                self.previous.close()
+            self.zip.close()
+        if discard:
+            os.remove(self.temp)
+        else:
+            os.replace(self.temp, self.path)
+
+
+def category_folder(category):
+    """分类对应的目录，分类名中的 / 表示子目录"""
+    return "/".join(safe_name(part) for part in category.split("/") if part.strip()) or "_"
+
+
+def _load_manifest(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {'since': "", 'notes': {}}
+    manifest['notes'] = {int(note_id): file_path for note_id, file_path in manifest['notes'].items()}
+    return manifest
+
+
+def _save_manifest(path, manifest):
+    temp = path + ".tmp"
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(temp, path)
+
+
+def export_notes(db, target, fmt='html', archive=False, incremental=False, workers=None, progress=None):
+    """
+    导出笔记，返回 (导出笔记数, 写出图片数, 删除的旧文件数)
+    progress: 可选回调 progress(已导出笔记数)
+    """
+    workers = workers or os.cpu_count() or 1
+    suffix = ".md" if fmt == 'markdown' else ".html"
+    manifest_path = target + ".json" if archive else os.path.join(target, MANIFEST_NAME)
+    if incremental and archive and not os.path.exists(target):
+        incremental = False  # 归档已不存在，无法复制未变化的条目，改为完整导出
+    manifest = _load_manifest(manifest_path) if incremental else {'since': "", 'notes': {}}
+    # 本次导出的开始时间 (与 CURRENT_TIMESTAMP 相同，为 UTC)，在读取笔记之前取得
+    started = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+    # 本次已确认存在的图片；是否已写出以目标中的实际文件为准，图片按内容哈希命名，内容不会变化
+    written_images = set()
+    paths = manifest['notes']
+    used = {file_path: note_id for note_id, file_path in paths.items()}
+    removed = 0
+
+    if archive:
+        sink = _ZipSink(target, incremental)
+    else:
+        os.makedirs(target, exist_ok=True)
+        sink = _DirectorySink(target)
+    refresh = set()
+    if incremental:
+        # 清单中没有的现存笔记 (如从回收站恢复的笔记，其 updated_at 可能早于上次导出)
+        # 以及所在分类改名后目录变化的笔记 (分类改名不刷新笔记的 updated_at)
+        alive = set()
+        for note_id, category in NoteModel(db).iter_locations():
+            alive.add(note_id)
+            old = paths.get(note_id)
+            if old is None or old.rsplit("/", 1)[0] != category_folder(category):
+                refresh.add(note_id)
+        # 清理已删除笔记的文件
+        for note_id in [note_id for note_id in paths if note_id not in alive]:
+            sink.remove(paths.pop(note_id))
+            removed += 1
+
+    def note_path(note_id, category, title):
+        folder = category_folder(category)
+        path = f"{folder}/{safe_name(title)}{suffix}"
+        if used.get(path, note_id) != note_id:
+            path = f"{folder}/{safe_name(title)} ({note_id}){suffix}"
+        old = paths.get(note_id)
+        if old is not None and old != path:
+            # 笔记改名或移动到其他分类后删除旧文件
+            used.pop(old, None)
+            sink.remove(old)
+        paths[note_id] = path
+        used[path] = note_id
+        return path
+
+    image_model = ImageModel(db)
+    exported = image_count = 0
+    since = manifest['since'] if incremental else ""
+
+    def changed_notes():
+        note_model = NoteModel(db)
+        seen = set()
+        for row in note_model.iter_changed(since):
+            seen.add(row[0])
+            yield row
+        yield from note_model.iter_by_ids(sorted(refresh - seen))
+
+    def write_results(items, future):
+        nonlocal exported, image_count
+        for (path, _), (data, images) in zip(items, future.result()):
+            sink.write(path, data)
+            for key, name in images.items():
+                if key in written_images or sink.exists(f"{IMAGE_DIR}/{name}"):
+                    written_images.add(key)
+                    continue
+                image = image_model.get(key)
+                if image is not None:
+                    sink.write(f"{IMAGE_DIR}/{name}", image['data'])
+                    image_count += 1
+                written_images.add(key)
+            exported += 1
+        if progress is not None:
+            progress(exported)
+
+    pending = deque()
+    chunk = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(db.db_path,)) as pool:
+            for note_id, category, title, _ in changed_notes():
+                path = note_path(note_id, category, title)
+                prefix = "../" * path.count("/") + IMAGE_DIR + "/"
+                chunk.append((path, (note_id, title, prefix)))
+                if len(chunk) >= CHUNK_SIZE:
+                    pending.append((chunk, pool.submit(_render_chunk, [item for _, item in chunk], fmt)))
+                    chunk = []
+                    while len(pending) >= workers * 2:
+                        write_results(*pending.popleft())
+            if chunk:
+                pending.append((chunk, pool.submit(_render_chunk, [item for _, item in chunk], fmt)))
+            while pending:
+                write_results(*pending.popleft())
+    except BaseException:
+        sink.close(discard=True)
+        raise
+    sink.close()
+
+    # 下次从本次开始的时刻导出: updated_at 精确到秒，从同一秒开始 (>=) 避免漏掉读取之后同一秒内修改的笔记；
+    # 记录开始时间而不是已导出的最大 updated_at，未修改的笔记不会在之后每次导出时重复导出
+    _save_manifest(manifest_path, {
+        'since': started,
+        'notes': {str(note_id): path for note_id, path in paths.items()},
+    })
+    return exported, image_count, removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量导出笔记")
+    parser.add_argument("target", help="目标目录；以 .zip 结尾时导出为单个 zip 文件")
+    parser.add_argument("db_path", nargs="?", default="glacier_notes.db")
+    parser.add_argument("--format", choices=("html", "markdown"), default="html")
+    parser.add_argument("--incremental", action="store_true", help="只导出上次导出之后修改过的笔记")
+    parser.add_argument("--workers", type=int, default=None, help="转换进程数，默认为 CPU 核数")
+    args = parser.parse_args(argv)
+
+    db = Database(args.db_path)
+    start = time.perf_counter()
+    try:
+        exported, images, removed = export_notes(
+            db, args.target, args.format, archive=args.target.lower().endswith(".zip"),
+            incremental=args.incremental, workers=args.workers,
+            progress=lambda done: print(f"\r已导出 {done} 篇", end="", flush=True)
+        )
+    finally:
+        db.close()
+    print(f"\n完成：导出 {exported} 篇笔记、{images} 张图片，删除旧文件 {removed} 个，"
+          f"耗时 {time.perf_counter() - start:.1f} 秒")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
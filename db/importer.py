@@ -0,0 +1,277 @@
+# db/importer.py
+"""
+批量导入 Markdown / HTML / 纯文本笔记目录
+
+- 目录树逐层惰性遍历，文件夹映射为分类：根目录下的文件归入以根目录命名的分类，
+  子目录中的文件归入以相对路径命名的分类 (如 "工作/项目A")，同名分类直接复用
+- 文件读取、格式转换、正文压缩与全文索引文本提取在进程池中执行
+- 转换结果按 --batch-size 分批，每批在一个写事务中用 executemany 插入，
+  导入记录 (import_files) 与笔记在同一事务中写入；中断后重新执行会跳过已导入的文件
+- 文件的修改时间作为笔记的 updated_at 与 created_at
+
+用法 (在项目根目录执行):
+    python -m db.importer 源目录 [数据库路径] [--batch-size 500] [--workers 4]
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from db.database import Database
+from models.category_model import CategoryModel
+from models.content_block_model import ContentBlockModel
+from utils.content_blocks import BLOCK_THRESHOLD
+from utils.content_codec import FORMAT_BLOCKS, encode_content
+from utils.markup import html_body, markdown_to_html, text_to_html
+from utils.text_index import html_to_text, segment_cjk
+
+# 支持的文件类型
+SUFFIXES = {'.md': 'markdown', '.markdown': 'markdown', '.html': 'html', '.htm': 'html', '.txt': 'text'}
+
+# 每个进程池任务转换的文件数，减少进程间通信次数
+CHUNK_SIZE = 32
+
+
+def walk_files(root):
+    """逐层惰性遍历目录，产出 (相对目录, 相对路径, 绝对路径)；相对路径以 / 分隔，跳过隐藏目录"""
+    stack = [""]
+    while stack:
+        folder = stack.pop()
+        try:
+            with os.scandir(os.path.join(root, folder)) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+        except OSError as e:
+            print(f"[walk_files] 无法读取目录 {folder or root}: {e}")
+            continue
+        subfolders = []
+        for entry in entries:
+            relative = f"{folder}/{entry.name}" if folder else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if not entry.name.startswith('.'):
+                    subfolders.append(relative)
+            elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in SUFFIXES:
+                yield folder, relative, entry.path
+        stack.extend(reversed(subfolders))
+
+
+def _read_text(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    for encoding in ('utf-8-sig', 'gb18030'):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode('utf-8', errors='replace')
+
+
+def read_note(path):
+    """读取文件并转换为编辑器 HTML，返回 (标题, 正文)"""
+    text = _read_text(path)
+    stem, suffix = os.path.splitext(os.path.basename(path))
+    kind = SUFFIXES[suffix.lower()]
+    title = None
+    if kind == 'markdown':
+        content = markdown_to_html(text)
+    elif kind == 'html':
+        title, content = html_body(text)
+    else:
+        content = text_to_html(text)
+    return title or stem, content
+
+
+def convert_file(path):
+    """
+    在子进程中执行，返回 (标题, 修改时间, 正文字符数, 正文格式, 正文值, 全文索引正文)
+    长正文返回原文与 FORMAT_BLOCKS，由写入端分块存放
+    """
+    title, content = read_note(path)
+    if len(content) >= BLOCK_THRESHOLD:
+        fmt, value = FORMAT_BLOCKS, content
+    else:
+        fmt, value = encode_content(content)
+    mtime = datetime.fromtimestamp(os.stat(path).st_mtime, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    return title, mtime, len(content), fmt, value, segment_cjk(html_to_text(content))
+
+
+def _convert_chunk(paths):
+    """转换一组文件，单个文件失败不影响其他文件：[(是否成功, 结果或错误信息)]"""
+    results = []
+    for path in paths:
+        try:
+            results.append((True, convert_file(path)))
+        except (OSError, ValueError) as e:
+            results.append((False, str(e)))
+    return results
+
+
+def _convert_stream(pool, files, max_pending):
+    """
+    按提交顺序产出 (相对目录, 相对路径, 是否成功, 结果)
+    最多 max_pending 个任务同时在途，内存占用与目录规模无关
+    """
+    pending = deque()
+    chunk = []
+
+    def drain():
+        items, future = pending.popleft()
+        for (folder, relative, _), (ok, result) in zip(items, future.result()):
+            yield folder, relative, ok, result
+
+    for item in files:
+        chunk.append(item)
+        if len(chunk) >= CHUNK_SIZE:
+            pending.append((chunk, pool.submit(_convert_chunk, [path for _, _, path in chunk])))
+            chunk = []
+            while len(pending) >= max_pending:
+                yield from drain()
+    if chunk:
+        pending.append((chunk, pool.submit(_convert_chunk, [path for _, _, path in chunk])))
+    while pending:
+        yield from drain()
+
+
+class _BatchWriter:
+    """把一批转换结果在一个写事务中插入"""
+
+    def __init__(self, db, source):
+        self.db = db
+        self.source = source
+        self.root_category = os.path.basename(source.rstrip(os.sep)) or source
+        self.categories = {}
+
+    def _category_id(self, folder):
+        name = folder or self.root_category
+        category_id = self.categories.get(name)
+        if category_id is None:
+            # 不导入到回收站中的同名分类
+            CategoryModel(self.db).release_trashed_name(name)
+            self.db.conn.execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (name,))
+            category_id = self.db.conn.execute("SELECT id FROM categories WHERE name = ?", (name,)).fetchone()[0]
+            self.categories[name] = category_id
+        return category_id
+
+    def _next_note_id(self):
+        """
+        executemany 不返回每行的 rowid，笔记 id 在写锁内显式分配
+        与 AUTOINCREMENT 一致，不复用已删除笔记的 id
+        """
+        row = self.db.conn.execute("""
+            SELECT MAX(
+                COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'notes'), 0),
+                COALESCE((SELECT MAX(id) FROM notes), 0)
+            )
+        """).fetchone()
+        return row[0] + 1
+
+    def write(self, batch):
+        conn = self.db.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            note_id = self._next_note_id()
+            notes, contents, long_contents, index, journal = [], [], [], [], []
+            for folder, relative, (title, mtime, size, fmt, value, body) in batch:
+                notes.append((note_id, self._category_id(folder), title, mtime, mtime, size))
+                if fmt == FORMAT_BLOCKS:
+                    long_contents.append((note_id, value))
+                else:
+                    contents.append((note_id, value, fmt))
+                index.append((note_id, segment_cjk(title), body))
+                journal.append((self.source, relative, note_id))
+                note_id += 1
+            conn.executemany(
+                "INSERT INTO notes (id, category_id, title, updated_at, created_at, content_size) "
+                "VALUES (?, ?, ?, ?, ?, ?)", notes
+            )
+            conn.executemany("INSERT INTO note_contents (note_id, content, format) VALUES (?, ?, ?)", contents)
+            block_model = ContentBlockModel(self.db)
+            for long_id, content in long_contents:
+                hashes, blocks = block_model.split(content)
+                conn.execute(
+                    "INSERT INTO note_contents (note_id, content, format) VALUES (?, ?, ?)",
+                    (long_id, block_model.store(long_id, hashes, blocks), FORMAT_BLOCKS)
+                )
+            conn.executemany("INSERT INTO notes_fts (rowid, title, body) VALUES (?, ?, ?)", index)
+            conn.executemany("INSERT INTO import_files (source, path, note_id) VALUES (?, ?, ?)", journal)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            # 回滚后本批新建的分类不存在了
+            self.categories.clear()
+            raise
+
+
+def import_tree(db, root, batch_size=500, workers=None, progress=None):
+    """
+    导入目录树，返回 (导入文件数, 跳过的已导入文件数, 转换失败文件数)
+    progress: 可选回调 progress(导入数, 跳过数, 失败数)，每批提交后调用
+    """
+    source = os.path.abspath(root)
+    workers = workers or os.cpu_count() or 1
+    # 已导入文件的记录，重新执行时在提交给进程池之前跳过
+    done = {row[0] for row in db.iterate("SELECT path FROM import_files WHERE source = ?", (source,), as_tuple=True)}
+    writer = _BatchWriter(db, source)
+    imported = skipped = failed = 0
+
+    def pending_files():
+        nonlocal skipped
+        for item in walk_files(source):
+            if item[1] in done:
+                skipped += 1
+            else:
+                yield item
+
+    batch = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for folder, relative, ok, result in _convert_stream(pool, pending_files(), workers * 2):
+            if not ok:
+                failed += 1
+                print(f"[import_tree] 转换失败 {relative}: {result}")
+                continue
+            batch.append((folder, relative, result))
+            if len(batch) >= batch_size:
+                writer.write(batch)
+                imported += len(batch)
+                batch = []
+                if progress is not None:
+                    progress(imported, skipped, failed)
+    if batch:
+        writer.write(batch)
+        imported += len(batch)
+    if progress is not None:
+        progress(imported, skipped, failed)
+    return imported, skipped, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量导入 Markdown / HTML / 纯文本笔记")
+    parser.add_argument("source", help="要导入的目录")
+    parser.add_argument("db_path", nargs="?", default="glacier_notes.db")
+    parser.add_argument("--batch-size", type=int, default=500, help="每个写事务插入的笔记数")
+    parser.add_argument("--workers", type=int, default=None, help="转换进程数，默认为 CPU 核数")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.source):
+        print(f"源目录不存在: {args.source}")
+        return 1
+    db = Database(args.db_path, profile='performance')
+    start = time.perf_counter()
+
+    def report(done, skipped, failed):
+        rate = done / max(time.perf_counter() - start, 1e-9)
+        print(f"\r已导入 {done} 篇 ({rate:.0f} 篇/秒)，跳过 {skipped}，失败 {failed}", end="", flush=True)
+
+    try:
+        imported, skipped, failed = import_tree(db, args.source, args.batch_size, args.workers, progress=report)
+    finally:
+        db.close()
+    print(f"\n完成：导入 {imported} 篇，跳过已导入 {skipped} 篇，失败 {failed} 篇，"
+          f"耗时 {time.perf_counter() - start:.1f} 秒")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+# db/purge.py
+"""
+物理删除回收站中的过期分类与笔记，并把空出的页归还给文件系统
+
+每批在一个短写事务中删除，批与批之间提交并暂停，应用运行时也可以执行；
+auto_vacuum = INCREMENTAL 的数据库随后分批执行 incremental_vacuum，不需要阻塞式 VACUUM
+旧版本创建的数据库 auto_vacuum 为 NONE，可在应用关闭时加 --convert 执行一次 VACUUM 完成切换
+
+用法 (在项目根目录执行):
+    python -m db.purge [数据库路径] [--days 30] [--batch-size 200] [--pause 0.05] [--convert]
+"""
+import argparse
+import sys
+import time
+
+from db.database import Database
+from models.trash_model import PURGE_BATCH_SIZE, RETENTION_DAYS, VACUUM_PAGES, TrashModel
+
+
+def purge_trash(db, older_than_days=RETENTION_DAYS, batch_size=PURGE_BATCH_SIZE, pause=0.0, progress=None):
+    """
+    分批清理回收站并增量回收空闲页，返回 (删除行数, 释放页数)
+    progress: 可选回调 progress(删除行数, 释放页数)
+    """
+    trash_model = TrashModel(db)
+    removed = freed = 0
+    while True:
+        count = trash_model.purge_step(older_than_days, batch_size)
+        if not count:
+            break
+        removed += count
+        if progress is not None:
+            progress(removed, freed)
+        if pause:
+            time.sleep(pause)
+    while True:
+        pages = trash_model.reclaim_space(VACUUM_PAGES)
+        if not pages:
+            break
+        freed += pages
+        if progress is not None:
+            progress(removed, freed)
+        if pause:
+            time.sleep(pause)
+    return removed, freed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="清理回收站")
+    parser.add_argument("db_path", nargs="?", default="glacier_notes.db")
+    parser.add_argument("--days", type=int, default=RETENTION_DAYS, help="删除超过该天数的条目，0 表示清空回收站")
+    parser.add_argument("--batch-size", type=int, default=PURGE_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=0.05, help="批与批之间暂停的秒数，减少对应用写入的影响")
+    parser.add_argument("--convert", action="store_true",
+                        help="把旧数据库切换为 auto_vacuum = INCREMENTAL (执行一次完整 VACUUM，需关闭应用)")
+    args = parser.parse_args(argv)
+
+    db = Database(args.db_path)
+    try:
+        removed, freed = purge_trash(
+            db, args.days, args.batch_size, args.pause,
+            progress=lambda rows, pages: print(f"\r已删除 {rows} 行，释放 {pages} 页", end="", flush=True)
+        )
+        print(f"\n完成：删除 {removed} 行，释放 {freed} 页")
+        if args.convert and db.auto_vacuum != 2:
+            start = time.perf_counter()
+            db.enable_incremental_vacuum()
+            print(f"已切换为增量回收，耗时 {time.perf_counter() - start:.1f} 秒")
+        elif db.auto_vacuum != 2:
+            print("数据库未启用增量回收，空出的页会被后续写入复用；如需缩小文件，请在应用关闭时加 --convert 执行")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+# db/query_plan.py
+"""
+模型查询执行计划检查
+在临时数据库上调用全部模型方法并记录实际执行的 SQL，
+对每条语句运行 EXPLAIN QUERY PLAN，报告全表扫描与临时 B-tree 排序
+
+用法 (在项目根目录执行):
+    python -m db.query_plan
+存在问题时以非零状态码退出
+"""
+import os
+import sys
+import tempfile
+import time
+
+from db.database import Database
+from models.category_model import CategoryModel
+from models.image_model import ImageModel, image_url
+from models.note_model import SORT_ORDERS, NoteModel
+from models.revision_model import RevisionModel
+from models.trash_model import TrashModel
+
+
+def find_plan_problems(detail):
+    """判断单条计划明细是否为全表扫描或临时排序"""
+    problems = []
+    if detail.startswith("SCAN ") and " USING " not in detail and "VIRTUAL TABLE" not in detail:
+        problems.append("全表扫描")
+    if "USE TEMP B-TREE" in detail:
+        problems.append("临时 B-tree 排序")
+    return problems
+
+
+def check_statements(db, statements):
+    """
+    statements: {sql: params}
+    返回 [(sql, detail, [问题...]), ...]
+    """
+    report = []
+    for sql, params in statements.items():
+        for detail in db.explain(sql, params):
+            problems = find_plan_problems(detail)
+            if problems:
+                report.append((sql, detail, problems))
+    return report
+
+
+def exercise_models(db):
+    """调用全部模型方法，使其 SQL 被记录；新增模型查询时需同步补充"""
+    category_model = CategoryModel(db)
+    note_model = NoteModel(db)
+    image_model = ImageModel(db)
+    revision_model = RevisionModel(db, retention=[(0, 0)])
+    trash_model = TrashModel(db)
+
+    category_id = category_model.add("执行计划检查")
+    other_category_id = category_model.add("执行计划检查-2")
+    category_model.rename(other_category_id, "执行计划检查-3")
+    category_model.get_all()
+    note_id = note_model.add(category_id, "笔记")
+    note_model.rename(note_id, "笔记-1")
+    note_model.update_title(note_id, "笔记-2")
+    image_key = image_model.put(b"image", "image/png", 1, 1)
+    note_model.update_content(note_id, f'<p>正文</p><img src="{image_url(image_key)}" />')
+    image_model.get(image_key)
+    image_model.reference_count(image_key)
+    image_model.get_thumbnail(image_key)
+    image_model.get_sizes([image_key])
+    image_model.get_mimes([image_key])
+    image_model.set_derived(image_key, 1, 1, b"thumb")
+    note_model.update(note_id, title="笔记-3", content="<p>正文-2</p>")
+    long_content = "".join(f"<p>段落 {i}</p>\n" for i in range(5000))
+    note_model.update_content(note_id, long_content)
+    note_model.update_content(note_id, long_content.replace("段落 100<", "段落 100 已修改<"))
+    note_model.get_by_id(note_id)
+    note_model.index_pending()
+    note_model.update_content(note_id, "<p>正文-2</p>")
+    revision_model.list(note_id)
+    revision_model.get_content(note_id, 2)
+    revision_model.thin(note_id, now=time.time() + 60)
+    note_model.move(note_id, other_category_id)
+    note_model.get_by_id(note_id)
+    note_model.get_header(note_id)
+    note_model.get_by_category(other_category_id)
+    list(note_model.iter_changed())
+    list(note_model.iter_locations())
+    list(note_model.iter_by_ids([note_id]))
+    for order in SORT_ORDERS:
+        first_page = note_model.list_page(other_category_id, order, limit=1)
+        note_model.list_page(other_category_id, order, after=(first_page[0].sort_key, first_page[0].id), limit=1)
+    category_model.get_by_id(other_category_id)
+    category_model.rebuild_stats([other_category_id])
+    note_model.search("正文", limit=10)
+    note_model.delete(note_id)
+    category_model.delete(category_id)
+    trash_model.list_notes()
+    trash_model.list_categories()
+    trash_model.restore_note(note_id)
+    trash_model.restore_category(category_id)
+    note_model.delete(note_id)
+    category_model.delete(category_id)
+    category_model.add("执行计划检查")
+    while trash_model.purge_step(older_than_days=0, batch_size=1):
+        pass
+    trash_model.reclaim_space()
+    image_model.collect_garbage(grace_days=0)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, "query_plan.db"))
+        try:
+            db.statement_log = {}
+            exercise_models(db)
+            statements = db.statement_log
+            db.statement_log = None
+            report = check_statements(db, statements)
+        finally:
+            db.close()
+
+    print(f"已检查 {len(statements)} 条模型语句")
+    for sql, detail, problems in report:
+        print(f"[{'/'.join(problems)}] {detail}")
+        print("    " + " ".join(sql.split()))
+    if report:
+        print(f"发现 {len(report)} 处问题")
+        return 1
+    print("未发现全表扫描")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
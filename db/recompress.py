@@ -0,0 +1,87 @@
+# db/recompress.py
+"""
+按当前编码格式重新压缩已有笔记正文
+
+每批在一个短写事务中读取并改写，批与批之间提交并可暂停，
+应用运行时也可以执行 (WAL 模式下不阻塞读，写入只被短暂占用)；中断后重新执行会跳过已处理的行
+
+用法 (在项目根目录执行):
+    python -m db.recompress [数据库路径] [--batch-size 200] [--pause 0.05]
+"""
+import argparse
+import sys
+import time
+
+from db.database import Database
+from utils.content_codec import CURRENT_FORMAT, FORMAT_BLOCKS, decode_content, encode_content
+
+
+def recompress_contents(db, batch_size=200, pause=0.0, progress=None):
+    """
+    把 format 不是 CURRENT_FORMAT 的正文重新编码 (分块存放的正文除外)，返回 (检查行数, 改写行数, 节省字节数)
+    progress: 可选回调 progress(检查行数, 改写行数)
+    """
+    checked = rewritten = saved = 0
+    last_id = 0
+    while True:
+        db.conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = db.conn.execute("""
+                SELECT note_id, content, format FROM note_contents
+                WHERE note_id > ? AND format NOT IN (?, ?)
+                ORDER BY note_id LIMIT ?
+            """, (last_id, CURRENT_FORMAT, FORMAT_BLOCKS, batch_size)).fetchall()
+            for note_id, value, fmt in rows:
+                content = decode_content(fmt, value)
+                new_fmt, new_value = encode_content(content)
+                if new_fmt == fmt:
+                    continue  # 过短或不可压缩的正文保持原样
+                db.conn.execute(
+                    "UPDATE note_contents SET content = ?, format = ? WHERE note_id = ?",
+                    (new_value, new_fmt, note_id)
+                )
+                rewritten += 1
+                saved += _stored_size(value) - _stored_size(new_value)
+            db.conn.commit()
+        except BaseException:
+            db.conn.rollback()
+            raise
+        if not rows:
+            break
+        checked += len(rows)
+        last_id = rows[-1][0]
+        if progress is not None:
+            progress(checked, rewritten)
+        if pause:
+            time.sleep(pause)
+    return checked, rewritten, saved
+
+
+def _stored_size(value):
+    if value is None:
+        return 0
+    return len(value.encode('utf-8')) if isinstance(value, str) else len(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="重新压缩笔记正文")
+    parser.add_argument("db_path", nargs="?", default="glacier_notes.db")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--pause", type=float, default=0.05, help="批与批之间暂停的秒数，减少对应用写入的影响")
+    args = parser.parse_args(argv)
+
+    db = Database(args.db_path)
+    try:
+        checked, rewritten, saved = recompress_contents(
+            db, args.batch_size, args.pause,
+            progress=lambda done, changed: print(f"\r已检查 {done} 行，改写 {changed} 行", end="", flush=True)
+        )
+    finally:
+        db.close()
+    print(f"\n完成：检查 {checked} 行，改写 {rewritten} 行，节省 {saved / 1024:.1f} KiB")
+    print("释放的页面会被后续写入复用；如需立即缩小数据库文件，请在应用关闭时执行 VACUUM")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
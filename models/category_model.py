@@ -1,14 +1,65 @@
 # models/category_model.py
+from models.events import ModelEvents
+from models.records import Category
 
 class CategoryModel:
-    def __init__(self, db):
+    def __init__(self, db, events=None):
         self.db = db
+        # 多个模型共享同一个事件中心，界面据此做增量更新
+        self.events = events if events is not None else ModelEvents()
 
     def get_all(self):
-        return self.db.query("SELECT id, name FROM categories ORDER BY name")
+        """返回按名称排序的 Category 记录列表，聚合统计与分类存放在同一行，不需额外查询"""
+        sql = """
+            SELECT id, name, note_count, total_size, last_updated FROM categories
+            WHERE deleted_at IS NULL ORDER BY name
+        """
+        return self.db.query(sql, record=Category)
+
+    def get_by_id(self, category_id):
+        sql = "SELECT id, name, note_count, total_size, last_updated FROM categories WHERE id = ?"
+        result = self.db.query(sql, (category_id,), record=Category)
+        return result[0] if result else None
+
+    def check_stats(self):
+        """
+        比对分类聚合统计与 notes 中未删除笔记的实际值，返回不一致的 [(Category, (笔记数, 总字符数, 最近修改时间))]
+        每个分类按索引计数，总字符数需要读取该分类的全部笔记头
+        """
+        sql = """
+            SELECT c.id, c.name, c.note_count, c.total_size, c.last_updated,
+                   COUNT(n.id), COALESCE(SUM(n.content_size), 0), MAX(n.updated_at)
+            FROM categories c
+            LEFT JOIN notes n ON n.category_id = c.id AND n.deleted_at IS NULL
+            GROUP BY c.id
+        """
+        mismatched = []
+        for row in self.db.iterate(sql, as_tuple=True):
+            category, actual = Category(*row[:5]), row[5:]
+            if (category.note_count, category.total_size, category.last_updated) != actual:
+                mismatched.append((category, actual))
+        return mismatched
+
+    def rebuild_stats(self, category_ids=None):
+        """按 notes 重新计算分类聚合统计；category_ids 为 None 时重建全部分类"""
+        sql = """
+            UPDATE categories SET (note_count, total_size, last_updated) = (
+                SELECT COUNT(*), COALESCE(SUM(content_size), 0), MAX(updated_at)
+                FROM notes WHERE category_id = categories.id AND deleted_at IS NULL
+            )
+        """
+        if category_ids is None:
+            self.db.execute(sql, commit=True)
+            return
+        self.db.conn.executemany(sql + " WHERE id = ?", [(category_id,) for category_id in category_ids])
+        self.db.commit()
 
     def add(self, name):
-        self.db.execute("INSERT INTO categories (name) VALUES (?)", (name,), commit=True)
+        self.release_trashed_name(name)
+        cursor = self.db.execute("INSERT INTO categories (name) VALUES (?)", (name,), commit=True)
+        category_id = cursor.lastrowid
+        self.events.publish(ModelEvents.CATEGORY_ADDED, category_id=category_id, name=name)
+        return category_id
 
     def rename(self, category_id, new_name):
         self.db.execute(
@@ -16,7 +67,20 @@ class CategoryModel:
             (new_name, category_id),
             commit=True
         )
+        self.events.publish(ModelEvents.CATEGORY_RENAMED, category_id=category_id, name=new_name)
 
     def delete(self, category_id):
-        # 连带删除 notes，不需额外 SQL，因为已开启外键级联
-        self.db.execute("DELETE FROM categories WHERE id = ?", (category_id,), commit=True)
+        """
+        移入回收站，只更新分类一行，与分类下的笔记数量无关
+        分类下的笔记随分类隐藏，由 TrashModel 的清理任务分批物理删除
+        """
+        sql = "UPDATE categories SET deleted_at = CURRENT_TIMESTAMP WHERE id = ? AND deleted_at IS NULL"
+        self.db.execute(sql, (category_id,), commit=True)
+        self.events.publish(ModelEvents.CATEGORY_DELETED, category_id=category_id)
+
+    def release_trashed_name(self, name):
+        """分类名唯一；回收站中的同名分类改名为 "名称 (已删除 id)"，让出名称给新分类，不提交"""
+        self.db.execute(
+            "UPDATE categories SET name = name || ' (已删除 ' || id || ')' WHERE name = ? AND deleted_at IS NOT NULL",
+            (name,)
+        )
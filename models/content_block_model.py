@@ -0,0 +1,71 @@
+# models/content_block_model.py
+from utils.content_blocks import block_hash, pack_manifest, split_blocks, unpack_manifest
+from utils.content_codec import decode_content, encode_content
+
+# 单条 IN 查询的参数上限
+_QUERY_CHUNK = 500
+
+
+class ContentBlockModel:
+    """
+    长笔记正文的分块存储：块按内容哈希存放在 content_blocks，相同的块只保存一次
+    笔记引用的块记录在 note_blocks，最后一个引用被删除时由触发器删除块
+    保存时只插入新出现的块、只增删变化的引用，写入量与修改量相关而与笔记长度无关
+    """
+
+    def __init__(self, db, events=None):
+        self.db = db
+        self.events = events
+
+    def split(self, content):
+        """返回 (块哈希列表, {哈希: 块文本})"""
+        blocks = split_blocks(content)
+        hashes = [block_hash(block) for block in blocks]
+        return hashes, dict(zip(hashes, blocks))
+
+    def store(self, note_id, hashes, blocks, old_hashes=()):
+        """
+        保存分块后的正文，old_hashes 为笔记原来的块清单
+        返回写入 note_contents.content 的清单
+        """
+        old = set(old_hashes)
+        new = set(hashes)
+        for digest in new - old:
+            fmt, value = encode_content(blocks[digest])
+            self.db.execute("""
+                INSERT INTO content_blocks (hash, format, data) VALUES (?, ?, ?)
+                ON CONFLICT (hash) DO NOTHING
+            """, (digest, fmt, value))
+            self.db.execute("INSERT OR IGNORE INTO note_blocks (note_id, block_hash) VALUES (?, ?)", (note_id, digest))
+        for digest in old - new:
+            self.db.execute("DELETE FROM note_blocks WHERE note_id = ? AND block_hash = ?", (note_id, digest))
+        return pack_manifest(hashes)
+
+    def release(self, note_id):
+        """正文改为整体存放时删除笔记的全部块引用"""
+        self.db.execute("DELETE FROM note_blocks WHERE note_id = ?", (note_id,))
+
+    def load(self, hashes):
+        """批量读取块文本，返回 {哈希: 块文本}"""
+        hashes = list(set(hashes))
+        result = {}
+        for start in range(0, len(hashes), _QUERY_CHUNK):
+            chunk = hashes[start:start + _QUERY_CHUNK]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = self.db.query(
+                f"SELECT hash, format, data FROM content_blocks WHERE hash IN ({placeholders})", chunk
+            )
+            for row in rows:
+                result[row['hash']] = decode_content(row['format'], row['data'])
+        return result
+
+    def assemble(self, manifest, known=None):
+        """
+        按清单拼接正文；known 为已知的 {哈希: 块文本}，只从数据库读取其余的块
+        """
+        hashes = unpack_manifest(manifest)
+        blocks = dict(known) if known else {}
+        missing = [digest for digest in hashes if digest not in blocks]
+        if missing:
+            blocks.update(self.load(missing))
+        return "".join(blocks[digest] for digest in hashes)
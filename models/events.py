@@ -0,0 +1,35 @@
+# models/events.py
+
+class ModelEvents:
+    """
+    模型层变更事件的发布/订阅中心
+    订阅者签名: callback(event: str, payload: dict)
+    事件在数据库提交之后同步发布
+    """
+    CATEGORY_ADDED = 'category_added'
+    CATEGORY_RENAMED = 'category_renamed'
+    CATEGORY_DELETED = 'category_deleted'
+    NOTE_ADDED = 'note_added'
+    NOTE_RENAMED = 'note_renamed'
+    NOTE_MOVED = 'note_moved'
+    NOTE_DELETED = 'note_deleted'
+    NOTE_CONTENT_UPDATED = 'note_content_updated'
+
+    def __init__(self):
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def publish(self, event, **payload):
+        # 复制一份列表，允许订阅者在回调中取消订阅
+        for callback in list(self._subscribers):
+            try:
+                callback(event, payload)
+            except Exception as e:
+                print(f"[ModelEvents] 处理事件 {event} 失败: {e}")
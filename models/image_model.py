@@ -0,0 +1,121 @@
+# models/image_model.py
+import hashlib
+import re
+
+# 笔记 HTML 中引用图片库图片的 URL 形式: glacier-image:<sha256>
+IMAGE_URL_SCHEME = "glacier-image"
+_IMAGE_URL = re.compile(IMAGE_URL_SCHEME + r":([0-9a-f]{64})")
+
+
+def image_key(data):
+    """图片内容的哈希，作为图片库中的唯一键"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def image_url(key):
+    return f"{IMAGE_URL_SCHEME}:{key}"
+
+
+def extract_image_keys(content):
+    """提取笔记 HTML 引用的全部图片键 (去重)"""
+    if not content or IMAGE_URL_SCHEME not in content:
+        return set()
+    return set(_IMAGE_URL.findall(content))
+
+
+class ImageModel:
+    """
+    按内容哈希存储的图片库：相同图片只保存一次
+    笔记与图片的引用关系记录在 note_images，引用计数即引用行数；
+    无引用且超过保留期的图片由 collect_garbage 回收
+    """
+
+    def __init__(self, db, events=None):
+        self.db = db
+        self.events = events
+
+    def put(self, data, mime, width=None, height=None, thumb=None):
+        """存入图片并返回其键；已存在相同内容时不重复写入"""
+        key = image_key(data)
+        sql = """
+            INSERT INTO images (hash, mime, width, height, size, data, thumb)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (hash) DO NOTHING
+        """
+        self.db.execute(sql, (key, mime, width, height, len(data), data, thumb), commit=True)
+        return key
+
+    def get(self, key):
+        """返回 {'hash', 'mime', 'width', 'height', 'data', 'has_thumb'}，不存在时返回 None"""
+        sql = "SELECT hash, mime, width, height, data, thumb IS NOT NULL AS has_thumb FROM images WHERE hash = ?"
+        rows = self.db.query(sql, (key,))
+        return rows[0] if rows else None
+
+    def get_thumbnail(self, key):
+        """返回缩略图字节，没有缩略图时返回 None"""
+        rows = self.db.query("SELECT thumb FROM images WHERE hash = ?", (key,))
+        return rows[0]['thumb'] if rows else None
+
+    def get_sizes(self, keys):
+        """批量查询图片尺寸，返回 {key: (width, height)}，尺寸未知的图片不包含在内"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        placeholders = ", ".join("?" for _ in keys)
+        sql = f"""
+            SELECT hash, width, height FROM images
+            WHERE hash IN ({placeholders}) AND width IS NOT NULL AND height IS NOT NULL
+        """
+        return {row['hash']: (row['width'], row['height']) for row in self.db.query(sql, keys)}
+
+    def get_mimes(self, keys):
+        """批量查询图片类型，返回 {key: mime}"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        placeholders = ", ".join("?" for _ in keys)
+        sql = f"SELECT hash, mime FROM images WHERE hash IN ({placeholders})"
+        return {row['hash']: row['mime'] for row in self.db.query(sql, keys)}
+
+    def set_derived(self, key, width, height, thumb):
+        """补全旧图片缺少的尺寸与缩略图"""
+        sql = """
+            UPDATE images SET width = ?, height = ?, thumb = ?
+            WHERE hash = ? AND (thumb IS NULL OR width IS NULL)
+        """
+        self.db.execute(sql, (width, height, thumb, key), commit=True)
+
+    def reference_count(self, key):
+        sql = """
+            SELECT COUNT(*) FROM note_images r
+            JOIN images i ON i.id = r.image_id
+            WHERE i.hash = ?
+        """
+        return self.db.query(sql, (key,))[0][0]
+
+    def sync_note_refs(self, note_id, content):
+        """按笔记当前正文重建其图片引用，与正文写入处于同一事务"""
+        self.db.execute("DELETE FROM note_images WHERE note_id = ?", (note_id,))
+        keys = extract_image_keys(content)
+        if not keys:
+            return
+        placeholders = ", ".join("?" for _ in keys)
+        sql = f"""
+            INSERT OR IGNORE INTO note_images (note_id, image_id)
+            SELECT ?, id FROM images WHERE hash IN ({placeholders})
+        """
+        self.db.execute(sql, (note_id, *keys))
+
+    def collect_garbage(self, grace_days=1):
+        """
+        删除没有任何笔记正文或历史版本引用的图片，返回删除数量
+        保留期内的新图片不回收：它们可能已插入编辑器但笔记尚未保存
+        """
+        sql = """
+            DELETE FROM images
+            WHERE created_at < datetime('now', ?)
+              AND NOT EXISTS (SELECT 1 FROM note_images r WHERE r.image_id = images.id)
+              AND NOT EXISTS (SELECT 1 FROM revision_images r WHERE r.image_id = images.id)
+        """
+        cursor = self.db.execute(sql, (f"-{int(grace_days)} days",), commit=True)
+        return cursor.rowcount
@@ -1,61 +1,327 @@
 # models/note_model.py
+from models.content_block_model import ContentBlockModel
+from models.events import ModelEvents
+from models.image_model import ImageModel
+from models.records import Note, NoteEntry, NoteHeader, SearchResult
+from models.revision_model import RevisionModel
+from utils.content_blocks import BLOCK_THRESHOLD, unpack_manifest
+from utils.content_codec import FORMAT_BLOCKS, decode_content, encode_content
+from utils.text_index import build_match_query, format_snippet, html_to_text, segment_cjk
+
+
+# 分类内笔记的排序方式: 名称 → (排序列, 方向)
+SORT_ORDERS = {
+    'updated': ('updated_at', 'DESC'),
+    'created': ('created_at', 'DESC'),
+    'title': ('title', 'ASC'),
+}
+
 
 class NoteModel:
-    def __init__(self, db):
+    def __init__(self, db, events=None):
         self.db = db
+        # 多个模型共享同一个事件中心，界面据此做增量更新
+        self.events = events if events is not None else ModelEvents()
 
     def get_by_category(self, category_id):
+        """分类下全部笔记 (NoteEntry，排序键为 updated_at)，按 updated_at 倒序"""
         sql = """
-            SELECT id, title 
-            FROM notes 
-            WHERE category_id = ? 
+            SELECT id, title, updated_at
+            FROM notes
+            WHERE category_id = ? AND deleted_at IS NULL
             ORDER BY updated_at DESC
         """
-        return self.db.query(sql, (category_id,))
+        return self.db.query(sql, (category_id,), record=NoteEntry)
+
+    def list_page(self, category_id, order='updated', after=None, limit=200):
+        """
+        键集分页获取分类下的笔记，返回 [NoteEntry, ...]
+        order: SORT_ORDERS 中的排序方式；after: 上一页最后一行的 (排序键, id)，为 None 时取第一页
+        每种排序都有对应的覆盖索引 (含 deleted_at，回收站中的笔记在索引内过滤)，每页代价与翻页深度无关
+        """
+        column, direction = SORT_ORDERS[order]
+        # 列名与方向均来自常量表
+        comparison = "<" if direction == "DESC" else ">"
+        where = "category_id = ? AND deleted_at IS NULL"
+        params = [category_id]
+        if after is not None:
+            where += f" AND ({column}, id) {comparison} (?, ?)"
+            params += [after[0], after[1]]
+        sql = f"""
+            SELECT id, title, {column}
+            FROM notes
+            WHERE {where}
+            ORDER BY {column} {direction}, id {direction}
+            LIMIT ?
+        """
+        return self.db.query(sql, (*params, limit), record=NoteEntry)
+
+    def get_header(self, note_id):
+        """只读取笔记头信息 (NoteHeader)，不触碰正文"""
+        sql = "SELECT id, category_id, title, updated_at, created_at FROM notes WHERE id = ?"
+        result = self.db.query(sql, (note_id,), record=NoteHeader)
+        return result[0] if result else None
 
     def get_by_id(self, note_id):
-        sql = "SELECT id, category_id, title, content, updated_at FROM notes WHERE id = ?"
-        result = self.db.query(sql, (note_id,))
+        """返回 Note 记录，content 为解码后的 HTML"""
+        sql = """
+            SELECT n.id, n.category_id, n.title, c.content, c.format, n.updated_at
+            FROM notes n
+            LEFT JOIN note_contents c ON c.note_id = n.id
+            WHERE n.id = ?
+        """
+        result = self.db.query(sql, (note_id,), record=self._note_record)
         return result[0] if result else None
 
+    def _note_record(self, note_id, category_id, title, content, fmt, updated_at):
+        return Note(note_id, category_id, title, self._read_content(fmt, content), updated_at)
+
+    def iter_changed(self, since=""):
+        """
+        流式产出 updated_at >= since 的笔记 (id, 分类名, 标题, updated_at)，按 updated_at 升序，不含回收站中的笔记
+        since 为空字符串时产出全部笔记；走 idx_notes_updated，不一次性读入全部结果
+        """
+        sql = """
+            SELECT n.id, c.name, n.title, n.updated_at
+            FROM notes n
+            JOIN categories c ON c.id = n.category_id
+            WHERE n.updated_at >= ? AND n.deleted_at IS NULL AND c.deleted_at IS NULL
+            ORDER BY n.updated_at, n.id
+        """
+        return self.db.iterate(sql, (since,), as_tuple=True)
+
+    def iter_locations(self):
+        """流式产出全部未删除笔记的 (id, 分类名)"""
+        sql = """
+            SELECT n.id, c.name FROM notes n
+            JOIN categories c ON c.id = n.category_id
+            WHERE n.deleted_at IS NULL AND c.deleted_at IS NULL
+        """
+        return self.db.iterate(sql, as_tuple=True)
+
+    def iter_by_ids(self, note_ids, chunk_size=500):
+        """按 id 分批产出未删除笔记的 (id, 分类名, 标题, updated_at)，与 iter_changed 相同"""
+        note_ids = list(note_ids)
+        for start in range(0, len(note_ids), chunk_size):
+            chunk = note_ids[start:start + chunk_size]
+            placeholders = ", ".join("?" for _ in chunk)
+            sql = f"""
+                SELECT n.id, c.name, n.title, n.updated_at
+                FROM notes n
+                JOIN categories c ON c.id = n.category_id
+                WHERE n.id IN ({placeholders}) AND n.deleted_at IS NULL AND c.deleted_at IS NULL
+            """
+            yield from self.db.iterate(sql, chunk, as_tuple=True)
+
     def add(self, category_id, title):
-        sql = "INSERT INTO notes (category_id, title) VALUES (?, ?)"
-        cursor = self.db.execute(sql, (category_id, title), commit=True)
-        return cursor.lastrowid
+        sql = "INSERT INTO notes (category_id, title, created_at) VALUES (?, ?, CURRENT_TIMESTAMP)"
+        cursor = self.db.execute(sql, (category_id, title))
+        note_id = cursor.lastrowid
+        self.db.execute(
+            "INSERT INTO notes_fts (rowid, title, body) VALUES (?, ?, '')",
+            (note_id, segment_cjk(title)),
+            commit=True
+        )
+        self.events.publish(ModelEvents.NOTE_ADDED, note_id=note_id, category_id=category_id, title=title)
+        return note_id
 
     def delete(self, note_id):
-        sql = "DELETE FROM notes WHERE id = ?"
+        """移入回收站，只更新一行；正文、全文索引等由 TrashModel 的清理任务分批物理删除"""
+        sql = "UPDATE notes SET deleted_at = CURRENT_TIMESTAMP WHERE id = ? AND deleted_at IS NULL"
         self.db.execute(sql, (note_id,), commit=True)
+        self.events.publish(ModelEvents.NOTE_DELETED, note_id=note_id)
 
     def rename(self, note_id, new_title):
         sql = "UPDATE notes SET title = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?"
-        self.db.execute(sql, (new_title, note_id), commit=True)
+        self.db.execute(sql, (new_title, note_id))
+        self._index_title(note_id, new_title, commit=True)
+        self.events.publish(ModelEvents.NOTE_RENAMED, note_id=note_id, title=new_title)
+
+    def move(self, note_id, category_id):
+        """移动笔记到其他分类，同时刷新 updated_at 使其排在目标分类最前；目标分类在回收站中时不移动"""
+        sql = """
+            UPDATE notes SET category_id = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND EXISTS (SELECT 1 FROM categories WHERE id = ? AND deleted_at IS NULL)
+        """
+        cursor = self.db.execute(sql, (category_id, note_id, category_id), commit=True)
+        if cursor.rowcount:
+            self.events.publish(ModelEvents.NOTE_MOVED, note_id=note_id, category_id=category_id)
 
     def update_content(self, note_id, content):
-        sql = "UPDATE notes SET content = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?"
-        self.db.execute(sql, (content, note_id), commit=True)
+        """正文未变化时不写入，也不刷新 updated_at；回收站中的笔记 (包括随分类移入的) 不更新"""
+        if self._live_title(note_id) is None:
+            return
+        if not self._write_content(note_id, content):
+            return
+        self.db.execute("UPDATE notes SET updated_at = CURRENT_TIMESTAMP WHERE id = ?", (note_id,))
+        self._index_body(note_id, content)
+        self.db.commit()
+        self.events.publish(ModelEvents.NOTE_CONTENT_UPDATED, note_id=note_id)
 
     def update_title(self, note_id, title):
         # 可合并进 rename 方法；保留独立函数便于调用清晰
-        sql = "UPDATE notes SET title = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?"
-        self.db.execute(sql, (title, note_id), commit=True)
+        self.rename(note_id, title)
 
     def update(self, note_id, title=None, content=None):
         """可选更新标题与内容"""
-        fields = []
-        params = []
+        if title is None and content is None:
+            return  # 无更新内容
+        self.update_many([(note_id, title, content)])
+
+    def update_many(self, changes):
+        """
+        在同一事务中批量更新多篇笔记，changes 为 [(note_id, title, content), ...]
+        title / content 为 None 表示不更新该项；提交后再逐篇发布事件
+        已被删除或移入回收站 (包括随分类移入) 的笔记、标题与正文均未变化的笔记直接跳过，返回实际更新的笔记 id 列表
+        """
+        applied = []
+        for note_id, title, content in changes:
+            if title is None and content is None:
+                continue
+            # 回收站中的笔记不更新，避免待保存的编辑写入刚删除的笔记或分类
+            current_title = self._live_title(note_id)
+            if current_title is None:
+                continue
+            # 标题与正文都未变化的笔记不写入，避免仅浏览就刷新 updated_at、重写索引
+            if title == current_title:
+                title = None
+            if content is not None and not self._write_content(note_id, content):
+                content = None
+            if title is None and content is None:
+                continue
+            if title is not None:
+                sql = "UPDATE notes SET title = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?"
+                self.db.execute(sql, (title, note_id))
+                self._index_title(note_id, title)
+            else:
+                sql = "UPDATE notes SET updated_at = CURRENT_TIMESTAMP WHERE id = ?"
+                self.db.execute(sql, (note_id,))
+            if content is not None:
+                self._index_body(note_id, content)
+            applied.append((note_id, title, content))
+        self.db.commit()
 
-        if title is not None:
-            fields.append("title = ?")
-            params.append(title)
-        if content is not None:
-            fields.append("content = ?")
-            params.append(content)
+        for note_id, title, content in applied:
+            if title is not None:
+                self.events.publish(ModelEvents.NOTE_RENAMED, note_id=note_id, title=title)
+            if content is not None:
+                self.events.publish(ModelEvents.NOTE_CONTENT_UPDATED, note_id=note_id)
+        return [note_id for note_id, _, _ in applied]
 
-        if not fields:
-            return  # 无更新内容
+    def _live_title(self, note_id):
+        """笔记及其所属分类都不在回收站中时返回笔记标题，否则返回 None"""
+        rows = self.db.query("""
+            SELECT n.title FROM notes n
+            JOIN categories c ON c.id = n.category_id
+            WHERE n.id = ? AND n.deleted_at IS NULL AND c.deleted_at IS NULL
+        """, (note_id,))
+        return rows[0]['title'] if rows else None
+
+    def _write_content(self, note_id, content):
+        """
+        正文单独存放在 note_contents，标题行保持紧凑；同时更新正文引用的图片
+        正文经 content_codec 压缩后写入，format 列记录编码方式；长正文分块存放，只写入变化的块
+        写入前的正文作为差量基准记录历史版本，并更新 notes.content_size
+        返回正文是否发生变化
+        """
+        block_model = ContentBlockModel(self.db)
+        rows = self.db.query("SELECT content, format FROM note_contents WHERE note_id = ?", (note_id,))
+        old_fmt = rows[0]['format'] if rows else None
+        if content is not None and len(content) >= BLOCK_THRESHOLD:
+            hashes, blocks = block_model.split(content)
+        else:
+            hashes, blocks = None, {}
+        # 旧正文中与新正文相同的块直接取自新正文，只读取被改动的块
+        previous = self._read_content(old_fmt, rows[0]['content'], blocks) if rows else None
+        if previous == content:
+            return False
+        RevisionModel(self.db).record(note_id, content, previous)
+
+        if hashes is not None:
+            old_hashes = unpack_manifest(rows[0]['content']) if old_fmt == FORMAT_BLOCKS else ()
+            fmt, value = FORMAT_BLOCKS, block_model.store(note_id, hashes, blocks, old_hashes)
+        else:
+            if old_fmt == FORMAT_BLOCKS:
+                block_model.release(note_id)
+            fmt, value = encode_content(content)
+        sql = """
+            INSERT INTO note_contents (note_id, content, format) VALUES (?, ?, ?)
+            ON CONFLICT (note_id) DO UPDATE SET content = excluded.content, format = excluded.format
+        """
+        self.db.execute(sql, (note_id, value, fmt))
+        # 正文字符数供分类聚合统计，由触发器累加到所属分类
+        self.db.execute("UPDATE notes SET content_size = ? WHERE id = ?", (len(content or ""), note_id))
+        ImageModel(self.db).sync_note_refs(note_id, content)
+        return True
 
-        fields.append("updated_at = CURRENT_TIMESTAMP")
-        sql = f"UPDATE notes SET {', '.join(fields)} WHERE id = ?"
-        params.append(note_id)
-        self.db.execute(sql, tuple(params), commit=True)
+    def _read_content(self, fmt, value, known_blocks=None):
+        """还原 note_contents 中的正文；分块存放的正文按块清单拼接"""
+        if fmt == FORMAT_BLOCKS:
+            return ContentBlockModel(self.db).assemble(value, known_blocks)
+        return decode_content(fmt, value)
+
+    def _index_title(self, note_id, title, commit=False):
+        """同步全文索引中的标题，与笔记更新处于同一事务"""
+        sql = "UPDATE notes_fts SET title = ? WHERE rowid = ?"
+        self.db.execute(sql, (segment_cjk(title), note_id), commit=commit)
+
+    def _index_body(self, note_id, content, commit=False):
+        """
+        同步全文索引中的正文纯文本，与笔记更新处于同一事务
+        分块存放的长正文只记入 fts_pending，由 index_pending 在编辑停止后补写:
+        全文索引按行重建，长正文每次保存都重建会使保存耗时与 WAL 写入量随笔记长度增长
+        """
+        if content is not None and len(content) >= BLOCK_THRESHOLD:
+            self.db.execute("INSERT OR IGNORE INTO fts_pending (note_id) VALUES (?)", (note_id,), commit=commit)
+            return
+        sql = "UPDATE notes_fts SET body = ? WHERE rowid = ?"
+        self.db.execute(sql, (segment_cjk(html_to_text(content)), note_id))
+        self.db.execute("DELETE FROM fts_pending WHERE note_id = ?", (note_id,), commit=commit)
+
+    def index_pending(self, limit=None):
+        """
+        为延后索引的笔记补写全文索引中的正文，每篇一个事务，返回处理的笔记数
+        limit 为 None 时处理全部待索引的笔记
+        """
+        indexed = 0
+        last_id = 0
+        while limit is None or indexed < limit:
+            rows = self.db.query(
+                "SELECT note_id FROM fts_pending WHERE note_id > ? ORDER BY note_id LIMIT 1", (last_id,)
+            )
+            if not rows:
+                break
+            last_id = rows[0]['note_id']
+            note = self.get_by_id(last_id)
+            self.db.execute("UPDATE notes_fts SET body = ? WHERE rowid = ?",
+                            (segment_cjk(html_to_text(note.content if note else "")), last_id))
+            self.db.execute("DELETE FROM fts_pending WHERE note_id = ?", (last_id,), commit=True)
+            indexed += 1
+        return indexed
+
+    def search(self, query, limit=50, offset=0):
+        """
+        全文检索笔记标题与正文，按 bm25 相关度排序 (标题权重更高)
+        返回 [SearchResult, ...]，snippet 为带 <b> 高亮的 HTML 片段
+        """
+        match = build_match_query(query)
+        if match is None:
+            return []
+        sql = """
+            SELECT n.id, n.category_id, n.title,
+                   snippet(notes_fts, 1, char(2), char(3), '…', 16) AS snippet,
+                   notes_fts.rank AS rank
+            FROM notes_fts
+            JOIN notes n ON n.id = notes_fts.rowid
+            JOIN categories c ON c.id = n.category_id
+            WHERE notes_fts MATCH ? AND notes_fts.rank MATCH 'bm25(10.0, 1.0)'
+              AND n.deleted_at IS NULL AND c.deleted_at IS NULL
+            ORDER BY notes_fts.rank
+            LIMIT ? OFFSET ?
+        """
+        return self.db.query(
+            sql, (match, limit, offset),
+            record=lambda note_id, category_id, title, snippet, rank: SearchResult(
+                note_id, category_id, title, format_snippet(snippet), rank
+            )
+        )
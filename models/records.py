@@ -0,0 +1,105 @@
+# models/records.py
+"""
+模型返回的紧凑记录类型
+使用 __slots__，不带实例字典，内存占用接近 tuple，按属性名读取字段
+由 Database.query / iterate 的 record 参数直接从游标的原始行构造 (见 Database.query)
+"""
+
+
+class _Record:
+    __slots__ = ()
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+
+class Category(_Record):
+    """分类及其聚合统计: 笔记数、正文总字符数、最近修改时间 (由 notes 上的触发器维护)"""
+    __slots__ = ('id', 'name', 'note_count', 'total_size', 'last_updated')
+
+    def __init__(self, id, name, note_count=0, total_size=0, last_updated=None):
+        self.id = id
+        self.name = name
+        self.note_count = note_count
+        self.total_size = total_size
+        self.last_updated = last_updated
+
+
+class NoteHeader(_Record):
+    """笔记头信息，不含正文"""
+    __slots__ = ('id', 'category_id', 'title', 'updated_at', 'created_at')
+
+    def __init__(self, id, category_id, title, updated_at, created_at):
+        self.id = id
+        self.category_id = category_id
+        self.title = title
+        self.updated_at = updated_at
+        self.created_at = created_at
+
+
+class NoteEntry(_Record):
+    """分类内笔记列表的一行: id、标题与当前排序方式下的排序键，只读取覆盖索引中的列"""
+    __slots__ = ('id', 'title', 'sort_key')
+
+    def __init__(self, id, title, sort_key):
+        self.id = id
+        self.title = title
+        self.sort_key = sort_key
+
+
+class Note(_Record):
+    """
+    完整笔记，content 为解码后的 HTML
+    text 为正文纯文本，只在预取时填充，用于悬停预览
+    """
+    __slots__ = ('id', 'category_id', 'title', 'content', 'updated_at', 'text')
+
+    def __init__(self, id, category_id, title, content, updated_at, text=None):
+        self.id = id
+        self.category_id = category_id
+        self.title = title
+        self.content = content
+        self.updated_at = updated_at
+        self.text = text
+
+
+class SearchResult(_Record):
+    """全文检索结果，snippet 为带 <b> 高亮的 HTML 片段，rank 为 bm25 相关度 (越小越相关)"""
+    __slots__ = ('id', 'category_id', 'title', 'snippet', 'rank')
+
+    def __init__(self, id, category_id, title, snippet, rank):
+        self.id = id
+        self.category_id = category_id
+        self.title = title
+        self.snippet = snippet
+        self.rank = rank
+
+
+class TrashedNote(_Record):
+    """回收站中的笔记，category 为所属分类名"""
+    __slots__ = ('id', 'title', 'category', 'deleted_at')
+
+    def __init__(self, id, title, category, deleted_at):
+        self.id = id
+        self.title = title
+        self.category = category
+        self.deleted_at = deleted_at
+
+
+class TrashedCategory(_Record):
+    """回收站中的分类，note_count 为分类下的笔记数"""
+    __slots__ = ('id', 'name', 'note_count', 'deleted_at')
+
+    def __init__(self, id, name, note_count, deleted_at):
+        self.id = id
+        self.name = name
+        self.note_count = note_count
+        self.deleted_at = deleted_at
@@ -0,0 +1,256 @@
+# models/revision_model.py
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from models.image_model import extract_image_keys
+from utils.content_codec import decode_content, encode_content
+
+# 每隔多少个版本保存一次完整快照，重建任意版本最多应用 SNAPSHOT_INTERVAL - 1 个差量
+SNAPSHOT_INTERVAL = 20
+
+# 差量超过正文该比例时直接保存快照
+MAX_DELTA_RATIO = 0.5
+
+# 保留策略: [(最大年龄秒数, 分桶秒数), ...]，按年龄升序
+# 年龄不超过最大年龄的版本在每个分桶内只保留最新一个，分桶为 0 表示全部保留；
+# 比最后一档更旧的版本删除 (最后一档最大年龄为 None 表示永久保留)；最新版本始终保留
+DEFAULT_RETENTION = [
+    (24 * 3600, 0),            # 一天内: 全部保留
+    (7 * 24 * 3600, 3600),     # 一周内: 每小时一个
+    (90 * 24 * 3600, 86400),   # 90 天内: 每天一个
+]
+
+KIND_SNAPSHOT = 0
+KIND_DELTA = 1
+
+
+def _digest(content):
+    return hashlib.sha1(content.encode('utf-8')).digest()
+
+
+def make_delta(old, new):
+    """
+    计算 old → new 的差量 (公共前缀长度, 公共后缀长度, 中间替换的文本)
+    比较在 C 层按切片进行，写入的数据量只与修改的部分相关
+    """
+    limit = min(len(old), len(new))
+    # 二分查找最长公共前缀
+    low, high = 0, limit
+    while low < high:
+        mid = (low + high + 1) // 2
+        if old[:mid] == new[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    prefix = low
+    # 二分查找不与前缀重叠的最长公共后缀
+    low, high = 0, limit - prefix
+    while low < high:
+        mid = (low + high + 1) // 2
+        if old[len(old) - mid:] == new[len(new) - mid:]:
+            low = mid
+        else:
+            high = mid - 1
+    suffix = low
+    return prefix, suffix, new[prefix:len(new) - suffix]
+
+
+def apply_delta(old, prefix, suffix, inserted):
+    return old[:prefix] + inserted + (old[len(old) - suffix:] if suffix else "")
+
+
+def _parse_time(value):
+    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+
+
+def select_retained(revisions, now, retention=DEFAULT_RETENTION):
+    """
+    revisions: [(revision, created_at_秒), ...] 按版本号升序
+    返回需要保留的版本号集合
+    """
+    if not revisions:
+        return set()
+    keep = {revisions[-1][0]}
+    buckets = set()
+    for revision, created in reversed(revisions):
+        age = now - created
+        for max_age, bucket in retention:
+            if max_age is None or age <= max_age:
+                if bucket == 0:
+                    keep.add(revision)
+                else:
+                    key = (max_age, int(created // bucket))
+                    if key not in buckets:
+                        buckets.add(key)
+                        keep.add(revision)
+                break
+    return keep
+
+
+class RevisionModel:
+    """
+    笔记历史版本：每次保存正文时记录一个版本
+    每 SNAPSHOT_INTERVAL 个版本保存一次完整快照 (经 content_codec 压缩)，其余版本只保存与上一版本的差量
+    版本中引用的图片记录在 revision_images，图片回收时跳过；记录只增不减，随笔记物理删除一并清理
+    """
+
+    def __init__(self, db, events=None, snapshot_interval=SNAPSHOT_INTERVAL, retention=DEFAULT_RETENTION):
+        self.db = db
+        self.events = events
+        self.snapshot_interval = snapshot_interval
+        self.retention = retention
+
+    def record(self, note_id, content, previous=None):
+        """
+        记录新版本，与正文写入处于同一事务 (不提交)
+        previous: 写入前的正文；与最新版本一致时保存差量，否则保存快照
+        笔记还没有任何版本 (如升级前创建的笔记) 时，previous 先作为基准快照保存，编辑前的正文不会丢失
+        返回新版本号，内容未变化时返回 None
+        """
+        digest = _digest(content)
+        latest = self.db.query("""
+            SELECT revision, chain, digest FROM note_revisions
+            WHERE note_id = ? ORDER BY revision DESC LIMIT 1
+        """, (note_id,))
+        if latest:
+            last_revision, chain, last_digest = latest[0]
+        elif previous:
+            last_revision, chain, last_digest = 1, 0, _digest(previous)
+            self._insert_snapshot(note_id, last_revision, previous, last_digest)
+            self._pin_images(note_id, previous)
+        else:
+            last_revision = chain = last_digest = None
+        if last_digest == digest:
+            return None
+        revision = last_revision + 1 if last_revision is not None else 1
+
+        delta = None
+        if last_digest is not None and previous is not None and chain + 1 < self.snapshot_interval \
+                and last_digest == _digest(previous):
+            delta = make_delta(previous, content)
+            if len(delta[2]) > len(content) * MAX_DELTA_RATIO:
+                delta = None
+        if delta is not None:
+            prefix, suffix, inserted = delta
+            self.db.execute("""
+                INSERT INTO note_revisions (note_id, revision, kind, chain, prefix, suffix, format, data, size, digest)
+                VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?, ?)
+            """, (note_id, revision, KIND_DELTA, chain + 1, prefix, suffix, inserted, len(content), digest))
+        else:
+            self._insert_snapshot(note_id, revision, content, digest)
+            # 每到新快照时顺带按保留策略清理旧版本，摊销清理开销
+            if latest:
+                self.thin(note_id)
+        self._pin_images(note_id, content)
+        return revision
+
+    def list(self, note_id):
+        """返回 [{'revision', 'created_at', 'size'}]，最新版本在前"""
+        return self.db.query("""
+            SELECT revision, created_at, size FROM note_revisions
+            WHERE note_id = ? ORDER BY revision DESC
+        """, (note_id,))
+
+    def get_content(self, note_id, revision):
+        """重建指定版本的正文：从不晚于该版本的最近快照开始依次应用差量"""
+        rows = self.db.query("""
+            SELECT revision, kind, prefix, suffix, format, data FROM note_revisions
+            WHERE note_id = ? AND revision <= ? AND revision >= (
+                SELECT MAX(revision) FROM note_revisions
+                WHERE note_id = ? AND revision <= ? AND kind = 0
+            )
+            ORDER BY revision
+        """, (note_id, revision, note_id, revision))
+        if not rows or rows[-1]['revision'] != revision:
+            return None
+        return self._replay(rows)
+
+    def thin(self, note_id, now=None):
+        """
+        按保留策略删除旧版本，返回删除数量
+        被删除版本之后的版本会重新编码 (差量的基准发生了变化)，版本号与时间保持不变
+        """
+        now = time.time() if now is None else now
+        rows = self.db.query(
+            "SELECT revision, created_at FROM note_revisions WHERE note_id = ? ORDER BY revision",
+            (note_id,)
+        )
+        keep = select_retained([(row['revision'], _parse_time(row['created_at'])) for row in rows],
+                               now, self.retention)
+        dropped = [row['revision'] for row in rows if row['revision'] not in keep]
+        if not dropped:
+            return 0
+        first_dropped = dropped[0]
+        # 重建从首个被删除版本开始的全部保留版本
+        history = self.db.query("""
+            SELECT revision, kind, prefix, suffix, format, data, created_at FROM note_revisions
+            WHERE note_id = ? AND revision >= (
+                SELECT MAX(revision) FROM note_revisions
+                WHERE note_id = ? AND revision <= ? AND kind = 0
+            )
+            ORDER BY revision
+        """, (note_id, note_id, first_dropped))
+        rebuilt = []
+        content = None
+        for row in history:
+            content = self._replay([row], content)
+            if row['revision'] >= first_dropped and row['revision'] in keep:
+                rebuilt.append((row['revision'], row['created_at'], content))
+
+        self.db.execute("DELETE FROM note_revisions WHERE note_id = ? AND revision >= ?", (note_id, first_dropped))
+        base = self.db.query("""
+            SELECT chain FROM note_revisions WHERE note_id = ? ORDER BY revision DESC LIMIT 1
+        """, (note_id,))
+        chain = base[0]['chain'] if base else None
+        previous = self.get_content(note_id, self._latest_revision(note_id)) if base else None
+        for revision, created_at, content in rebuilt:
+            delta = None
+            if previous is not None and chain + 1 < self.snapshot_interval:
+                delta = make_delta(previous, content)
+                if len(delta[2]) > len(content) * MAX_DELTA_RATIO:
+                    delta = None
+            if delta is None:
+                self._insert_snapshot(note_id, revision, content, _digest(content), created_at)
+                chain = 0
+            else:
+                chain += 1
+                self.db.execute("""
+                    INSERT INTO note_revisions
+                        (note_id, revision, kind, chain, prefix, suffix, format, data, size, digest, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?)
+                """, (note_id, revision, KIND_DELTA, chain, delta[0], delta[1], delta[2],
+                      len(content), _digest(content), created_at))
+            previous = content
+        return len(dropped)
+
+    def _pin_images(self, note_id, content):
+        keys = extract_image_keys(content)
+        if not keys:
+            return
+        placeholders = ", ".join("?" for _ in keys)
+        self.db.execute(f"""
+            INSERT OR IGNORE INTO revision_images (note_id, image_id)
+            SELECT ?, id FROM images WHERE hash IN ({placeholders})
+        """, (note_id, *keys))
+
+    def _latest_revision(self, note_id):
+        rows = self.db.query("SELECT MAX(revision) FROM note_revisions WHERE note_id = ?", (note_id,))
+        return rows[0][0]
+
+    def _insert_snapshot(self, note_id, revision, content, digest, created_at=None):
+        fmt, value = encode_content(content)
+        self.db.execute("""
+            INSERT INTO note_revisions
+                (note_id, revision, kind, chain, prefix, suffix, format, data, size, digest, created_at)
+            VALUES (?, ?, ?, 0, 0, 0, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+        """, (note_id, revision, KIND_SNAPSHOT, fmt, value, len(content), digest, created_at))
+
+    @staticmethod
+    def _replay(rows, content=None):
+        for row in rows:
+            if row['kind'] == KIND_SNAPSHOT:
+                content = decode_content(row['format'], row['data'])
+            else:
+                content = apply_delta(content, row['prefix'], row['suffix'], row['data'])
+        return content
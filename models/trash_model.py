@@ -0,0 +1,114 @@
+# models/trash_model.py
+import time
+
+from models.events import ModelEvents
+from models.note_model import NoteModel
+from models.records import TrashedCategory, TrashedNote
+
+# 回收站保留天数，过期后由清理任务物理删除
+RETENTION_DAYS = 30
+# 每个清理事务最多删除的笔记数；批与批之间释放写锁，不阻塞编辑保存
+PURGE_BATCH_SIZE = 200
+# 每次增量回收归还给文件系统的页数
+VACUUM_PAGES = 1000
+
+
+class TrashModel:
+    """
+    回收站: CategoryModel.delete / NoteModel.delete 只标记 deleted_at，这里负责浏览、恢复与分批物理删除
+    物理删除由外键级联清理正文、图片引用、历史版本与正文块；全文索引不参与级联，随同删除
+    """
+
+    def __init__(self, db, events=None):
+        self.db = db
+        self.events = events if events is not None else ModelEvents()
+
+    def list_notes(self, limit=500):
+        """回收站中的笔记 (不含随分类删除的笔记)，按删除时间倒序: [TrashedNote, ...]"""
+        sql = """
+            SELECT n.id, n.title, c.name AS category, n.deleted_at
+            FROM notes n
+            JOIN categories c ON c.id = n.category_id
+            WHERE n.deleted_at IS NOT NULL
+            ORDER BY n.deleted_at DESC
+            LIMIT ?
+        """
+        return self.db.query(sql, (limit,), record=TrashedNote)
+
+    def list_categories(self):
+        """回收站中的分类，按删除时间倒序: [TrashedCategory, ...]"""
+        sql = """
+            SELECT id, name, note_count, deleted_at FROM categories
+            WHERE deleted_at IS NOT NULL
+            ORDER BY deleted_at DESC
+        """
+        return self.db.query(sql, record=TrashedCategory)
+
+    def restore_note(self, note_id):
+        """恢复笔记；所属分类也在回收站中时一并恢复"""
+        header = NoteModel(self.db).get_header(note_id)
+        if header is None:
+            return
+        self.restore_category(header.category_id)
+        cursor = self.db.execute(
+            "UPDATE notes SET deleted_at = NULL WHERE id = ? AND deleted_at IS NOT NULL", (note_id,), commit=True
+        )
+        if cursor.rowcount:
+            self.events.publish(ModelEvents.NOTE_ADDED, note_id=note_id,
+                                category_id=header.category_id, title=header.title)
+
+    def restore_category(self, category_id):
+        cursor = self.db.execute(
+            "UPDATE categories SET deleted_at = NULL WHERE id = ? AND deleted_at IS NOT NULL",
+            (category_id,), commit=True
+        )
+        if cursor.rowcount:
+            name = self.db.query("SELECT name FROM categories WHERE id = ?", (category_id,))[0]['name']
+            self.events.publish(ModelEvents.CATEGORY_ADDED, category_id=category_id, name=name)
+
+    def purge_step(self, older_than_days=RETENTION_DAYS, batch_size=PURGE_BATCH_SIZE):
+        """
+        在一个短事务中物理删除最多 batch_size 篇过期笔记，返回删除的行数 (笔记 + 分类)，0 表示已清理完毕
+        先删除单独删除的笔记，再逐个清空过期分类下的笔记，分类清空后删除分类本身
+        older_than_days 为 0 时清空整个回收站
+        """
+        # deleted_at 由 CURRENT_TIMESTAMP 写入，为 UTC 时间
+        cutoff = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(time.time() - older_than_days * 86400))
+        # 查找与删除在同一写事务中，避免期间被恢复的条目被删除
+        self.db.conn.execute("BEGIN IMMEDIATE")
+        try:
+            removed = self._purge_batch(cutoff, batch_size)
+            self.db.commit()
+        except BaseException:
+            self.db.conn.rollback()
+            raise
+        return removed
+
+    def _purge_batch(self, cutoff, batch_size):
+        rows = self.db.query("""
+            SELECT id FROM notes
+            WHERE deleted_at IS NOT NULL AND deleted_at <= ?
+            LIMIT ?
+        """, (cutoff, batch_size))
+        if not rows:
+            categories = self.db.query("""
+                SELECT id FROM categories
+                WHERE deleted_at IS NOT NULL AND deleted_at <= ?
+                LIMIT 1
+            """, (cutoff,))
+            if not categories:
+                return 0
+            category_id = categories[0]['id']
+            rows = self.db.query("SELECT id FROM notes WHERE category_id = ? LIMIT ?", (category_id, batch_size))
+            if not rows:
+                self.db.execute("DELETE FROM categories WHERE id = ?", (category_id,))
+                return 1
+        ids = [row['id'] for row in rows]
+        placeholders = ", ".join("?" for _ in ids)
+        self.db.execute(f"DELETE FROM notes_fts WHERE rowid IN ({placeholders})", ids)
+        self.db.execute(f"DELETE FROM notes WHERE id IN ({placeholders})", ids)
+        return len(ids)
+
+    def reclaim_space(self, pages=VACUUM_PAGES):
+        """把物理删除后空出的页分批归还给文件系统，返回本次释放的页数，0 表示没有可释放的页"""
+        return self.db.incremental_vacuum(pages)
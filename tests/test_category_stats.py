@@ -0,0 +1,92 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from db.database import Database
+from models.category_model import CategoryModel
+from models.note_model import NoteModel
+from models.trash_model import TrashModel
+
+
+class CategoryStatsTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.db = Database(os.path.join(self.workdir, "notes.db"))
+        self.category_model = CategoryModel(self.db)
+        self.note_model = NoteModel(self.db)
+        self.trash_model = TrashModel(self.db)
+        self.first = self.category_model.add("c")
+        self.second = self.category_model.add("d")
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def stats(self, category_id):
+        category = self.category_model.get_by_id(category_id)
+        return category.note_count, category.total_size
+
+    def assertConsistent(self):
+        self.assertEqual(self.category_model.check_stats(), [])
+
+    def test_stats_follow_each_operation(self):
+        note_id = self.note_model.add(self.first, "A")
+        self.assertEqual(self.stats(self.first), (1, 0))
+        self.note_model.update_content(note_id, "<p>12345</p>")
+        self.assertEqual(self.stats(self.first), (1, len("<p>12345</p>")))
+        self.assertConsistent()
+
+        self.note_model.move(note_id, self.second)
+        self.assertEqual(self.stats(self.first), (0, 0))
+        self.assertEqual(self.stats(self.second), (1, len("<p>12345</p>")))
+        self.assertConsistent()
+
+        self.note_model.delete(note_id)
+        self.assertEqual(self.stats(self.second), (0, 0))
+        self.assertConsistent()
+        self.trash_model.restore_note(note_id)
+        self.assertEqual(self.stats(self.second), (1, len("<p>12345</p>")))
+        self.assertConsistent()
+
+        # 随分类移入回收站的笔记：分类本身的统计保持不变，恢复后仍然正确
+        self.category_model.delete(self.second)
+        self.assertConsistent()
+        self.trash_model.restore_category(self.second)
+        self.assertEqual(self.stats(self.second), (1, len("<p>12345</p>")))
+        self.assertConsistent()
+
+        self.note_model.delete(note_id)
+        while self.trash_model.purge_step(older_than_days=0):
+            pass
+        self.assertEqual(self.stats(self.second), (0, 0))
+        self.assertConsistent()
+
+    def test_random_operations_keep_stats_consistent(self):
+        rng = random.Random(23)
+        categories = [self.first, self.second, self.category_model.add("e")]
+        notes = []
+        for step in range(300):
+            action = rng.choice(("add", "update", "rename", "move", "delete", "restore"))
+            if action == "add" or not notes:
+                notes.append(self.note_model.add(rng.choice(categories), f"笔记 {step}"))
+            elif action == "update":
+                self.note_model.update_content(rng.choice(notes), "<p>" + "字" * rng.randint(0, 200) + "</p>")
+            elif action == "rename":
+                self.note_model.rename(rng.choice(notes), f"改名 {step}")
+            elif action == "move":
+                self.note_model.move(rng.choice(notes), rng.choice(categories))
+            elif action == "delete":
+                self.note_model.delete(rng.choice(notes))
+            else:
+                self.trash_model.restore_note(rng.choice(notes))
+        self.assertConsistent()
+
+        while self.trash_model.purge_step(older_than_days=0):
+            pass
+        self.assertConsistent()
+
+
+if __name__ == "__main__":
+    unittest.main()
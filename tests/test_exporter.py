@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from db.database import Database
+from db.exporter import export_notes
+from models.category_model import CategoryModel
+from models.image_model import ImageModel, image_url
+from models.note_model import NoteModel
+from models.trash_model import TrashModel
+
+
+class _ExportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.db = Database(os.path.join(self.workdir, "notes.db"))
+        category_id = CategoryModel(self.db).add("c")
+        self.note_model = NoteModel(self.db)
+        self.image_key = ImageModel(self.db).put(b"\x89PNG test", "image/png", 1, 1)
+        self.note_a = self.note_model.add(category_id, "A")
+        self.note_model.update(self.note_a, content=f'<p>a <img src="{image_url(self.image_key)}" /></p>')
+        self.note_b = self.note_model.add(category_id, "B")
+        self.note_model.update(self.note_b, content="<p>b</p>")
+        # A 的修改时间早于上次导出，增量导出时只有 B 需要重新导出
+        self.db.execute("UPDATE notes SET updated_at = '2000-01-01 00:00:00' WHERE id = ?",
+                        (self.note_a,), commit=True)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class ZipIncrementalExportTest(_ExportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.target = os.path.join(self.workdir, "out.zip")
+
+    def test_incremental_keeps_unchanged_entries(self):
+        export_notes(self.db, self.target, archive=True, workers=1)
+        self.note_model.update(self.note_b, content="<p>b2</p>")
+        exported, _, _ = export_notes(self.db, self.target, archive=True, incremental=True, workers=1)
+        self.assertEqual(exported, 1)
+
+        with zipfile.ZipFile(self.target) as archive:
+            names = set(archive.namelist())
+            self.assertEqual(names, {"c/A.html", "c/B.html", "images/" + self.image_key + ".png"})
+            self.assertIn("../images/" + self.image_key + ".png", archive.read("c/A.html").decode())
+            self.assertIn("b2", archive.read("c/B.html").decode())
+            self.assertEqual(archive.read("images/" + self.image_key + ".png"), b"\x89PNG test")
+        self.assertFalse(os.path.exists(self.target + ".tmp"))
+
+    def test_incremental_removes_deleted_notes(self):
+        export_notes(self.db, self.target, archive=True, workers=1)
+        self.note_model.delete(self.note_b)
+        _, _, removed = export_notes(self.db, self.target, archive=True, incremental=True, workers=1)
+        self.assertEqual(removed, 1)
+        with zipfile.ZipFile(self.target) as archive:
+            self.assertNotIn("c/B.html", archive.namelist())
+            self.assertIn("c/A.html", archive.namelist())
+
+
+class DirectoryIncrementalExportTest(_ExportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.target = os.path.join(self.workdir, "out")
+
+    def test_restored_note_is_exported_again(self):
+        export_notes(self.db, self.target, workers=1)
+        self.note_model.delete(self.note_a)
+        export_notes(self.db, self.target, incremental=True, workers=1)
+        self.assertFalse(os.path.exists(os.path.join(self.target, "c", "A.html")))
+
+        TrashModel(self.db).restore_note(self.note_a)
+        export_notes(self.db, self.target, incremental=True, workers=1)
+        self.assertTrue(os.path.exists(os.path.join(self.target, "c", "A.html")))
+
+    def test_restored_category_notes_are_exported_again(self):
+        category_id = self.note_model.get_header(self.note_a).category_id
+        export_notes(self.db, self.target, workers=1)
+        CategoryModel(self.db).delete(category_id)
+        _, _, removed = export_notes(self.db, self.target, incremental=True, workers=1)
+        self.assertEqual(removed, 2)
+
+        TrashModel(self.db).restore_category(category_id)
+        export_notes(self.db, self.target, incremental=True, workers=1)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.target, "c"))), ["A.html", "B.html"])
+
+    def test_renamed_category_notes_move_to_new_folder(self):
+        category_id = self.note_model.get_header(self.note_a).category_id
+        export_notes(self.db, self.target, workers=1)
+        CategoryModel(self.db).rename(category_id, "new")
+        exported, _, _ = export_notes(self.db, self.target, incremental=True, workers=1)
+        self.assertEqual(exported, 2)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.target, "new"))), ["A.html", "B.html"])
+        self.assertEqual(os.listdir(os.path.join(self.target, "c")), [])
+
+    def test_unchanged_notes_are_not_exported_again(self):
+        # B 的修改时间恰好是上次导出的最大 updated_at
+        self.db.execute("UPDATE notes SET updated_at = '2000-01-01 00:00:01' WHERE id = ?",
+                        (self.note_b,), commit=True)
+        export_notes(self.db, self.target, workers=1)
+        exported, _, _ = export_notes(self.db, self.target, incremental=True, workers=1)
+        self.assertEqual(exported, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
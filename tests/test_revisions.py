@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from db.database import Database
+from models.category_model import CategoryModel
+from models.image_model import ImageModel, image_url
+from models.note_model import NoteModel
+from models.revision_model import (
+    KIND_DELTA, KIND_SNAPSHOT, SNAPSHOT_INTERVAL, RevisionModel, select_retained
+)
+
+
+class _RevisionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.db = Database(os.path.join(self.workdir, "notes.db"))
+        self.note_model = NoteModel(self.db)
+        self.note_id = self.note_model.add(CategoryModel(self.db).add("c"), "A")
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def save_versions(self, count):
+        """保存 count 个版本，每个版本在不同位置修改一处，返回按版本号排列的正文"""
+        paragraphs = [f"<p>段落 {i}</p>" for i in range(50)]
+        contents = []
+        for i in range(count):
+            paragraphs[(i * 7) % len(paragraphs)] = f"<p>段落 {i} 第 {i} 次修改</p>"
+            content = "".join(paragraphs)
+            self.note_model.update_content(self.note_id, content)
+            contents.append(content)
+        return contents
+
+    def kinds(self):
+        rows = self.db.query("SELECT kind FROM note_revisions WHERE note_id = ? ORDER BY revision", (self.note_id,))
+        return [row['kind'] for row in rows]
+
+
+class RevisionReconstructionTest(_RevisionTestCase):
+    def test_every_revision_is_rebuilt_from_snapshot_and_deltas(self):
+        contents = self.save_versions(SNAPSHOT_INTERVAL * 2 + 5)
+        kinds = self.kinds()
+        self.assertEqual(len(kinds), len(contents))
+        self.assertEqual(kinds.count(KIND_SNAPSHOT), 3)
+        self.assertEqual(kinds[SNAPSHOT_INTERVAL], KIND_SNAPSHOT)
+        self.assertEqual(kinds[SNAPSHOT_INTERVAL + 1], KIND_DELTA)
+
+        revision_model = RevisionModel(self.db)
+        for revision, content in enumerate(contents, start=1):
+            self.assertEqual(revision_model.get_content(self.note_id, revision), content)
+        self.assertIsNone(revision_model.get_content(self.note_id, len(contents) + 1))
+
+    def test_content_without_history_becomes_the_base_snapshot(self):
+        self.note_model.update_content(self.note_id, "<p>升级前的正文</p>")
+        self.db.execute("DELETE FROM note_revisions WHERE note_id = ?", (self.note_id,), commit=True)
+        self.note_model.update_content(self.note_id, "<p>升级后的修改</p>")
+
+        revision_model = RevisionModel(self.db)
+        self.assertEqual(revision_model.get_content(self.note_id, 1), "<p>升级前的正文</p>")
+        self.assertEqual(revision_model.get_content(self.note_id, 2), "<p>升级后的修改</p>")
+
+    def test_images_of_old_revisions_are_not_collected(self):
+        image_model = ImageModel(self.db)
+        key = image_model.put(b"\x89PNG test", "image/png", 1, 1)
+        self.note_model.update_content(self.note_id, f'<p><img src="{image_url(key)}" /></p>')
+        self.note_model.update_content(self.note_id, "<p>图片已删除</p>")
+        self.db.execute("UPDATE images SET created_at = '2000-01-01 00:00:00'", commit=True)
+
+        self.assertEqual(image_model.collect_garbage(), 0)
+        self.assertIsNotNone(image_model.get(key))
+
+
+class RevisionThinningTest(_RevisionTestCase):
+    RETENTION = [(6 * 3600, 0), (None, 6 * 3600)]
+
+    def test_thin_keeps_policy_revisions_and_rebuilds_deltas(self):
+        contents = self.save_versions(30)
+        # 版本 r 创建于 (30 - r) 小时前: 6 小时内全部保留，更早的每 6 小时保留最新一个
+        now = int(time.time())
+        created = {revision: now - (30 - revision) * 3600 for revision in range(1, 31)}
+        for revision, seconds in created.items():
+            self.db.execute("UPDATE note_revisions SET created_at = ? WHERE note_id = ? AND revision = ?",
+                            (time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(seconds)), self.note_id, revision))
+        self.db.commit()
+        expected = select_retained(sorted(created.items()), now, self.RETENTION)
+
+        revision_model = RevisionModel(self.db, retention=self.RETENTION)
+        removed = revision_model.thin(self.note_id, now=now)
+        self.db.commit()
+
+        remaining = [row['revision'] for row in revision_model.list(self.note_id)]
+        self.assertEqual(removed, 30 - len(expected))
+        self.assertGreater(removed, 0)
+        self.assertEqual(set(remaining), expected)
+        self.assertTrue(set(range(24, 31)).issubset(remaining))
+        self.assertEqual(self.kinds()[0], KIND_SNAPSHOT)
+        self.assertIn(KIND_DELTA, self.kinds())
+        for revision in remaining:
+            self.assertEqual(revision_model.get_content(self.note_id, revision), contents[revision - 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
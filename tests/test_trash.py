@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from db.database import Database
+from models.category_model import CategoryModel
+from models.note_model import NoteModel
+from models.trash_model import TrashModel
+
+
+class _TrashTestCase(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.db = Database(os.path.join(self.workdir, "notes.db"))
+        self.category_model = CategoryModel(self.db)
+        self.note_model = NoteModel(self.db)
+        self.category_id = self.category_model.add("c")
+        self.other_category_id = self.category_model.add("d")
+        self.note_id = self.note_model.add(self.category_id, "A")
+        self.note_model.update(self.note_id, content="<p>a</p>")
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class TrashedCategoryWriteTest(_TrashTestCase):
+    def test_saves_into_trashed_category_are_skipped(self):
+        self.category_model.delete(self.category_id)
+        applied = self.note_model.update_many([(self.note_id, "A2", "<p>a2</p>")])
+        self.note_model.update_content(self.note_id, "<p>a3</p>")
+        self.assertEqual(applied, [])
+        note = self.note_model.get_by_id(self.note_id)
+        self.assertEqual((note.title, note.content), ("A", "<p>a</p>"))
+
+    def test_move_into_trashed_category_is_rejected(self):
+        self.category_model.delete(self.other_category_id)
+        self.note_model.move(self.note_id, self.other_category_id)
+        self.assertEqual(self.note_model.get_header(self.note_id).category_id, self.category_id)
+
+
+class PurgeTest(_TrashTestCase):
+    def setUp(self):
+        super().setUp()
+        self.trash_model = TrashModel(self.db)
+        # 分块存放的长正文，物理删除时块也随引用一起删除
+        self.note_ids = [self.note_model.add(self.category_id, f"N{i}") for i in range(25)]
+        for note_id in self.note_ids:
+            self.note_model.update_content(
+                note_id, "".join(f"<p>笔记 {note_id} 段落 {i * note_id} {'内容' * 40}</p>\n" for i in range(400))
+            )
+
+    def count(self, table):
+        return self.db.query(f"SELECT COUNT(*) FROM {table}")[0][0]
+
+    def age(self, days):
+        """把回收站中条目的删除时间提前 days 天"""
+        modifier = f"-{days} days"
+        self.db.execute("UPDATE notes SET deleted_at = datetime(deleted_at, ?) WHERE deleted_at IS NOT NULL",
+                        (modifier,))
+        self.db.execute("UPDATE categories SET deleted_at = datetime(deleted_at, ?) WHERE deleted_at IS NOT NULL",
+                        (modifier,), commit=True)
+
+    def test_purge_removes_expired_notes_in_batches(self):
+        for note_id in self.note_ids[:20]:
+            self.note_model.delete(note_id)
+        self.age(31)
+        self.note_model.delete(self.note_ids[20])  # 刚删除，未过保留期
+
+        steps = []
+        while True:
+            removed = self.trash_model.purge_step(batch_size=8)
+            if not removed:
+                break
+            steps.append(removed)
+        self.assertEqual(steps, [8, 8, 4])
+
+        remaining = {row['id'] for row in self.db.query("SELECT id FROM notes")}
+        self.assertEqual(remaining, {self.note_id, *self.note_ids[20:]})
+        self.assertEqual(self.count("notes_fts"), len(remaining))
+        self.assertEqual(self.count("note_contents"), len(remaining))
+        self.assertEqual(self.db.query("SELECT COUNT(DISTINCT note_id) FROM note_revisions")[0][0], len(remaining))
+        self.assertEqual(self.db.query("SELECT COUNT(DISTINCT note_id) FROM note_blocks")[0][0], 5)
+        self.assertEqual(self.category_model.check_stats(), [])
+
+    def test_purge_empties_trashed_category_then_removes_it(self):
+        self.category_model.delete(self.category_id)
+        self.assertEqual(self.trash_model.purge_step(), 0)  # 未过保留期
+        self.age(31)
+        while self.trash_model.purge_step(batch_size=10):
+            pass
+        self.assertEqual(self.count("notes"), 0)
+        self.assertEqual(self.count("content_blocks"), 0)
+        self.assertEqual([c.id for c in self.trash_model.list_categories()], [])
+        self.assertEqual([c.id for c in self.category_model.get_all()], [self.other_category_id])
+
+    def test_reclaim_space_returns_freed_pages_in_steps(self):
+        self.assertEqual(self.db.auto_vacuum, 2)
+        for note_id in self.note_ids:
+            self.note_model.delete(note_id)
+        while self.trash_model.purge_step(older_than_days=0):
+            pass
+        self.db.checkpoint('TRUNCATE')
+        free = self.db.free_pages()
+        self.assertGreater(free, 20)
+
+        size = os.path.getsize(self.db.db_path)
+        self.assertEqual(self.trash_model.reclaim_space(pages=10), 10)
+        self.assertEqual(self.db.free_pages(), free - 10)
+        while self.trash_model.reclaim_space(pages=10):
+            pass
+        self.assertEqual(self.db.free_pages(), 0)
+        self.db.checkpoint('TRUNCATE')
+        self.assertLess(os.path.getsize(self.db.db_path), size)
+        self.assertEqual(self.db.query("PRAGMA integrity_check")[0][0], "ok")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from db.executor import DatabaseExecutor
+
+
+class AsyncDatabase(QObject):
+    """
+    DatabaseExecutor 的 Qt 封装
+    模型调用在后台线程执行，结果回调与模型变更事件都投递回 GUI 线程
+    """
+    # 模型变更事件 (event, payload)，在 GUI 线程触发
+    model_event = pyqtSignal(str, object)
+    # 内部信号：(future, on_result, on_error)，跨线程时自动排队到 GUI 线程
+    _future_done = pyqtSignal(object, object, object)
+
+    def __init__(self, db, events, read_workers=2, parent=None):
+        super().__init__(parent)
+        self.events = events
+        self.executor = DatabaseExecutor(db.db_path, events, read_workers)
+        self._future_done.connect(self._deliver)
+        # 任意线程发布的事件都经由信号转发，GUI 线程内发布时为直接调用
+        events.subscribe(self._forward_event)
+
+    def read(self, fn, *args, on_result=None, on_error=None):
+        return self._watch(self.executor.submit_read(fn, *args), on_result, on_error)
+
+    def write(self, fn, *args, on_result=None, on_error=None):
+        return self._watch(self.executor.submit_write(fn, *args), on_result, on_error)
+
+    def call(self, model_cls, method, *args, write=False, on_result=None, on_error=None):
+        """异步调用模型方法，例如 call(NoteModel, 'search', query, on_result=...)"""
+        future = self.executor.call_model(model_cls, method, *args, write=write)
+        return self._watch(future, on_result, on_error)
+
+    def shutdown(self):
+        """等待已提交的写操作完成后关闭"""
+        self.events.unsubscribe(self._forward_event)
+        self.executor.shutdown(wait=True)
+
+    def _watch(self, future, on_result, on_error):
+        future.add_done_callback(lambda done: self._future_done.emit(done, on_result, on_error))
+        return future
+
+    def _deliver(self, future, on_result, on_error):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            if on_error is not None:
+                on_error(error)
+            else:
+                print(f"[AsyncDatabase] 后台数据库操作失败: {error}")
+        elif on_result is not None:
+            on_result(future.result())
+
+    def _forward_event(self, event, payload):
+        self.model_event.emit(event, payload)
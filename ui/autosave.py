@@ -0,0 +1,110 @@
+import hashlib
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from models.note_model import NoteModel
+
+
+class AutosaveController(QObject):
+    """
+    自动保存：编辑停止一段时间后序列化一次当前笔记并在后台写线程保存
+    内容哈希与上次保存相同时跳过写入；写入进行中产生的保存按笔记合并，
+    下一次写入在同一事务中提交全部待保存笔记
+    """
+    # 状态变化：PENDING / SAVING / SAVED / FAILED
+    state_changed = pyqtSignal(str)
+
+    PENDING = 'pending'
+    SAVING = 'saving'
+    SAVED = 'saved'
+    FAILED = 'failed'
+
+    def __init__(self, async_db, snapshot, delay_ms=1500, parent=None):
+        """
+        snapshot: 返回当前编辑内容 (note_id, title, content) 的函数，无可保存笔记时返回 None
+        """
+        super().__init__(parent)
+        self.async_db = async_db
+        self.snapshot = snapshot
+        self.state = self.SAVED
+        self._pending = {}       # note_id -> (title, content, digest)，等待写入
+        self._in_flight = None   # 正在写入的一批，结构同 _pending
+        self._saved_digests = {}  # note_id -> 最近一次已保存 (或已提交写入) 内容的哈希
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self.flush)
+
+    @property
+    def has_pending(self):
+        return self._timer.isActive() or bool(self._pending) or self._in_flight is not None
+
+    @property
+    def pending_note_ids(self):
+        """等待写入 (尚未提交给写线程) 的笔记 id"""
+        return list(self._pending)
+
+    def schedule(self):
+        """编辑器内容变化时调用，重新开始防抖计时"""
+        self._timer.start()
+        self._set_state(self.PENDING)
+
+    def flush(self):
+        """立即序列化当前笔记并提交保存 (切换笔记、手动保存、关闭窗口前调用)"""
+        self._timer.stop()
+        snapshot = self.snapshot()
+        if snapshot is not None:
+            note_id, title, content = snapshot
+            digest = self._digest(title, content)
+            if self._saved_digests.get(note_id) != digest:
+                self._pending[note_id] = (title, content, digest)
+                self._saved_digests[note_id] = digest
+        self._write_pending()
+        if not self.has_pending and self.state != self.FAILED:
+            self._set_state(self.SAVED)
+
+    def mark_saved(self, note_id, title, content):
+        """打开笔记时记录从数据库读到的内容哈希，编辑后改回原样的笔记不会被写回"""
+        if note_id in self._pending or (self._in_flight is not None and note_id in self._in_flight):
+            return  # 读到的可能是写入前的旧内容
+        self._saved_digests[note_id] = self._digest(title, content)
+
+    def discard(self, note_id):
+        """笔记被删除时丢弃其待保存内容"""
+        self._pending.pop(note_id, None)
+        self._saved_digests.pop(note_id, None)
+
+    @staticmethod
+    def _digest(title, content):
+        return hashlib.sha1(f"{title}\0{content}".encode('utf-8')).digest()
+
+    def _write_pending(self):
+        if self._in_flight is not None or not self._pending:
+            return
+        self._in_flight, self._pending = self._pending, {}
+        changes = [(note_id, title, content) for note_id, (title, content, _) in self._in_flight.items()]
+        self._set_state(self.SAVING)
+        self.async_db.call(NoteModel, 'update_many', changes, write=True,
+                           on_result=self._on_written, on_error=self._on_write_failed)
+
+    def _on_written(self, _):
+        self._in_flight = None
+        if self._pending:
+            self._write_pending()
+        elif not self._timer.isActive():
+            self._set_state(self.SAVED)
+
+    def _on_write_failed(self, error):
+        print(f"[autosave] 自动保存失败: {error}")
+        failed, self._in_flight = self._in_flight, None
+        for note_id, entry in failed.items():
+            # 失败的内容放回待保存队列 (若期间没有更新的内容)，下次保存时重试
+            self._pending.setdefault(note_id, entry)
+            self._saved_digests.pop(note_id, None)
+        self._set_state(self.FAILED)
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            self.state_changed.emit(state)
@@ -0,0 +1,75 @@
+import time
+
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal
+
+from db.backup import BACKUP_INTERVAL, BackupCancelled, create_backup, latest_backup_time, rotate_backups
+
+
+class _BackupThread(QThread):
+    """后台备份线程：使用独立连接按页分批复制，完成后按保留策略轮换"""
+    # 备份结果 {'path', 'bytes', 'seconds', 'throughput'}
+    completed = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, db_path, backup_dir, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self._stopping = False
+
+    def stop(self):
+        self._stopping = True
+
+    def run(self):
+        self._stopping = False
+        try:
+            result = create_backup(self.db_path, self.backup_dir, should_stop=lambda: self._stopping)
+            rotate_backups(self.db_path, self.backup_dir)
+        except BackupCancelled:
+            return
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.completed.emit(result)
+
+
+class BackupScheduler(QObject):
+    """
+    定时在线备份：启动后稍等片刻检查一次，之后定期检查，距最近一次备份超过 interval 秒时在后台备份
+    备份固定开始时刻的快照，不阻塞编辑保存；关闭窗口时取消进行中的备份
+    """
+    backup_finished = pyqtSignal(object)
+    backup_failed = pyqtSignal(str)
+
+    # 启动后首次检查的延迟与之后的检查间隔 (毫秒)
+    STARTUP_DELAY = 60 * 1000
+    CHECK_INTERVAL = 10 * 60 * 1000
+
+    def __init__(self, db_path, backup_dir=None, interval=BACKUP_INTERVAL, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.interval = interval
+
+        self._thread = _BackupThread(db_path, backup_dir, self)
+        self._thread.completed.connect(self.backup_finished)
+        self._thread.failed.connect(self.backup_failed)
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.check)
+        self._timer.start(self.STARTUP_DELAY)
+
+    def check(self):
+        self._timer.setInterval(self.CHECK_INTERVAL)
+        latest = latest_backup_time(self.db_path, self.backup_dir)
+        if latest is None or time.time() - latest >= self.interval:
+            self.backup_now()
+
+    def backup_now(self):
+        if not self._thread.isRunning():
+            self._thread.start(QThread.LowPriority)
+
+    def shutdown(self):
+        self._timer.stop()
+        self._thread.stop()
+        self._thread.wait()
@@ -0,0 +1,96 @@
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtWidgets import (
+    QDialog, QHBoxLayout, QVBoxLayout, QListWidget, QListWidgetItem, QPushButton, QSplitter, QLabel, QMessageBox
+)
+
+from models.revision_model import RevisionModel
+from utils.rich_text_edit import RichTextEdit
+
+
+class HistoryDialog(QDialog):
+    """
+    笔记历史版本浏览：左侧为版本列表，右侧为选中版本的只读预览
+    版本列表与版本正文都在只读连接池中查询，选中版本后可恢复为当前内容
+    """
+    # 请求恢复: (note_id, 正文)
+    restore_requested = pyqtSignal(int, str)
+
+    def __init__(self, async_db, note_id, title, image_store=None, parent=None):
+        super().__init__(parent)
+        self.async_db = async_db
+        self.note_id = note_id
+        # 只处理最后一次预览请求的结果，快速切换版本时丢弃过期结果
+        self.preview_request_id = 0
+        self.preview_content = None
+        self.setWindowTitle(f"历史版本 - {title}")
+        self.resize(900, 600)
+
+        layout = QVBoxLayout(self)
+        splitter = QSplitter(Qt.Horizontal)
+        self.revision_list = QListWidget()
+        self.revision_list.currentItemChanged.connect(self.on_revision_selected)
+        splitter.addWidget(self.revision_list)
+
+        self.preview = RichTextEdit()
+        self.preview.setReadOnly(True)
+        if image_store is not None:
+            self.preview.set_image_store(image_store)
+        splitter.addWidget(self.preview)
+        splitter.setSizes([220, 680])
+        layout.addWidget(splitter, 1)
+
+        button_layout = QHBoxLayout()
+        self.status_label = QLabel("正在加载…")
+        button_layout.addWidget(self.status_label, 1)
+        self.btn_restore = QPushButton("恢复此版本")
+        self.btn_restore.setEnabled(False)
+        self.btn_restore.clicked.connect(self.restore)
+        button_layout.addWidget(self.btn_restore)
+        btn_close = QPushButton("关闭")
+        btn_close.clicked.connect(self.reject)
+        button_layout.addWidget(btn_close)
+        layout.addLayout(button_layout)
+
+        self.async_db.call(RevisionModel, 'list', note_id,
+                           on_result=self.on_revisions_loaded, on_error=self.on_error)
+
+    def on_revisions_loaded(self, revisions):
+        self.revision_list.clear()
+        for row in revisions:
+            item = QListWidgetItem(f"#{row['revision']}  {row['created_at']}  ({row['size']} 字符)")
+            item.setData(Qt.UserRole, row['revision'])
+            self.revision_list.addItem(item)
+        self.status_label.setText(f"共 {len(revisions)} 个版本" if revisions else "暂无历史版本")
+        if revisions:
+            self.revision_list.setCurrentRow(0)
+
+    def on_revision_selected(self, item, previous=None):
+        self.btn_restore.setEnabled(False)
+        self.preview_content = None
+        if item is None:
+            return
+        self.preview_request_id += 1
+        request_id = self.preview_request_id
+
+        def on_result(content):
+            if request_id != self.preview_request_id:
+                return
+            if content is None:
+                self.status_label.setText("该版本已被清理")
+                return
+            self.preview_content = content
+            self.preview.set_document(self.preview.create_document(content))
+            self.btn_restore.setEnabled(True)
+
+        self.async_db.call(RevisionModel, 'get_content', self.note_id, item.data(Qt.UserRole),
+                           on_result=on_result, on_error=self.on_error)
+
+    def restore(self):
+        if self.preview_content is None:
+            return
+        self.restore_requested.emit(self.note_id, self.preview_content)
+        self.accept()
+
+    def on_error(self, e):
+        print(f"[HistoryDialog] 加载历史版本失败: {e}")
+        QMessageBox.critical(self, "错误", f"加载历史版本失败: {e}")
@@ -1,18 +1,32 @@
 import os
 import sys
+from html import escape
 
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QSplitter,
-    QTreeWidget, QTreeWidgetItem, QTextEdit, QPushButton, QInputDialog,
+    QTextEdit, QPushButton, QInputDialog,
     QMessageBox, QLabel, QFrame, QScrollArea, QToolBar, QFontComboBox, QComboBox, QColorDialog, QLineEdit,
-    QGraphicsDropShadowEffect, QFileDialog, QShortcut
+    QGraphicsDropShadowEffect, QShortcut, QListWidget, QListWidgetItem, QToolTip
 )
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont, QTextCharFormat, QFontDatabase, QTextCursor, QIcon, QColor, QImage, QTextBlockFormat, \
-    QKeySequence
-from PyQt5.QtWidgets import QAction, QToolButton
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QFont, QTextCharFormat, QFontDatabase, QIcon, QColor, QTextBlockFormat, QKeySequence, QCursor
+from PyQt5.QtWidgets import QAction
 from models.category_model import CategoryModel
+from models.events import ModelEvents
+from models.image_model import ImageModel
 from models.note_model import NoteModel
+from models.records import Note
+from models.trash_model import RETENTION_DAYS, TrashModel
+from ui.note_tree_model import NoteTreeModel, NoteTreeView
+from ui.prefetcher import NotePrefetcher
+from ui.async_db import AsyncDatabase
+from ui.autosave import AutosaveController
+from ui.backup_scheduler import BackupScheduler
+from ui.history_dialog import HistoryDialog
+from ui.trash_dialog import TrashDialog
+from utils.document_cache import DocumentCache
+from utils.document_format import serialize_document
+from utils.image_store import ImageStore
 from utils.rich_text_edit import RichTextEdit
 from utils.untils import get_path
 
@@ -32,19 +46,80 @@ class MainWindow(QMainWindow):
 
         # 3.相关数据链接
         self.db = db
-        self.category_model = CategoryModel(db)
-        self.note_model = NoteModel(db)
+        self.model_events = ModelEvents()
+        self.category_model = CategoryModel(db, self.model_events)
+        self.note_model = NoteModel(db, self.model_events)
+        # 写操作在后台写线程按顺序执行，检索在只读连接池中执行，结果回到 GUI 线程
+        self.async_db = AsyncDatabase(db, self.model_events, parent=self)
+        # 模型变更事件 (无论来自哪个线程) 驱动树的增量更新
+        self.async_db.model_event.connect(self.on_model_event)
+        # 正在后台创建的新笔记，避免重复保存时创建多篇
+        self.creating_note = False
+        # 已有笔记的编辑防抖后自动保存，写入在后台写线程合并执行
+        self.autosave = AutosaveController(self.async_db, self.autosave_snapshot, parent=self)
+        self.autosave.state_changed.connect(self.on_autosave_state_changed)
+        self.autosave_label = None
+        # 分类/笔记虚拟树模型，笔记按页懒加载
+        self.tree_model = NoteTreeModel(self.category_model, self.note_model, self)
+        # 分类聚合统计由触发器维护，笔记变更后合并一段时间内的事件再重新读取
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setSingleShot(True)
+        self.stats_timer.setInterval(500)
+        self.stats_timer.timeout.connect(self.tree_model.refresh_stats)
+        # 回收站后台清理: 每步一个短写事务 (删除一批行或回收一批空闲页)，步与步之间让出写线程
+        self.purge_phase = None
+        self.purge_days = RETENTION_DAYS
+        self.purge_generation = 0
+        self.purge_timer = QTimer(self)
+        self.purge_timer.setSingleShot(True)
+        self.purge_timer.setInterval(200)
+        self.purge_timer.timeout.connect(self.run_purge_step)
+        # 长笔记的全文索引延后写入: 停止编辑一段时间后在写线程中逐篇补写，检索前也先补写
+        self.index_timer = QTimer(self)
+        self.index_timer.setSingleShot(True)
+        self.index_timer.setInterval(3000)
+        self.index_timer.timeout.connect(self.run_pending_index)
+        # 定时在线备份，在后台线程复制启动时刻的快照，不阻塞编辑保存
+        self.backup_scheduler = BackupScheduler(db.db_path, parent=self)
+        self.backup_scheduler.backup_finished.connect(self.on_backup_finished)
+        self.backup_scheduler.backup_failed.connect(lambda e: print(f"[backup] 自动备份失败: {e}"))
+        # 已解析笔记文档的 LRU 缓存，切换回最近打开的笔记时无需重新解析
+        self.document_cache = DocumentCache()
+        # 后台预取相邻笔记与悬停笔记，预热文档缓存
+        self.hovered_note_id = None
+        self.prefetch_label = None
 
         self.current_category_id = None
         self.current_note_id = None
-        self.tree_widget = None
+        # 打开笔记时在后台读取，只处理最新一次请求的结果
+        self.open_request_id = 0
+        self.tree_view = None
+        self.search_edit = None
+        self.search_results = None
+        # 全文检索在后台只读连接池中执行，只处理最新一次请求的结果
+        self.search_request_id = 0
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.run_search)
         self.title_edit = None
         self.format_toolbar = None
 
         # 4.设置界面UI
         self.setup_ui()
+        # 图片按内容哈希存入数据库，编辑器通过 glacier-image: URL 解析
+        self.image_store = ImageStore(db, self.async_db)
+        self.content_edit.set_image_store(self.image_store)
+        self.prefetcher = NotePrefetcher(db, self.document_cache, self.content_edit.create_document, self)
+        self.prefetcher.note_ready.connect(self.on_note_prefetched)
         # 5.加载笔记分类
         self.load_categories()
+        # 6.后台回收不再被任何笔记引用的图片
+        self.async_db.call(ImageModel, 'collect_garbage', write=True,
+                           on_error=lambda e: print(f"[collect_garbage] 图片回收失败: {e}"))
+        # 7.后台清理回收站中的过期条目，补写上次退出前未完成的全文索引
+        self.start_trash_purge()
+        self.index_timer.start()
 
     def init_fonts(self):
         """设置系统中基本的字体样式"""
@@ -129,14 +204,15 @@ class MainWindow(QMainWindow):
             color: #333;
             padding: 5px 0;
         """)
-        # TreeWidget 设置
-        self.tree_widget = QTreeWidget()
-        self.tree_widget.setHeaderHidden(True)  # 隐藏标题栏
-        self.tree_widget.setFont(QFont("Microsoft YaHei", 10))  # 使用现代字体
+        # TreeView 设置
+        self.tree_view = NoteTreeView()
+        self.tree_view.setHeaderHidden(True)  # 隐藏标题栏
+        self.tree_view.setFont(QFont("Microsoft YaHei", 10))  # 使用现代字体
+        self.tree_view.setModel(self.tree_model)
 
         # 设置样式（QSS）- 更现代、美观
-        self.tree_widget.setStyleSheet("""
-            QTreeWidget {
+        self.tree_view.setStyleSheet("""
+            QTreeView {
                 border: 1px solid #ccc;
                 border-radius: 6px;
                 background-color: #f9f9f9;
@@ -144,20 +220,20 @@ class MainWindow(QMainWindow):
                 outline: 0px; /* 去掉虚线框 */
             }
 
-            QTreeWidget::item {
+            QTreeView::item {
                 padding-left: 8px;
                 padding-right: 8px;
                 height: 30px;
                 border-radius: 4px;
             }
 
-            QTreeWidget::item:selected {
+            QTreeView::item:selected {
                 background-color: #bfdbfe; /* 浅蓝背景 */
                 color: #1e40af; /* 深蓝色文字 */
                 font-weight: bold;
             }
 
-            QTreeWidget::item:hover {
+            QTreeView::item:hover {
                 background-color: #dbeafe;
                 color: #1e3a8a;
             }
@@ -183,10 +259,56 @@ class MainWindow(QMainWindow):
             }
         """)
         # 连接点击事件
-        self.tree_widget.itemClicked.connect(self.on_tree_item_clicked)
+        self.tree_view.clicked.connect(self.on_tree_item_clicked)
+        # 鼠标悬停的笔记提前预取
+        self.tree_view.setMouseTracking(True)
+        self.tree_view.entered.connect(self.on_tree_item_hovered)
+
+        # 搜索框与搜索结果列表，有搜索词时结果列表替换树显示
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("🔍 搜索笔记...")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.setStyleSheet("""
+            QLineEdit {
+                border: 1px solid #ccc;
+                border-radius: 6px;
+                padding: 6px;
+                font-size: 13px;
+                background-color: white;
+            }
+        """)
+        self.search_edit.textChanged.connect(self.on_search_text_changed)
+        self.search_results = QListWidget()
+        self.search_results.setStyleSheet("""
+            QListWidget {
+                border: 1px solid #ccc;
+                border-radius: 6px;
+                background-color: #f9f9f9;
+            }
+            QListWidget::item:selected {
+                background-color: #bfdbfe;
+            }
+        """)
+        self.search_results.itemClicked.connect(self.on_search_result_clicked)
+        self.search_results.hide()
+
+        # 分类内笔记的排序方式
+        self.sort_combo = QComboBox()
+        for label, order in (("按修改时间", 'updated'), ("按创建时间", 'created'), ("按标题", 'title')):
+            self.sort_combo.addItem(label, order)
+        self.sort_combo.currentIndexChanged.connect(self.on_sort_order_changed)
+        btn_trash = QPushButton("🗑 回收站")
+        btn_trash.clicked.connect(self.show_trash)
+        sort_layout = QHBoxLayout()
+        sort_layout.addWidget(self.sort_combo, 1)
+        sort_layout.addWidget(btn_trash)
+
         # 将组件加入布局
         left_layout.addWidget(category_label)
-        left_layout.addWidget(self.tree_widget)
+        left_layout.addWidget(self.search_edit)
+        left_layout.addLayout(sort_layout)
+        left_layout.addWidget(self.tree_view)
+        left_layout.addWidget(self.search_results)
         # end 左侧分类笔记列表区域
         # end 左侧区域全部结束
 
@@ -373,6 +495,24 @@ class MainWindow(QMainWindow):
         button_layout.setContentsMargins(0, 0, 0, 0)
         button_layout.setAlignment(Qt.AlignRight)
 
+        btn_history = QPushButton("历史版本")
+        btn_history.setFixedSize(120, 40)
+        btn_history.setStyleSheet(f"""
+                    QPushButton {{
+                        background-color: white;
+                        color: {STYLE['primary_color']};
+                        border: 1px solid {STYLE['primary_color']};
+                        border-radius: 4px;
+                        font-size: 14px;
+                        padding: 8px 16px;
+                    }}
+                    QPushButton:hover {{
+                        background-color: #f0f5ff;
+                    }}
+                """)
+        btn_history.clicked.connect(self.show_history)
+        button_layout.addWidget(btn_history)
+
         btn_save = QPushButton("保存笔记")
         btn_save.setFixedSize(120, 40)
         btn_save.setStyleSheet(f"""
@@ -407,6 +547,15 @@ class MainWindow(QMainWindow):
         status_font.setPointSize(10)
         self.statusBar().setFont(status_font)
         self.statusBar().showMessage("就绪")
+        self.prefetch_label = QLabel()
+        self.prefetch_label.setStyleSheet("color: #888; padding-right: 8px;")
+        self.statusBar().addPermanentWidget(self.prefetch_label)
+        self.autosave_label = QLabel("已保存")
+        self.autosave_label.setStyleSheet("color: #888; padding-right: 8px;")
+        self.statusBar().addPermanentWidget(self.autosave_label)
+        # 只响应用户编辑：setText / 换入文档不会触发自动保存
+        self.title_edit.textEdited.connect(self.on_editor_changed)
+        self.content_edit.textChanged.connect(self.on_editor_changed)
 
     def set_text_bold(self):
         """设置粗体字体"""
@@ -517,7 +666,6 @@ class MainWindow(QMainWindow):
     def insert_code_block_with_line_numbers(self):
         """简单插入带行号的代码块"""
         from PyQt5.QtWidgets import QInputDialog
-        from PyQt5.QtGui import QTextCursor
 
         # 获取代码输入
         text, ok = QInputDialog.getMultiLineText(
@@ -573,176 +721,513 @@ class MainWindow(QMainWindow):
         """增加分类"""
         name, ok = QInputDialog.getText(self, "添加分类", "分类名称:")
         if ok and name.strip():
-            try:
-                self.category_model.add(name.strip())
-                self.load_categories()
-                self.statusBar().showMessage("分类添加成功", 3000)
-            except Exception as e:
+            def on_error(e):
                 print(f"[add_category] 添加失败: {e}")
                 QMessageBox.critical(self, "错误", "添加分类失败，请检查数据库")
 
+            self.async_db.call(
+                CategoryModel, 'add', name.strip(), write=True,
+                on_result=lambda category_id: self.statusBar().showMessage("分类添加成功", 3000),
+                on_error=on_error
+            )
+
     def add_note(self):
         """新增笔记"""
-        current_item = self.tree_widget.currentItem()
-        if not current_item or current_item.data(0, Qt.UserRole)[0] != 'category':
+        current_index = self.tree_view.currentIndex()
+        if not current_index.isValid() or current_index.data(Qt.UserRole)[0] != 'category':
             QMessageBox.warning(self, "提示", "请先选择一个分类以添加笔记")
             return
 
-        category_id = current_item.data(0, Qt.UserRole)[1]
+        category_id = current_index.data(Qt.UserRole)[1]
         title, ok = QInputDialog.getText(self, "添加笔记", "笔记标题:")
         if ok and title.strip():
-            try:
-                note_id = self.note_model.add(category_id, title.strip())
-                self.load_categories()
+            def on_added(note_id):
                 self.select_note_by_id(note_id)
-                self.title_edit.setText("")  # 清空标题编辑框
-                self.content_edit.setPlainText("")  # 清空内容编辑框
                 self.statusBar().showMessage("笔记添加成功", 3000)
-            except Exception as e:
+
+            def on_error(e):
                 print(f"[add_note] 添加失败: {e}")
                 QMessageBox.critical(self, "错误", "添加笔记失败")
 
+            self.async_db.call(NoteModel, 'add', category_id, title.strip(), write=True,
+                               on_result=on_added, on_error=on_error)
+
     def load_categories(self):
         """加载分类和笔记"""
         try:
-            self.tree_widget.clear()
-            categories = self.category_model.get_all()
-
-            for category in categories:
-                category_item = QTreeWidgetItem(self.tree_widget)
-                category_item.setText(0, category['name'])
-                category_item.setData(0, Qt.UserRole, ('category', category['id']))
-                notes = self.note_model.get_by_category(category['id'])
-                for note in notes:
-                    note_item = QTreeWidgetItem(category_item)
-                    note_item.setText(0, note['title'])
-                    note_item.setData(0, Qt.UserRole, ('note', note['id']))
-                category_item.setExpanded(True)
+            # 只加载分类，笔记在展开分类时按页懒加载
+            self.tree_model.reload()
         except Exception as e:
             print(f"[load_categories] 加载分类失败: {e}")
             QMessageBox.critical(self, "错误", "加载分类和笔记失败，请检查数据库连接")
 
-    def on_tree_item_clicked(self, item):
+    def on_tree_item_clicked(self, index):
         """处理列表点击事件"""
-        item_data = item.data(0, Qt.UserRole)
+        item_data = index.data(Qt.UserRole)
         if not item_data:
             return
 
         item_type, item_id = item_data
 
         if item_type == 'category':
+            self.autosave.flush()
+            self.open_request_id += 1  # 丢弃仍在读取的笔记
             self.current_category_id = item_id
             self.current_note_id = None
             self.title_edit.clear()
-            self.content_edit.clear()
-            self.statusBar().showMessage(f"已选择分类: {item.text(0)}", 3000)
+            self.show_blank_document()
+            self.statusBar().showMessage(f"已选择分类: {index.data()}", 3000)
         elif item_type == 'note':
-            self.current_note_id = item_id
-            note = self.note_model.get_by_id(item_id)
-            if note:
-                self.current_category_id = note['category_id']
-                self.title_edit.setText(note['title'])
-                self.content_edit.setHtml(note['content'])
-                self.statusBar().showMessage(f"正在编辑: {note['title']}", 3000)
+            self.open_note(item_id)
+
+    def open_note(self, note_id):
+        """
+        打开笔记，优先换入缓存中已解析的文档或预取的笔记数据
+        需要读取数据库时在后台只读连接中读取 (分块正文的拼接与解压不占用 UI 线程)，读取完成后再换入编辑器
+        """
+        # 离开上一篇笔记前保存未写入的编辑，并更新其文档大小估算
+        self.autosave.flush()
+        if self.current_note_id is not None:
+            self.document_cache.refresh_size(self.current_note_id)
+        self.open_request_id += 1
+        prefetched = self.prefetcher.take(note_id)
+        if prefetched is not None:
+            self.show_note(note_id, prefetched)
+        else:
+            # 文档已缓存时只需读取头信息
+            self.load_note(note_id, 'get_header' if note_id in self.document_cache else 'get_by_id')
+
+    def load_note(self, note_id, method):
+        request_id = self.open_request_id
+        self.async_db.call(
+            NoteModel, method, note_id,
+            on_result=lambda note: self.on_note_loaded(request_id, note_id, note),
+            on_error=lambda error: self.on_note_load_failed(request_id, error)
+        )
+
+    def on_note_loaded(self, request_id, note_id, note):
+        if request_id != self.open_request_id or note is None:
+            return  # 读取期间又打开了其他笔记或分类，或笔记已被删除
+        if note_id not in self.document_cache and not isinstance(note, Note):
+            # 读取头信息期间文档被移出缓存，改为读取完整笔记
+            self.load_note(note_id, 'get_by_id')
+            return
+        self.show_note(note_id, note)
+
+    def on_note_load_failed(self, request_id, error):
+        if request_id != self.open_request_id:
+            return
+        print(f"[open_note] 读取笔记失败: {error}")
+        QMessageBox.critical(self, "错误", "读取笔记失败")
+
+    def show_note(self, note_id, note):
+        """把笔记换入编辑器；note 为 Note，文档已缓存时也可以是 NoteHeader"""
+        # 等待读取期间对上一篇笔记的编辑先提交
+        self.autosave.flush()
+        document = self.document_cache.get(note_id)
+        self.document_cache.pin(note_id)
+        if document is None:
+            document = self.content_edit.create_document(note.content)
+            self.document_cache.put(note_id, document)
+            self.autosave.mark_saved(note_id, note.title, note.content)
+        self.current_note_id = note_id
+        self.current_category_id = note.category_id
+        self.title_edit.setText(note.title)
+        self.content_edit.set_document(document)
+        self.statusBar().showMessage(f"正在编辑: {note.title}", 3000)
+
+        # 选中项变化：取消旧的预取，改为预取当前笔记的相邻笔记
+        self.prefetcher.reset()
+        self.prefetcher.prefetch(self.tree_model.neighbour_note_ids(note_id))
+        self.prefetch_label.setText(f"预取命中率 {self.prefetcher.hit_rate:.0%}")
+
+    def on_tree_item_hovered(self, index):
+        item_data = index.data(Qt.UserRole)
+        if not item_data or item_data[0] != 'note':
+            self.hovered_note_id = None
+            return
+        self.hovered_note_id = item_data[1]
+        note = self.prefetcher.peek(self.hovered_note_id)
+        if note is not None:
+            self.show_note_preview(note)
+        else:
+            self.prefetcher.prefetch([self.hovered_note_id])
+
+    def on_note_prefetched(self, note_id):
+        if note_id == self.hovered_note_id:
+            self.show_note_preview(self.prefetcher.peek(note_id))
+
+    def show_note_preview(self, note):
+        """悬停笔记时显示正文纯文本预览"""
+        text = note.text if note else ""
+        if text:
+            preview = text[:200] + ("…" if len(text) > 200 else "")
+            QToolTip.showText(QCursor.pos(), preview, self.tree_view)
+
+    def show_blank_document(self):
+        """清空编辑区；换入空白文档而不是清空缓存中的文档"""
+        self.content_edit.reset_document()
+        self.document_cache.pin(None)
 
     def select_note_by_id(self, note_id):
-        def search_items(parent):
-            for i in range(parent.childCount()):
-                item = parent.child(i)
-                data = item.data(0, Qt.UserRole)
-                if data and data[0] == 'note' and data[1] == note_id:
-                    self.tree_widget.setCurrentItem(item)
-                    self.on_tree_item_clicked(item)
-                    return True
-                if search_items(item):
-                    return True
-            return False
-
-        for i in range(self.tree_widget.topLevelItemCount()):
-            if search_items(self.tree_widget.topLevelItem(i)):
-                break
+        index = self.tree_model.note_index(note_id)
+        if index.isValid():
+            self.tree_view.expand(index.parent())
+            self.tree_view.setCurrentIndex(index)
+            self.on_tree_item_clicked(index)
+
+    def on_model_event(self, event, payload):
+        """根据模型变更事件只修补受影响的节点"""
+        if event in (ModelEvents.CATEGORY_ADDED, ModelEvents.NOTE_ADDED, ModelEvents.NOTE_RENAMED,
+                     ModelEvents.NOTE_CONTENT_UPDATED, ModelEvents.NOTE_MOVED, ModelEvents.NOTE_DELETED):
+            self.stats_timer.start()
+        if event == ModelEvents.CATEGORY_ADDED:
+            self.tree_model.add_category(payload['category_id'], payload['name'])
+        elif event == ModelEvents.CATEGORY_RENAMED:
+            self.tree_model.rename_category(payload['category_id'], payload['name'])
+        elif event == ModelEvents.CATEGORY_DELETED:
+            self.tree_model.remove_category(payload['category_id'])
+            # 事件不含分类下的笔记 id，整体清空缓存
+            self.document_cache.clear()
+        elif event == ModelEvents.NOTE_ADDED:
+            self.tree_model.add_note(payload['category_id'], payload['note_id'], payload['title'])
+        elif event == ModelEvents.NOTE_RENAMED:
+            self.tree_model.touch_note(payload['note_id'], payload['title'])
+        elif event == ModelEvents.NOTE_CONTENT_UPDATED:
+            self.tree_model.touch_note(payload['note_id'])
+            self.index_timer.start()
+            self.prefetcher.invalidate(payload['note_id'])
+            # 当前笔记的内容来自编辑器本身，其文档就是最新内容
+            if payload['note_id'] != self.current_note_id:
+                self.document_cache.invalidate(payload['note_id'])
+        elif event == ModelEvents.NOTE_MOVED:
+            self.tree_model.move_note(payload['note_id'], payload['category_id'])
+        elif event == ModelEvents.NOTE_DELETED:
+            self.autosave.discard(payload['note_id'])
+            self.tree_model.remove_note(payload['note_id'])
+            self.document_cache.invalidate(payload['note_id'])
+            self.prefetcher.invalidate(payload['note_id'])
+
+    def on_search_text_changed(self, text):
+        """输入防抖，停止输入后再发起检索"""
+        if text.strip():
+            self.search_timer.start()
+        else:
+            self.search_timer.stop()
+            self.search_request_id += 1  # 丢弃仍在执行的检索结果
+            self.search_results.clear()
+            self.search_results.hide()
+            self.tree_view.show()
+
+    def run_search(self):
+        """在后台线程执行检索"""
+        query = self.search_edit.text().strip()
+        if not query:
+            return
+        self.search_request_id += 1
+        request_id = self.search_request_id
+
+        def search(_=None):
+            self.async_db.call(
+                NoteModel, 'search', query, 50,
+                on_result=lambda results: self.on_search_finished(request_id, results),
+                on_error=lambda error: self.on_search_failed(request_id, str(error))
+            )
+
+        def on_index_error(e):
+            print(f"[run_search] 补写全文索引失败: {e}")
+            search()
+
+        # 先在写线程中补写延后的全文索引，刚保存的长笔记也能被检索到
+        self.index_timer.stop()
+        self.async_db.call(NoteModel, 'index_pending', write=True, on_result=search, on_error=on_index_error)
+
+    def on_search_finished(self, request_id, results):
+        if request_id != self.search_request_id:
+            return  # 过期的检索结果
+        self.search_results.clear()
+        for result in results:
+            label = QLabel(f"<b>{escape(result.title)}</b><br>"
+                           f"<span style='color:#666;'>{result.snippet}</span>")
+            label.setWordWrap(True)
+            label.setContentsMargins(6, 4, 6, 4)
+            item = QListWidgetItem()
+            item.setData(Qt.UserRole, ('note', result.id))
+            item.setSizeHint(label.sizeHint())
+            self.search_results.addItem(item)
+            self.search_results.setItemWidget(item, label)
+        self.tree_view.hide()
+        self.search_results.show()
+        self.statusBar().showMessage(f"找到 {len(results)} 条结果", 3000)
+
+    def on_search_failed(self, request_id, error):
+        if request_id != self.search_request_id:
+            return
+        print(f"[run_search] 检索失败: {error}")
+        self.statusBar().showMessage("检索失败", 3000)
+
+    def on_search_result_clicked(self, item):
+        """打开搜索结果对应的笔记"""
+        self.select_note_by_id(item.data(Qt.UserRole)[1])
 
     def delete_item(self):
         """删除操作"""
-        current_item = self.tree_widget.currentItem()
-        if not current_item:
+        current_index = self.tree_view.currentIndex()
+        if not current_index.isValid():
             return
 
-        item_data = current_item.data(0, Qt.UserRole)
+        item_data = current_index.data(Qt.UserRole)
         if not item_data:
             return
 
         item_type, item_id = item_data
 
-        try:
-            if item_type == 'category':
-                reply = QMessageBox.question(
-                    self, '确认删除',
-                    f"确定要删除分类 '{current_item.text(0)}' 及其所有笔记吗?",
-                    QMessageBox.Yes | QMessageBox.No, QMessageBox.No
-                )
-                if reply == QMessageBox.Yes:
-                    self.category_model.delete(item_id)
-                    self.load_categories()
-                    self.title_edit.clear()
-                    self.content_edit.clear()
-                    self.statusBar().showMessage("分类已删除", 3000)
-            elif item_type == 'note':
-                reply = QMessageBox.question(
-                    self, '确认删除',
-                    f"确定要删除笔记 '{current_item.text(0)}' 吗?",
-                    QMessageBox.Yes | QMessageBox.No, QMessageBox.No
-                )
-                if reply == QMessageBox.Yes:
-                    self.note_model.delete(item_id)
-                    self.load_categories()
-                    if self.current_note_id == item_id:
-                        self.title_edit.clear()
-                        self.content_edit.clear()
-                        self.current_note_id = None
-                    self.statusBar().showMessage("笔记已删除", 3000)
-        except Exception as e:
+        def on_error(e):
             print(f"[delete_item] 删除失败: {e}")
             QMessageBox.critical(self, "错误", "删除失败")
 
+        if item_type == 'category':
+            reply = QMessageBox.question(
+                self, '确认删除',
+                f"确定要把分类 '{current_index.data()}' 及其所有笔记移入回收站吗?",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+            )
+            if reply == QMessageBox.Yes:
+                # 丢弃分类下笔记尚未写入的编辑；已提交给写线程的保存先于删除执行
+                for note_id in self.autosave.pending_note_ids:
+                    if self.tree_model.note_category_id(note_id) == item_id:
+                        self.autosave.discard(note_id)
+                if self.current_category_id == item_id:
+                    if self.current_note_id is not None:
+                        self.autosave.discard(self.current_note_id)
+                    self.open_request_id += 1
+                    self.title_edit.clear()
+                    self.show_blank_document()
+                    self.current_note_id = None
+                else:
+                    # 其他分类的当前笔记保留在编辑器中，先提交其编辑
+                    self.autosave.flush()
+                # 只标记删除，分类下的笔记由后台清理任务在保留期过后分批物理删除
+                self.async_db.call(
+                    CategoryModel, 'delete', item_id, write=True,
+                    on_result=lambda _: self.statusBar().showMessage("分类已移入回收站", 3000),
+                    on_error=on_error
+                )
+        elif item_type == 'note':
+            reply = QMessageBox.question(
+                self, '确认删除',
+                f"确定要把笔记 '{current_index.data()}' 移入回收站吗?",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+            )
+            if reply == QMessageBox.Yes:
+                self.async_db.call(
+                    NoteModel, 'delete', item_id, write=True,
+                    on_result=lambda _: self.statusBar().showMessage("笔记已移入回收站", 3000),
+                    on_error=on_error
+                )
+                if self.current_note_id == item_id:
+                    self.open_request_id += 1
+                    self.title_edit.clear()
+                    self.show_blank_document()
+                    self.current_note_id = None
+
     def save_note(self):
         """保存笔记，支持新建和更新，保留HTML格式"""
-        # 获取标题和内容
+        # 获取标题
         title = self.title_edit.text().strip()  # 使用text()而不是toPlainText()
-        content = self.content_edit.toHtml() if self.content_edit.toHtml().strip() else self.content_edit.toPlainText().strip()
 
         # 验证标题
         if not title:
             QMessageBox.warning(self, "提示", "笔记标题不能为空")
             return
-        try:
-            # 新建笔记的情况
-            if not self.current_note_id:
-                if not self.current_category_id:
-                    QMessageBox.warning(self, "提示", "请先选择一个分类以保存笔记")
-                    return
-
-                # 添加新笔记
-                note_id = self.note_model.add(self.current_category_id, title)
-                self.note_model.update(note_id, content=content)
-                self.current_note_id = note_id
-                message = "笔记已创建并保存"
-
-                # 更新UI
-                self.load_categories()
-                self.select_note_by_id(note_id)
-            else:
-                # 更新现有笔记
-                self.note_model.update(self.current_note_id, title=title, content=content)
-                message = "笔记已更新"
 
-                # 更新树形控件中的标题
-                self.load_categories()
-                self.select_note_by_id(self.current_note_id)
-
-            self.statusBar().showMessage(message, 3000)
+        # 更新现有笔记：立即提交自动保存，内容未变化时不写入
+        if self.current_note_id:
+            self.autosave.flush()
+            self.select_current_note_in_tree()
+            return
 
-        except Exception as e:
+        def on_error(e):
             error_msg = f"保存笔记失败: {str(e)}"
             print(f"[save_note] {error_msg}")
             QMessageBox.critical(self, "错误", error_msg)
+
+        # 新建笔记的情况
+        if not self.current_category_id:
+            QMessageBox.warning(self, "提示", "请先选择一个分类以保存笔记")
+            return
+        if self.creating_note:
+            return
+        content = serialize_document(self.content_edit.document())
+
+        def create_note(db, category_id):
+            note_model = NoteModel(db, self.model_events)
+            note_id = note_model.add(category_id, title)
+            note_model.update(note_id, content=content)
+            return note_id
+
+        def on_created(note_id):
+            self.creating_note = False
+            self.current_note_id = note_id
+            # 编辑器中的文档即新笔记内容，直接放入缓存
+            self.document_cache.pin(note_id)
+            self.document_cache.put(note_id, self.content_edit.document())
+            # 创建期间的编辑交给自动保存
+            if self.content_edit.document().isModified() or self.title_edit.text().strip() != title:
+                self.autosave.schedule()
+            self.select_current_note_in_tree()
+            self.statusBar().showMessage("笔记已创建并保存", 3000)
+
+        def on_create_error(e):
+            self.creating_note = False
+            on_error(e)
+
+        # 添加新笔记与写入正文在写线程中依次执行
+        self.creating_note = True
+        self.content_edit.document().setModified(False)
+        self.async_db.write(create_note, self.current_category_id,
+                            on_result=on_created, on_error=on_create_error)
+
+    def on_editor_changed(self):
+        """已有笔记被编辑时启动自动保存防抖"""
+        if self.current_note_id and (self.content_edit.document().isModified() or self.title_edit.isModified()):
+            self.autosave.schedule()
+
+    def autosave_snapshot(self):
+        """自动保存取当前笔记内容，每次保存只序列化一次文档"""
+        title = self.title_edit.text().strip()
+        if not self.current_note_id or not title:
+            return None
+        document = self.content_edit.document()
+        # 只是浏览、没有编辑的笔记不保存
+        if not document.isModified() and not self.title_edit.isModified():
+            return None
+        content = serialize_document(document)
+        # 已取走的内容视为已保存，之后的编辑重新触发自动保存
+        document.setModified(False)
+        self.title_edit.setModified(False)
+        return self.current_note_id, title, content
+
+    def show_history(self):
+        """浏览当前笔记的历史版本"""
+        if not self.current_note_id:
+            QMessageBox.warning(self, "提示", "请先选择一篇笔记")
+            return
+        # 先写入未保存的编辑，使其出现在版本列表中
+        self.autosave.flush()
+        dialog = HistoryDialog(self.async_db, self.current_note_id, self.title_edit.text().strip(),
+                               self.image_store, self)
+        dialog.restore_requested.connect(self.restore_revision)
+        dialog.exec_()
+
+    def show_trash(self):
+        dialog = TrashDialog(self.async_db, self)
+        dialog.empty_requested.connect(lambda: self.start_trash_purge(older_than_days=0))
+        dialog.exec_()
+
+    def start_trash_purge(self, older_than_days=RETENTION_DAYS):
+        """开始 (或以新的保留天数重新开始) 后台清理回收站"""
+        self.purge_days = older_than_days
+        self.purge_phase = 'rows'
+        self.purge_generation += 1
+        if not self.purge_timer.isActive():
+            self.purge_timer.start()
+
+    def run_purge_step(self):
+        phase, generation = self.purge_phase, self.purge_generation
+        if phase is None:
+            return
+        if phase == 'rows':
+            method, args = 'purge_step', (self.purge_days,)
+        else:
+            method, args = 'reclaim_space', ()
+        self.async_db.call(TrashModel, method, *args, write=True,
+                           on_result=lambda count: self.on_purge_step(generation, phase, count),
+                           on_error=self.on_purge_error)
+
+    def on_purge_step(self, generation, phase, count):
+        """先分批删除过期行，删除完毕后分批回收空闲页"""
+        if self.purge_phase is None:
+            return
+        if generation != self.purge_generation or count:
+            # 本步有进展，或期间重新开始了清理
+            self.purge_timer.start()
+        elif phase == 'rows':
+            self.purge_phase = 'pages'
+            self.purge_timer.start()
+        else:
+            self.purge_phase = None
+            if self.purge_days == 0:
+                self.statusBar().showMessage("回收站已清空", 3000)
+
+    def on_purge_error(self, e):
+        print(f"[purge] 清理回收站失败: {e}")
+        self.purge_phase = None
+
+    def run_pending_index(self):
+        """每步补写一篇长笔记的全文索引，步与步之间让出写线程"""
+        self.async_db.call(NoteModel, 'index_pending', 1, write=True,
+                           on_result=self.on_pending_indexed,
+                           on_error=lambda e: print(f"[index_pending] 补写全文索引失败: {e}"))
+
+    def on_pending_indexed(self, count):
+        # 可能还有待补写的笔记，稍后继续；期间的保存会重新推迟计时
+        if count and not self.index_timer.isActive():
+            self.index_timer.start()
+
+    def on_backup_finished(self, result):
+        self.statusBar().showMessage(
+            f"已自动备份 ({result['bytes'] / 2 ** 20:.1f} MiB，{result['throughput'] / 2 ** 20:.1f} MiB/秒)", 5000
+        )
+
+    def restore_revision(self, note_id, content):
+        """把历史版本换入编辑器并保存，恢复本身也记录为一个新版本"""
+        if note_id != self.current_note_id:
+            return
+        document = self.content_edit.create_document(content)
+        self.document_cache.put(note_id, document)
+        self.content_edit.set_document(document)
+        document.setModified(True)
+        self.autosave.schedule()
+        self.autosave.flush()
+        self.statusBar().showMessage("已恢复历史版本", 3000)
+
+    def on_autosave_state_changed(self, state):
+        text, color = {
+            AutosaveController.PENDING: ("未保存", "#888"),
+            AutosaveController.SAVING: ("正在保存…", "#888"),
+            AutosaveController.SAVED: ("已保存", "#888"),
+            AutosaveController.FAILED: ("保存失败", "#d9534f"),
+        }[state]
+        self.autosave_label.setText(text)
+        self.autosave_label.setStyleSheet(f"color: {color}; padding-right: 8px;")
+        if state == AutosaveController.FAILED:
+            self.statusBar().showMessage("自动保存失败，将在下次编辑或手动保存时重试", 5000)
+
+    def on_sort_order_changed(self):
+        """切换排序后树重新分页加载，重新展开并选中当前笔记"""
+        self.tree_model.set_sort_order(self.sort_combo.currentData())
+        if self.current_note_id is not None:
+            index = self.tree_model.note_index(self.current_note_id)
+            if index.isValid():
+                self.tree_view.expand(index.parent())
+                self.tree_view.setCurrentIndex(index)
+
+    def select_current_note_in_tree(self):
+        """编辑器内容即为最新内容，只同步树的选中状态，无需重新加载"""
+        index = self.tree_model.note_index(self.current_note_id)
+        if index.isValid():
+            self.tree_view.setCurrentIndex(index)
+
+    def closeEvent(self, event):
+        """关闭窗口前提交未保存的编辑，停止后台线程并等待已提交的写操作完成"""
+        # 后台处理中的图片先替换进文档，再做最后一次保存
+        self.content_edit.image_ingestor.wait()
+        self.purge_timer.stop()
+        self.purge_phase = None
+        self.index_timer.stop()
+        self.backup_scheduler.shutdown()
+        self.autosave.flush()
+        self.prefetcher.shutdown()
+        self.async_db.shutdown()
+        super().closeEvent(event)
@@ -0,0 +1,378 @@
+from bisect import bisect_left
+
+from PyQt5.QtCore import QAbstractItemModel, QModelIndex, QPoint, Qt
+from PyQt5.QtWidgets import QTreeView
+
+from models.note_model import SORT_ORDERS
+
+
+class _TreeNode:
+    """树节点：分类节点持有已加载的笔记子节点与分页游标"""
+    __slots__ = ('kind', 'id', 'title', 'parent', 'children', 'cursor', 'exhausted', 'key', 'stats')
+
+    def __init__(self, kind, node_id, title, parent=None, key=None, stats=(0, 0, None)):
+        self.kind = kind
+        self.id = node_id
+        self.title = title
+        self.parent = parent
+        self.children = [] if kind == 'category' else None
+        self.cursor = None  # 已加载最后一行的 (排序键, id)
+        self.exhausted = False  # 该分类的笔记是否已全部加载
+        self.key = key  # 笔记节点在当前排序方式下的排序键
+        self.stats = stats  # 分类节点的 (笔记数, 正文总字符数, 最近修改时间)
+
+    @property
+    def fetched(self):
+        return self.cursor is not None or self.exhausted
+
+
+def _category_stats(category):
+    return category.note_count, category.total_size, category.last_updated
+
+
+class NoteTreeModel(QAbstractItemModel):
+    """
+    分类/笔记虚拟树模型
+    分类一次性加载；笔记在分类展开或滚动到底部时通过 canFetchMore/fetchMore 按键集分页懒加载
+    内存占用只与已展开浏览的笔记数量相关
+    笔记按 order (NoteModel.SORT_ORDERS) 排序，切换排序方式时丢弃已加载的笔记重新分页
+    """
+    PAGE_SIZE = 200
+
+    def __init__(self, category_model, note_model, parent=None, order='updated'):
+        super().__init__(parent)
+        self.category_model = category_model
+        self.note_model = note_model
+        self.order = order
+        self._categories = []
+        self._category_rows = {}
+        self._category_nodes = {}
+        self._note_nodes = {}
+
+    # ---------- 数据加载 ----------
+    def reload(self):
+        """重新加载分类，已加载的笔记全部丢弃"""
+        self.beginResetModel()
+        self._categories = [
+            _TreeNode('category', category.id, category.name, stats=_category_stats(category))
+            for category in self.category_model.get_all()
+        ]
+        self._category_nodes = {node.id: node for node in self._categories}
+        self._note_nodes = {}
+        self._reindex_categories()
+        self.endResetModel()
+
+    def set_sort_order(self, order):
+        """切换笔记排序方式，已加载的笔记全部丢弃，展开的分类重新从第一页加载"""
+        if order == self.order:
+            return
+        self.beginResetModel()
+        self.order = order
+        for node in self._categories:
+            node.children = []
+            node.cursor = None
+            node.exhausted = False
+        self._note_nodes = {}
+        self.endResetModel()
+
+    def refresh_stats(self):
+        """重新读取分类聚合统计 (随分类一次查询读出)，只刷新发生变化的分类"""
+        for category in self.category_model.get_all():
+            node = self._category_nodes.get(category.id)
+            stats = _category_stats(category)
+            if node is not None and node.stats != stats:
+                node.stats = stats
+                index = self._category_index(node)
+                self.dataChanged.emit(index, index)
+
+    def _reindex_categories(self):
+        self._category_rows = {node.id: row for row, node in enumerate(self._categories)}
+
+    def _category_index(self, node):
+        return self.createIndex(self._category_rows[node.id], 0, node)
+
+    def _note_index(self, node):
+        return self.createIndex(self._note_row(node), 0, node)
+
+    def _note_row(self, node):
+        """笔记节点在分类中的行号：子节点按 (排序键, id) 有序，二分查找，与分类下已加载的笔记数无关"""
+        children = node.parent.children
+        row = self._bisect(children, node.key, node.id)
+        if row < len(children) and children[row] is node:
+            return row
+        return children.index(node)  # 排序键与位置不一致时退回线性查找
+
+    # ---------- QAbstractItemModel 接口 ----------
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, self._categories[row])
+        return self.createIndex(row, column, parent.internalPointer().children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        node = index.internalPointer()
+        if node.kind == 'category':
+            return QModelIndex()
+        return self._category_index(node.parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        if not parent.isValid():
+            return len(self._categories)
+        node = parent.internalPointer()
+        return len(node.children) if node.kind == 'category' else 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return bool(self._categories)
+        node = parent.internalPointer()
+        return node.kind == 'category' and (bool(node.children) or not node.exhausted)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role == Qt.DisplayRole:
+            if node.kind == 'category':
+                return f"{node.title} ({node.stats[0]})"
+            return node.title
+        if role == Qt.ToolTipRole and node.kind == 'category':
+            count, size, last_updated = node.stats
+            return f"{count} 篇笔记，共 {size} 字" + (f"\n最近修改: {last_updated}" if last_updated else "")
+        if role == Qt.UserRole:
+            return node.kind, node.id
+        return None
+
+    def canFetchMore(self, parent):
+        if not parent.isValid():
+            return False
+        node = parent.internalPointer()
+        return node.kind == 'category' and not node.exhausted
+
+    def fetchMore(self, parent):
+        if not self.canFetchMore(parent):
+            return
+        node = parent.internalPointer()
+        rows = self.note_model.list_page(node.id, self.order, after=node.cursor, limit=self.PAGE_SIZE)
+        if len(rows) < self.PAGE_SIZE:
+            node.exhausted = True
+        if rows:
+            node.cursor = (rows[-1].sort_key, rows[-1].id)
+        # 已通过事件插入的笔记不再重复加载
+        rows = [row for row in rows if row.id not in self._note_nodes]
+        if not rows:
+            return
+        first = len(node.children)
+        self.beginInsertRows(parent, first, first + len(rows) - 1)
+        for row in rows:
+            child = _TreeNode('note', row.id, row.title, node, row.sort_key)
+            node.children.append(child)
+            self._note_nodes[row.id] = child
+        self.endInsertRows()
+
+    # ---------- 定位 ----------
+    def category_index(self, category_id):
+        node = self._category_nodes.get(category_id)
+        return self._category_index(node) if node is not None else QModelIndex()
+
+    def note_index(self, note_id, load=True):
+        """返回笔记索引；笔记尚未加载且 load 为真时，按页加载所属分类直至找到"""
+        node = self._note_nodes.get(note_id)
+        if node is None and load:
+            header = self.note_model.get_header(note_id)
+            category = self._category_nodes.get(header.category_id) if header else None
+            if category is not None:
+                parent = self._category_index(category)
+                while node is None and self.canFetchMore(parent):
+                    self.fetchMore(parent)
+                    node = self._note_nodes.get(note_id)
+        return self._note_index(node) if node is not None else QModelIndex()
+
+    def note_category_id(self, note_id):
+        """已加载笔记所属的分类 id，未加载时返回 None"""
+        node = self._note_nodes.get(note_id)
+        return node.parent.id if node is not None else None
+
+    def neighbour_note_ids(self, note_id, radius=2):
+        """已加载的同分类相邻笔记 id，由近及远排列"""
+        node = self._note_nodes.get(note_id)
+        if node is None:
+            return []
+        siblings = node.parent.children
+        row = self._note_row(node)
+        result = []
+        for distance in range(1, radius + 1):
+            for neighbour_row in (row + distance, row - distance):
+                if 0 <= neighbour_row < len(siblings):
+                    result.append(siblings[neighbour_row].id)
+        return result
+
+    # ---------- 增量更新 ----------
+    def _category_insert_row(self, name):
+        """分类按名称排序，二分查找插入位置"""
+        return bisect_left([node.title for node in self._categories], name)
+
+    def add_category(self, category_id, name):
+        row = self._category_insert_row(name)
+        node = _TreeNode('category', category_id, name)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._categories.insert(row, node)
+        self._category_nodes[category_id] = node
+        self._reindex_categories()
+        self.endInsertRows()
+
+    def rename_category(self, category_id, name):
+        node = self._category_nodes.get(category_id)
+        if node is None:
+            return
+        old_row = self._category_rows[category_id]
+        others = self._categories[:old_row] + self._categories[old_row + 1:]
+        new_row = bisect_left([other.title for other in others], name)
+        if new_row != old_row:
+            self.beginMoveRows(QModelIndex(), old_row, old_row, QModelIndex(),
+                               new_row if new_row < old_row else new_row + 1)
+            node.title = name
+            others.insert(new_row, node)
+            self._categories = others
+            self._reindex_categories()
+            self.endMoveRows()
+        else:
+            node.title = name
+        index = self._category_index(node)
+        self.dataChanged.emit(index, index)
+
+    def remove_category(self, category_id):
+        node = self._category_nodes.pop(category_id, None)
+        if node is None:
+            return
+        row = self._category_rows[category_id]
+        self.beginRemoveRows(QModelIndex(), row, row)
+        for child in node.children:
+            self._note_nodes.pop(child.id, None)
+        del self._categories[row]
+        self._reindex_categories()
+        self.endRemoveRows()
+
+    def _bisect(self, children, key, note_id):
+        """按当前排序方式二分查找 (key, note_id) 在 children 中的位置"""
+        descending = SORT_ORDERS[self.order][1] == 'DESC'
+        low, high = 0, len(children)
+        while low < high:
+            mid = (low + high) // 2
+            other = (children[mid].key, children[mid].id)
+            before = other > (key, note_id) if descending else other < (key, note_id)
+            if before:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def _sort_position(self, category, key, note_id):
+        """
+        笔记在已加载子节点中的位置；排在已加载部分之后且分类未加载完时返回 None，
+        此时该笔记会在后续分页中加载
+        """
+        position = self._bisect(category.children, key, note_id)
+        if position == len(category.children) and not category.exhausted:
+            return None
+        return position
+
+    def _remove_note_node(self, node):
+        category = node.parent
+        row = self._note_row(node)
+        self.beginRemoveRows(self._category_index(category), row, row)
+        del category.children[row]
+        self._note_nodes.pop(node.id, None)
+        self.endRemoveRows()
+
+    def _place_note(self, header):
+        """
+        按笔记的最新头信息把节点放到所属分类的正确位置
+        已在正确位置时只更新标题；分类尚未加载时等展开再读取
+        """
+        note_id = header.id
+        key = getattr(header, SORT_ORDERS[self.order][0])
+        node = self._note_nodes.get(note_id)
+        category = self._category_nodes.get(header.category_id)
+        if node is not None and node.parent is category:
+            row = self._note_row(node)
+            del category.children[row]
+            position = self._sort_position(category, key, note_id)
+            category.children.insert(row, node)
+            node.title = header.title
+            node.key = key
+            if position == row:
+                index = self._note_index(node)
+                self.dataChanged.emit(index, index)
+                return
+            if position is not None:
+                parent = self._category_index(category)
+                self.beginMoveRows(parent, row, row, parent, position if position < row else position + 1)
+                del category.children[row]
+                category.children.insert(position, node)
+                self.endMoveRows()
+                index = self._note_index(node)
+                self.dataChanged.emit(index, index)
+                return
+        if node is not None:
+            self._remove_note_node(node)
+        if category is None or not category.fetched:
+            return
+        position = self._sort_position(category, key, note_id)
+        if position is None:
+            return
+        self.beginInsertRows(self._category_index(category), position, position)
+        node = _TreeNode('note', note_id, header.title, category, key)
+        category.children.insert(position, node)
+        self._note_nodes[note_id] = node
+        self.endInsertRows()
+
+    def _refresh_note(self, note_id):
+        header = self.note_model.get_header(note_id)
+        if header is not None:
+            self._place_note(header)
+
+    def add_note(self, category_id, note_id, title):
+        self._refresh_note(note_id)
+
+    def touch_note(self, note_id, title=None):
+        """笔记被修改 (或改名) 后按新的排序键移动位置"""
+        self._refresh_note(note_id)
+
+    def move_note(self, note_id, category_id):
+        self._refresh_note(note_id)
+
+    def remove_note(self, note_id):
+        node = self._note_nodes.get(note_id)
+        if node is not None:
+            self._remove_note_node(node)
+
+
+class NoteTreeView(QTreeView):
+    """滚动到已加载笔记末尾时继续加载下一页"""
+    PREFETCH_MARGIN = 20
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setUniformRowHeights(True)  # 行高一致，避免逐行计算布局
+        self.verticalScrollBar().valueChanged.connect(self._fetch_more_visible)
+
+    def _fetch_more_visible(self):
+        model = self.model()
+        if model is None:
+            return
+        index = self.indexAt(QPoint(1, self.viewport().height() - 1))
+        if not index.isValid():
+            return
+        parent = index.parent()
+        if not parent.isValid():
+            return  # 最底部可见的是分类本身，其子节点尚在视口之外
+        if model.canFetchMore(parent) and index.row() >= model.rowCount(parent) - self.PREFETCH_MARGIN:
+            model.fetchMore(parent)
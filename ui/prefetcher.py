@@ -0,0 +1,168 @@
+import threading
+from collections import OrderedDict, deque
+
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal
+
+from db.database import Database
+from models.note_model import NoteModel
+from utils.text_index import html_to_text
+
+
+class _PrefetchThread(QThread):
+    """后台预取线程：使用独立只读连接读取笔记正文并提取纯文本"""
+    # (批次号, 笔记 id, 请求时的笔记版本, 笔记数据)
+    fetched = pyqtSignal(int, int, int, object)
+
+    def __init__(self, db_path, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._generation = 0
+        self._stopping = False
+
+    def enqueue(self, generation, requests):
+        """requests: [(笔记 id, 版本), ...]"""
+        with self._condition:
+            self._queue.extend((generation, note_id, version) for note_id, version in requests)
+            self._condition.notify()
+
+    def cancel(self, generation):
+        """丢弃尚未执行的预取，只接受新批次"""
+        with self._condition:
+            self._generation = generation
+            self._queue.clear()
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._queue.clear()
+            self._condition.notify()
+
+    def run(self):
+        reader = Database(self.db_path, read_only=True)
+        note_model = NoteModel(reader)
+        try:
+            while True:
+                with self._condition:
+                    while not self._queue and not self._stopping:
+                        self._condition.wait()
+                    if self._stopping:
+                        break
+                    generation, note_id, version = self._queue.popleft()
+                    if generation != self._generation:
+                        continue
+                try:
+                    note = note_model.get_by_id(note_id)
+                except Exception as e:
+                    print(f"[prefetch] 读取笔记 {note_id} 失败: {e}")
+                    continue
+                if note is None:
+                    continue
+                note.text = html_to_text(note.content)
+                self.fetched.emit(generation, note_id, version, note)
+        finally:
+            reader.close()
+
+
+class NotePrefetcher(QObject):
+    """
+    预取可能被打开的笔记 (选中笔记的相邻笔记、鼠标悬停的笔记)
+    正文读取与纯文本提取在后台线程完成，结果在 UI 线程空闲时解析为文档放入文档缓存
+    选中项变化时取消过期的预取，并统计打开笔记时的命中率
+    每个请求带有笔记的版本号，笔记被修改或删除后版本号递增，之前发出的请求读到的旧内容被丢弃
+    """
+    # 笔记数据已就绪 (note_id)
+    note_ready = pyqtSignal(int)
+
+    MAX_PREFETCHED = 64
+
+    def __init__(self, db, document_cache, create_document, parent=None):
+        super().__init__(parent)
+        self.document_cache = document_cache
+        self.create_document = create_document
+        self._generation = 0
+        self._notes = OrderedDict()  # note_id -> 预取的笔记数据
+        self._versions = {}  # note_id -> 失效次数，未失效过的笔记为 0
+        self._warm_queue = deque()
+        self._warmed_ids = set()
+        self.hits = 0
+        self.misses = 0
+
+        self._thread = _PrefetchThread(db.db_path, self)
+        self._thread.fetched.connect(self._on_fetched)
+        self._thread.start()
+
+        # 每次空闲只解析一篇，避免长时间占用 UI 线程
+        self._warm_timer = QTimer(self)
+        self._warm_timer.setInterval(0)
+        self._warm_timer.timeout.connect(self._warm_next)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def reset(self):
+        """选中项变化：取消尚未完成的预取"""
+        self._generation += 1
+        self._thread.cancel(self._generation)
+        self._warm_queue.clear()
+        self._warm_timer.stop()
+
+    def prefetch(self, note_ids):
+        pending = [
+            note_id for note_id in note_ids
+            if note_id not in self._notes and note_id not in self.document_cache
+        ]
+        if pending:
+            self._thread.enqueue(self._generation, [(note_id, self._versions.get(note_id, 0)) for note_id in pending])
+
+    def peek(self, note_id):
+        """查看已预取的笔记数据，不计入命中统计"""
+        return self._notes.get(note_id)
+
+    def take(self, note_id):
+        """打开笔记时调用：返回预取的笔记数据 (可能为 None) 并记录是否命中"""
+        note = self._notes.pop(note_id, None)
+        if note is not None or note_id in self._warmed_ids:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self._warmed_ids.discard(note_id)
+        return note
+
+    def invalidate(self, note_id):
+        """笔记被修改或删除时丢弃预取结果，仍在读取中的旧请求的结果也不再接受"""
+        self._versions[note_id] = self._versions.get(note_id, 0) + 1
+        self._notes.pop(note_id, None)
+        self._warmed_ids.discard(note_id)
+
+    def shutdown(self):
+        self._warm_timer.stop()
+        self._thread.stop()
+        self._thread.wait()
+
+    def _on_fetched(self, generation, note_id, version, note):
+        if generation != self._generation or version != self._versions.get(note_id, 0):
+            return  # 过期批次，或读取期间笔记已被修改
+        self._notes[note_id] = note
+        self._notes.move_to_end(note_id)
+        while len(self._notes) > self.MAX_PREFETCHED:
+            self._notes.popitem(last=False)
+        self._warm_queue.append(note_id)
+        self._warm_timer.start()
+        self.note_ready.emit(note_id)
+
+    def _warm_next(self):
+        if not self._warm_queue:
+            self._warm_timer.stop()
+            return
+        note_id = self._warm_queue.popleft()
+        note = self._notes.get(note_id)
+        # 缓存接近预算上限时不再预热，避免挤掉用户最近打开的文档
+        if note is None or note_id in self.document_cache \
+                or self.document_cache.total_bytes > self.document_cache.max_bytes * 0.8:
+            return
+        self.document_cache.put(note_id, self.create_document(note.content))
+        self._warmed_ids.add(note_id)
@@ -0,0 +1,86 @@
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtWidgets import (
+    QDialog, QHBoxLayout, QVBoxLayout, QListWidget, QListWidgetItem, QPushButton, QLabel, QMessageBox
+)
+
+from models.trash_model import TrashModel
+
+
+class TrashDialog(QDialog):
+    """
+    回收站：列出已删除的分类与笔记，可恢复选中项或清空回收站
+    列表在只读连接池中查询，恢复在后台写线程执行，树通过模型事件增量更新
+    """
+    # 请求清空回收站，由主窗口的后台清理任务分批物理删除
+    empty_requested = pyqtSignal()
+
+    def __init__(self, async_db, parent=None):
+        super().__init__(parent)
+        self.async_db = async_db
+        self.setWindowTitle("回收站")
+        self.resize(600, 500)
+
+        layout = QVBoxLayout(self)
+        self.item_list = QListWidget()
+        self.item_list.currentItemChanged.connect(
+            lambda item, previous=None: self.btn_restore.setEnabled(item is not None)
+        )
+        layout.addWidget(self.item_list, 1)
+
+        button_layout = QHBoxLayout()
+        self.status_label = QLabel("正在加载…")
+        button_layout.addWidget(self.status_label, 1)
+        self.btn_restore = QPushButton("恢复")
+        self.btn_restore.setEnabled(False)
+        self.btn_restore.clicked.connect(self.restore)
+        button_layout.addWidget(self.btn_restore)
+        btn_empty = QPushButton("清空回收站")
+        btn_empty.clicked.connect(self.empty)
+        button_layout.addWidget(btn_empty)
+        btn_close = QPushButton("关闭")
+        btn_close.clicked.connect(self.reject)
+        button_layout.addWidget(btn_close)
+        layout.addLayout(button_layout)
+
+        self.load()
+
+    def load(self):
+        self.async_db.call(TrashModel, 'list_categories', on_result=self.on_categories_loaded, on_error=self.on_error)
+
+    def on_categories_loaded(self, categories):
+        self.item_list.clear()
+        for category in categories:
+            item = QListWidgetItem(f"📁 {category.name}  ({category.note_count} 篇)  删除于 {category.deleted_at}")
+            item.setData(Qt.UserRole, ('category', category.id))
+            self.item_list.addItem(item)
+        self.async_db.call(TrashModel, 'list_notes', on_result=self.on_notes_loaded, on_error=self.on_error)
+
+    def on_notes_loaded(self, notes):
+        for note in notes:
+            item = QListWidgetItem(f"📄 {note.title}  [{note.category}]  删除于 {note.deleted_at}")
+            item.setData(Qt.UserRole, ('note', note.id))
+            self.item_list.addItem(item)
+        count = self.item_list.count()
+        self.status_label.setText(f"共 {count} 项" if count else "回收站为空")
+
+    def restore(self):
+        item = self.item_list.currentItem()
+        if item is None:
+            return
+        item_type, item_id = item.data(Qt.UserRole)
+        method = 'restore_category' if item_type == 'category' else 'restore_note'
+        self.async_db.call(TrashModel, method, item_id, write=True,
+                           on_result=lambda _: self.load(), on_error=self.on_error)
+
+    def empty(self):
+        reply = QMessageBox.question(
+            self, '清空回收站', "回收站中的分类与笔记将被永久删除，确定吗?",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.empty_requested.emit()
+            self.accept()
+
+    def on_error(self, e):
+        print(f"[TrashDialog] 回收站操作失败: {e}")
+        QMessageBox.critical(self, "错误", f"回收站操作失败: {e}")
@@ -0,0 +1,50 @@
+# 长笔记正文的分块
+"""
+长笔记的正文按行切分为若干块，每块以内容哈希为键单独存放 (见 models/content_block_model.py)，
+note_contents 中只保存按顺序排列的块哈希清单；保存时只写入发生变化的块
+
+分块边界由内容决定：块长度达到 MIN_BLOCK_SIZE 后，在哈希值满足条件的行尾切分，
+超过 MAX_BLOCK_SIZE 时强制切分。插入或删除内容只影响附近的一两个块，之后的边界保持不变
+"""
+import hashlib
+import zlib
+
+# 短于该长度的正文整体存放，不分块
+BLOCK_THRESHOLD = 32 * 1024
+
+MIN_BLOCK_SIZE = 2 * 1024
+MAX_BLOCK_SIZE = 16 * 1024
+# 行哈希低位为 0 时切分，平均每 8 行一个候选边界
+_BOUNDARY_MASK = 0x7
+
+HASH_SIZE = 20
+
+
+def split_blocks(content):
+    """把正文切分为块，按顺序拼接即为原文"""
+    blocks = []
+    current = []
+    size = 0
+    for line in content.splitlines(keepends=True):
+        current.append(line)
+        size += len(line)
+        if size >= MAX_BLOCK_SIZE or (size >= MIN_BLOCK_SIZE and zlib.crc32(line.encode('utf-8')) & _BOUNDARY_MASK == 0):
+            blocks.append("".join(current))
+            current = []
+            size = 0
+    if current:
+        blocks.append("".join(current))
+    return blocks
+
+
+def block_hash(block):
+    return hashlib.sha1(block.encode('utf-8')).digest()
+
+
+def pack_manifest(hashes):
+    """块哈希清单，写入 note_contents.content"""
+    return b"".join(hashes)
+
+
+def unpack_manifest(value):
+    return [value[i:i + HASH_SIZE] for i in range(0, len(value), HASH_SIZE)]
@@ -0,0 +1,71 @@
+# 笔记正文的存储编码
+"""
+note_contents.format 记录每行正文的编码方式：
+    FORMAT_RAW        0  未压缩的 HTML 文本 (旧数据)
+    FORMAT_ZLIB_DICT  1  使用 QT_HTML_DICTIONARY 作为预置字典的 zlib 压缩
+    FORMAT_BLOCKS     2  长笔记分块存放，content 为块哈希清单 (由 ContentBlockModel 拼接，不经 decode_content)
+
+字典内容一旦发布就不能修改，否则已有数据无法解压；需要调整字典时应新增格式编号
+"""
+import zlib
+
+FORMAT_RAW = 0
+FORMAT_ZLIB_DICT = 1
+FORMAT_BLOCKS = 2
+
+# 当前写入使用的格式
+CURRENT_FORMAT = FORMAT_ZLIB_DICT
+
+# 短于该长度的正文压缩收益很小，直接按原文存储
+MIN_COMPRESS_LENGTH = 64
+
+# Qt toHtml() 输出中反复出现的片段，越常用的放在越靠后 (zlib 对字典末尾的匹配距离更短)
+QT_HTML_DICTIONARY = (
+    '<img src="glacier-image:" width="" height="" />'
+    '<table border="0" style=" margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px;'
+    ' border-collapse:collapse;" cellspacing="2" cellpadding="0">\n<tr>\n<td style=" padding-right:8;">\n'
+    '<pre align="right" style=" margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px;'
+    ' -qt-block-indent:0; text-indent:0px;"><span style=" font-family:\'monospace\'; font-size:13px;'
+    ' color:#316dfb;">1</span></pre></td>\n<td bgcolor="#f0f0f0">\n'
+    '<span style=" font-family:\'monospace\'; font-size:13px; background-color:#f0f0f0;"></span></p></td></tr>\n'
+    '</table>'
+    '<span style=" font-style:italic;"><span style=" text-decoration: underline;"><span style=" color:#'
+    '<span style=" font-size:12pt;"><span style=" font-family:\'Microsoft YaHei\';">'
+    '<ul style="margin-top: 0px; margin-bottom: 0px; margin-left: 0px; margin-right: 0px;'
+    ' -qt-list-indent: 1;"><li style=" margin-top:12px; margin-bottom:12px;'
+    '<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.0//EN" "http://www.w3.org/TR/REC-html40/strict.dtd">\n'
+    '<html><head><meta name="qrichtext" content="1" /><style type="text/css">\n'
+    'p, li { white-space: pre-wrap; }\n'
+    '</style></head><body style=" font-family:\'微软雅黑\'; font-size:16pt; font-weight:400;'
+    ' font-style:normal;">\n'
+    '</p></body></html>'
+    '<span style=" font-weight:600;">'
+    '<span style=" color:#000000;">'
+    '<p style="-qt-paragraph-type:empty; margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px;'
+    ' -qt-block-indent:0; text-indent:0px;"><br /></p>\n'
+    '</span></p>\n'
+    '<p style=" margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px;'
+    ' -qt-block-indent:0; text-indent:0px;">'
+).encode('utf-8')
+
+
+def encode_content(content):
+    """返回 (format, value)，value 为写入 note_contents.content 的值"""
+    if content is None or len(content) < MIN_COMPRESS_LENGTH:
+        return FORMAT_RAW, content
+    compressor = zlib.compressobj(level=6, zdict=QT_HTML_DICTIONARY)
+    data = compressor.compress(content.encode('utf-8')) + compressor.flush()
+    # 压缩后反而更大时保留原文 (已压缩的内容、极短的正文)
+    if len(data) >= len(content.encode('utf-8')):
+        return FORMAT_RAW, content
+    return FORMAT_ZLIB_DICT, data
+
+
+def decode_content(fmt, value):
+    """按格式标记还原正文 HTML"""
+    if value is None or fmt == FORMAT_RAW or fmt is None:
+        return value
+    if fmt == FORMAT_ZLIB_DICT:
+        decompressor = zlib.decompressobj(zdict=QT_HTML_DICTIONARY)
+        return (decompressor.decompress(value) + decompressor.flush()).decode('utf-8')
+    raise ValueError(f"未知的正文编码格式: {fmt}")
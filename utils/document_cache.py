@@ -0,0 +1,88 @@
+# 已解析笔记文档的缓存
+from collections import OrderedDict
+
+# 每个字符在 QTextDocument 中的大致内存开销 (文本、格式、布局)
+_BYTES_PER_CHAR = 16
+
+
+def estimate_document_size(document):
+    """
+    估算文档占用的内存：文本与布局开销加上文档已持有的完整图片
+    不读取图片资源，避免为了估算而加载尚未显示的图片
+    """
+    size = document.characterCount() * _BYTES_PER_CHAR
+    return size + getattr(document, 'loaded_image_bytes', 0)
+
+
+class DocumentCache:
+    """
+    按笔记 id 缓存完整解析后的 QTextDocument (含撤销栈)，切换笔记时直接换入编辑器
+    LRU 淘汰，总大小受字节预算约束；当前显示的文档被固定，不会被淘汰
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # note_id -> (document, size)
+        self._total_bytes = 0
+        self._pinned_id = None
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, note_id):
+        return note_id in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def get(self, note_id):
+        entry = self._entries.get(note_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(note_id)
+        return entry[0]
+
+    def put(self, note_id, document, size=None):
+        if size is None:
+            size = estimate_document_size(document)
+        self._remove(note_id)
+        self._entries[note_id] = (document, size)
+        self._total_bytes += size
+        self._evict()
+
+    def pin(self, note_id):
+        """固定当前显示的文档，note_id 为 None 时取消固定"""
+        self._pinned_id = note_id
+        self._evict()
+
+    def refresh_size(self, note_id):
+        """文档被编辑后重新估算其大小"""
+        entry = self._entries.get(note_id)
+        if entry is not None:
+            self.put(note_id, entry[0])
+
+    def invalidate(self, note_id):
+        """笔记被更新或删除时移除缓存的文档"""
+        self._remove(note_id)
+
+    def clear(self):
+        self._entries.clear()
+        self._total_bytes = 0
+
+    def _remove(self, note_id):
+        # 文档归 Python 持有，编辑器正在显示时由 RichTextEdit 的引用保持存活
+        entry = self._entries.pop(note_id, None)
+        if entry is not None:
+            self._total_bytes -= entry[1]
+
+    def _evict(self):
+        for note_id in list(self._entries):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if note_id != self._pinned_id:
+                self._remove(note_id)
@@ -0,0 +1,75 @@
+# 编辑器文档的规范紧凑序列化
+"""
+Qt 的 toHtml() 每篇笔记都带有 DOCTYPE、meta、全局样式表，每个段落重复同一串边距样式
+serialize_document 在 toHtml() 的基础上去掉可由默认值恢复的部分：
+    - 文档头与 <body> 样式 (与编辑器默认字体一致时)
+    - 段落/预格式块的零边距、零缩进样式
+    - 相邻且样式相同的 <span> 合并为一个
+load_document 通过默认样式表恢复这些默认值，因此紧凑形式与原始 toHtml() 解析出的文档相同
+旧的完整 HTML 同样可以由 load_document 解析
+"""
+import re
+
+from PyQt5.QtGui import QTextDocument
+
+# 解析紧凑 HTML 时补回的默认样式；完整 HTML 中的显式样式优先
+DEFAULT_STYLESHEET = "p, li, pre { white-space: pre-wrap; margin-top: 0px; margin-bottom: 0px; }"
+
+_BLOCK_DEFAULTS = " margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px; -qt-block-indent:0; text-indent:0px;"
+_HEADER_END = re.compile(r'^.*?<body[^>]*>\n?', re.DOTALL)
+_BLOCK_STYLE = re.compile(r'<(p|pre)([^>]*?) style="([^"]*)"')
+_ADJACENT_SPANS = re.compile(r'<span style="([^"]*)">((?:(?!<span|</span>).)*)</span><span style="\1">', re.DOTALL)
+_FOOTER = '</body></html>'
+
+_default_headers = {}
+
+
+def _default_header(document):
+    """与文档默认字体对应的 toHtml() 文档头，只有文档头与之相同时才能省略"""
+    font_key = document.defaultFont().key()
+    header = _default_headers.get(font_key)
+    if header is None:
+        empty = QTextDocument()
+        empty.setDefaultFont(document.defaultFont())
+        header = _HEADER_END.match(empty.toHtml()).group(0)
+        _default_headers[font_key] = header
+    return header
+
+
+def compact_html(html, default_header):
+    """把 toHtml() 的输出转换为紧凑形式；文档头与 default_header 不同时保留文档头"""
+    header = _HEADER_END.match(html)
+    if header is None or header.group(0) != default_header:
+        return html
+    body = html[header.end():]
+    if body.endswith(_FOOTER):
+        body = body[:-len(_FOOTER)]
+
+    def strip_block_defaults(match):
+        style = match.group(3).replace(_BLOCK_DEFAULTS, "")
+        if not style.strip():
+            return f"<{match.group(1)}{match.group(2)}"
+        return f'<{match.group(1)}{match.group(2)} style="{style}"'
+
+    body = _BLOCK_STYLE.sub(strip_block_defaults, body)
+    while True:
+        merged = _ADJACENT_SPANS.sub(r'<span style="\1">\2', body)
+        if merged == body:
+            break
+        body = merged
+    return body
+
+
+def serialize_document(document):
+    """序列化编辑器文档为规范紧凑 HTML"""
+    return compact_html(document.toHtml(), _default_header(document))
+
+
+def load_document(document, html):
+    """解析紧凑 HTML 或旧的完整 HTML 到文档中"""
+    document.setDefaultStyleSheet(DEFAULT_STYLESHEET)
+    document.setHtml(html or "")
+
+
+def is_compact(html):
+    return not html.startswith("<!DOCTYPE")
@@ -0,0 +1,53 @@
+# 解码后图片的进程级缓存
+from collections import OrderedDict
+
+
+class ImageCache:
+    """
+    按图片键缓存解码后的 QImage，所有笔记文档共享
+    LRU 淘汰，总大小受字节预算约束；QImage 为隐式共享，文档仍在使用的图片被淘汰后不会重复占用内存
+    """
+
+    def __init__(self, max_bytes=128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (image, size)
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, image):
+        self._remove(key)
+        size = image.sizeInBytes()
+        self._entries[key] = (image, size)
+        self._total_bytes += size
+        # 超出预算时淘汰最久未使用的图片，刚放入的图片至少保留
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        self._entries.clear()
+        self._total_bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[1]
@@ -0,0 +1,111 @@
+# 插入图片的后台解码与编码
+import itertools
+
+from PyQt5.QtCore import QCoreApplication, QEvent, QObject, QRunnable, QSize, Qt, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader
+
+from utils.image_store import encode_image, make_thumbnail
+
+# 超过该解码大小 (字节) 的图片缩小到 MAX_SIZE 以内并重新编码为 JPEG
+MAX_DECODED_BYTES = 3 * 1024 * 1024
+MAX_SIZE = QSize(800, 600)
+
+
+def target_size(size):
+    """按原始尺寸计算插入后的尺寸：解码后超过大小限制时等比缩小到 MAX_SIZE 以内"""
+    if size.isValid() and size.width() * size.height() * 4 > MAX_DECODED_BYTES:
+        return size.scaled(MAX_SIZE, Qt.KeepAspectRatio)
+    return size
+
+
+class _IngestSignals(QObject):
+    # (任务号, 解码后的图片, 待存储的字节, 格式, 缩略图字节)
+    ready = pyqtSignal(int, QImage, object, str, object)
+    # (任务号, 错误信息)
+    failed = pyqtSignal(int, str)
+
+
+class _FileTask(QRunnable):
+    """读取图片文件；需要缩小时由 QImageReader 直接按目标尺寸解码，不解码完整原图"""
+
+    def __init__(self, ticket, file_path, signals):
+        super().__init__()
+        self.ticket = ticket
+        self.file_path = file_path
+        self.signals = signals
+
+    def run(self):
+        try:
+            reader = QImageReader(self.file_path)
+            reader.setAutoTransform(True)
+            fmt = bytes(reader.format()).decode() or 'JPEG'
+            size = reader.size()
+            scaled = target_size(size)
+            if scaled != size:
+                reader.setScaledSize(scaled)
+            image = reader.read()
+            if image.isNull():
+                self.signals.failed.emit(self.ticket, reader.errorString())
+                return
+            if scaled != size:
+                fmt, data = 'JPEG', encode_image(image)
+            else:
+                # 无需缩放的图片按原文件保存，同一文件多次插入只存一份
+                with open(self.file_path, 'rb') as f:
+                    data = f.read()
+            self.signals.ready.emit(self.ticket, image, data, fmt, make_thumbnail(image))
+        except Exception as e:
+            self.signals.failed.emit(self.ticket, str(e))
+
+
+class _ImageTask(QRunnable):
+    """粘贴的图片已解码，在后台缩放并编码"""
+
+    def __init__(self, ticket, image, signals):
+        super().__init__()
+        self.ticket = ticket
+        self.image = image
+        self.signals = signals
+
+    def run(self):
+        try:
+            image = self.image.scaled(MAX_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self.signals.ready.emit(self.ticket, image, encode_image(image), 'JPEG', make_thumbnail(image))
+        except Exception as e:
+            self.signals.failed.emit(self.ticket, str(e))
+
+
+class ImageIngestor(QObject):
+    """
+    图片插入的后台处理：每张图片一个任务，在线程池中并行解码、缩放、编码并生成缩略图
+    提交时立即返回任务号，结果通过 ready / failed 信号在 GUI 线程送达
+    """
+    ready = pyqtSignal(int, QImage, object, str, object)
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._tickets = itertools.count(1)
+        self._signals = _IngestSignals(self)
+        self._signals.ready.connect(self.ready)
+        self._signals.failed.connect(self.failed)
+
+    def submit_file(self, file_path):
+        """返回 (任务号, 插入后的预计尺寸)；尺寸只读取文件头得到，无法识别时为无效 QSize"""
+        ticket = next(self._tickets)
+        size = target_size(QImageReader(file_path).size())
+        self._pool.start(_FileTask(ticket, file_path, self._signals))
+        return ticket, size
+
+    def submit_image(self, image):
+        ticket = next(self._tickets)
+        size = image.size().scaled(MAX_SIZE, Qt.KeepAspectRatio)
+        self._pool.start(_ImageTask(ticket, image, self._signals))
+        return ticket, size
+
+    def wait(self, msecs=-1):
+        """等待全部任务完成并立即送达结果 (关闭窗口前调用)"""
+        done = self._pool.waitForDone(msecs)
+        QCoreApplication.sendPostedEvents(self, QEvent.MetaCall)
+        return done
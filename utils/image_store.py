@@ -0,0 +1,157 @@
+# 编辑器使用的图片库访问层
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QSize, Qt
+from PyQt5.QtGui import QImage
+
+from models.image_model import ImageModel, image_key
+from utils.image_cache import ImageCache
+
+_FORMAT_MIME = {
+    'png': 'image/png', 'jpg': 'image/jpeg', 'jpeg': 'image/jpeg',
+    'bmp': 'image/bmp', 'gif': 'image/gif',
+}
+
+# 缩略图最大尺寸，完整图片解码完成前显示
+THUMB_SIZE = QSize(160, 120)
+
+
+def mime_for_format(fmt):
+    return _FORMAT_MIME.get(fmt.lower(), 'application/octet-stream')
+
+
+def encode_image(image, fmt='JPEG', quality=80):
+    """把 QImage 编码为字节串"""
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, fmt, quality)
+    buffer.close()
+    return bytes(data)
+
+
+def make_thumbnail(image):
+    """生成缩略图字节 (JPEG)，可在后台线程调用"""
+    return encode_image(image.scaled(THUMB_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation), 'JPEG', 70)
+
+
+def _decode_job(db, key, data):
+    """在读线程中读取并解码图片；旧图片同时生成缺少的尺寸与缩略图"""
+    derived = None
+    if data is None:
+        row = ImageModel(db).get(key)
+        if row is None:
+            return None, None
+        data = row['data']
+        image = QImage.fromData(data)
+        if not image.isNull() and (row['width'] is None or not row['has_thumb']):
+            derived = (image.width(), image.height(), make_thumbnail(image))
+    else:
+        image = QImage.fromData(data)
+    return (None if image.isNull() else image), derived
+
+
+class ImageStore:
+    """
+    图片存取：读取在调用线程的连接上执行，写入交给后台写线程
+    写入完成前的图片保留在内存中，期间打开的文档同样可以解析到
+    解码后的图片放入进程级 LRU 缓存，所有笔记共享；完整图片在后台读线程中解码
+    """
+
+    def __init__(self, db, async_db=None, cache=None):
+        self.db = db
+        self.async_db = async_db
+        self.cache = cache if cache is not None else ImageCache()
+        self.thumbnails = ImageCache(max_bytes=8 * 1024 * 1024)
+        self._unwritten = {}  # key -> 尚未写入数据库的图片字节
+        self._waiters = {}    # key -> [等待完整图片的回调]
+
+    def store_bytes(self, data, mime, width=None, height=None, thumb=None):
+        """存入已编码的图片并返回其键；相同内容的图片只保存一次"""
+        key = image_key(data)
+        if self.async_db is None:
+            ImageModel(self.db).put(data, mime, width, height, thumb)
+            return key
+        if key in self._unwritten:
+            return key
+        self._unwritten[key] = data
+
+        def on_error(e):
+            print(f"[ImageStore] 保存图片失败: {e}")
+
+        self.async_db.call(ImageModel, 'put', data, mime, width, height, thumb, write=True,
+                           on_result=lambda _: self._unwritten.pop(key, None), on_error=on_error)
+        return key
+
+    def load(self, key):
+        """按键同步读取并解码图片，不存在时返回 None"""
+        image = self.cache.get(key)
+        if image is not None:
+            return image
+        image, derived = _decode_job(self.db, key, self._unwritten.get(key))
+        if image is not None:
+            self.cache.put(key, image)
+        if derived is not None:
+            self._save_derived(key, derived)
+        return image
+
+    def cached(self, key):
+        return self.cache.get(key)
+
+    def thumbnail(self, key):
+        """返回缩略图，没有时返回 None"""
+        image = self.thumbnails.get(key)
+        if image is None:
+            data = ImageModel(self.db).get_thumbnail(key)
+            if not data:
+                return None
+            image = QImage.fromData(data)
+            if image.isNull():
+                return None
+            self.thumbnails.put(key, image)
+        return image
+
+    def image_sizes(self, keys):
+        """
+        返回 {key: (width, height)}，供打开文档时补全缺少尺寸的图片
+        尺寸未知的旧图片在此同步解码一次并回写尺寸
+        """
+        keys = set(keys)
+        sizes = ImageModel(self.db).get_sizes(keys)
+        for key in keys - sizes.keys():
+            image = self.load(key)
+            if image is not None:
+                sizes[key] = (image.width(), image.height())
+        return sizes
+
+    def request(self, key, callback):
+        """在后台解码完整图片，完成后在 GUI 线程以 callback(key, image) 通知；同一图片只解码一次"""
+        waiters = self._waiters.get(key)
+        if waiters is not None:
+            waiters.append(callback)
+            return
+        self._waiters[key] = [callback]
+
+        def on_result(result):
+            image, derived = result
+            callbacks = self._waiters.pop(key, [])
+            if derived is not None:
+                self._save_derived(key, derived)
+            if image is None:
+                return
+            self.cache.put(key, image)
+            for waiting in callbacks:
+                waiting(key, image)
+
+        def on_error(e):
+            self._waiters.pop(key, None)
+            print(f"[ImageStore] 解码图片失败: {e}")
+
+        self.async_db.read(_decode_job, key, self._unwritten.get(key),
+                           on_result=on_result, on_error=on_error)
+
+    def _save_derived(self, key, derived):
+        width, height, thumb = derived
+        if self.async_db is None:
+            ImageModel(self.db).set_derived(key, width, height, thumb)
+            return
+        self.async_db.call(ImageModel, 'set_derived', key, width, height, thumb, write=True,
+                           on_error=lambda e: print(f"[ImageStore] 保存缩略图失败: {e}"))
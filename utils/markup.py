@@ -0,0 +1,312 @@
+# 外部笔记格式与编辑器 HTML 之间的转换
+"""
+导入: Markdown / HTML / 纯文本 → 编辑器可解析的 HTML 片段 (与紧凑 HTML 一样不带文档头)
+导出: 编辑器 HTML → Markdown
+只依赖标准库，可在导入导出进程池的子进程中执行
+
+Markdown 只支持常用语法: 标题、段落、列表、引用、分隔线、围栏代码块、
+行内代码、粗体、斜体、链接与图片
+"""
+import html
+import re
+from html.parser import HTMLParser
+
+_FENCE = re.compile(r"^(```|~~~)")
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_RULE = re.compile(r"^(\*\s*){3,}$|^(-\s*){3,}$|^(_\s*){3,}$")
+_UNORDERED = re.compile(r"^\s*[-*+]\s+(.*)$")
+_ORDERED = re.compile(r"^\s*\d+[.)]\s+(.*)$")
+_QUOTE = re.compile(r"^\s*>\s?(.*)$")
+
+_CODE_SPAN = re.compile(r"`([^`]+)`")
+_IMAGE = re.compile(r"!\[([^\]]*)\]\(([^)\s]+)(?:\s+&quot;[^)]*&quot;)?\)")
+_LINK = re.compile(r"\[([^\]]+)\]\(([^)\s]+)(?:\s+&quot;[^)]*&quot;)?\)")
+_BOLD = re.compile(r"(\*\*|__)(?=\S)(.+?)(?<=\S)\1")
+_ITALIC = re.compile(r"(?<![*\w])([*_])(?=\S)(.+?)(?<=\S)\1(?![*\w])")
+
+_BODY = re.compile(r"<body[^>]*>(.*)</body>", re.DOTALL | re.IGNORECASE)
+_TITLE = re.compile(r"<title[^>]*>(.*?)</title>", re.DOTALL | re.IGNORECASE)
+
+
+def text_to_html(text):
+    """纯文本每行一个段落，空行保留为空段落"""
+    return "".join(
+        f"<p>{html.escape(line)}</p>\n" if line.strip() else "<p><br /></p>\n"
+        for line in text.splitlines()
+    )
+
+
+def _inline(text):
+    """行内 Markdown 语法；代码片段中的内容不再解析"""
+    codes = []
+
+    def keep_code(match):
+        codes.append(f'<code>{match.group(1)}</code>')
+        return f"\x00{len(codes) - 1}\x00"
+
+    text = _CODE_SPAN.sub(keep_code, html.escape(text, quote=True))
+    text = _IMAGE.sub(r'<img src="\2" alt="\1" />', text)
+    text = _LINK.sub(r'<a href="\2">\1</a>', text)
+    text = _BOLD.sub(r"<b>\2</b>", text)
+    text = _ITALIC.sub(r"<i>\2</i>", text)
+    return re.sub(r"\x00(\d+)\x00", lambda m: codes[int(m.group(1))], text)
+
+
+def markdown_to_html(text):
+    parts = []
+    paragraph = []
+    list_tag = None
+    code_fence = None
+    code_lines = []
+
+    def close_paragraph():
+        if paragraph:
+            parts.append(f"<p>{_inline(' '.join(paragraph))}</p>\n")
+            paragraph.clear()
+
+    def close_list():
+        nonlocal list_tag
+        if list_tag:
+            parts.append(f"</{list_tag}>\n")
+            list_tag = None
+
+    for line in text.splitlines():
+        if code_fence is not None:
+            if line.strip().startswith(code_fence):
+                parts.append(f"<pre>{html.escape(chr(10).join(code_lines))}</pre>\n")
+                code_fence = None
+                code_lines = []
+            else:
+                code_lines.append(line)
+            continue
+        stripped = line.strip()
+        fence = _FENCE.match(stripped)
+        if fence:
+            close_paragraph()
+            close_list()
+            code_fence = fence.group(1)
+            continue
+        if not stripped:
+            close_paragraph()
+            close_list()
+            continue
+        heading = _HEADING.match(stripped)
+        if heading:
+            close_paragraph()
+            close_list()
+            level = len(heading.group(1))
+            parts.append(f"<h{level}>{_inline(heading.group(2))}</h{level}>\n")
+            continue
+        if _RULE.match(stripped):
+            close_paragraph()
+            close_list()
+            parts.append("<hr />\n")
+            continue
+        item = _UNORDERED.match(line)
+        tag = 'ul'
+        if item is None:
+            item = _ORDERED.match(line)
+            tag = 'ol'
+        if item is not None:
+            close_paragraph()
+            if list_tag != tag:
+                close_list()
+                parts.append(f"<{tag}>\n")
+                list_tag = tag
+            parts.append(f"<li>{_inline(item.group(1))}</li>\n")
+            continue
+        quote = _QUOTE.match(line)
+        if quote:
+            close_paragraph()
+            close_list()
+            parts.append(f"<blockquote><p>{_inline(quote.group(1))}</p></blockquote>\n")
+            continue
+        close_list()
+        paragraph.append(stripped)
+
+    if code_fence is not None:
+        parts.append(f"<pre>{html.escape(chr(10).join(code_lines))}</pre>\n")
+    close_paragraph()
+    close_list()
+    return "".join(parts)
+
+
+def html_body(document):
+    """返回 (标题, 正文片段)；没有 <title> 时标题为 None"""
+    title = _TITLE.search(document)
+    body = _BODY.search(document)
+    return (
+        html.unescape(title.group(1)).strip() or None if title else None,
+        body.group(1).strip() if body else document,
+    )
+
+
+_HEADING_TAGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+_MARKDOWN_SPECIAL = re.compile(r"([\\`*_\[\]#])")
+
+
+class _MarkdownWriter(HTMLParser):
+    """
+    编辑器 HTML → Markdown
+    Qt 用 <span style="font-weight:600"> / <span style="font-style:italic"> 表示粗体、斜体；
+    带行号的代码块 (行号列 + #f0f0f0 背景代码列的表格) 转换为围栏代码块
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lines = []
+        self.current = []
+        self.prefix = ""
+        self.lists = []
+        self.spans = []
+        self.heading = 0
+        self.pre = 0
+        self.link = None
+        self.table = None
+        self.cell = None
+
+    def _out(self, text):
+        if self.cell is not None:
+            self.cell.append(text)
+        else:
+            self.current.append(text)
+
+    def _flush(self):
+        line = "".join(self.current).rstrip()
+        self.current = []
+        if line:
+            self.lines.append(self.prefix + line)
+        elif self.lines and self.lines[-1] != "" and not self.lists:
+            # 块之间空一行，列表项之间不空行
+            self.lines.append("")
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in _HEADING_TAGS:
+            self._flush()
+            self.heading = _HEADING_TAGS[tag]
+            self.current.append("#" * self.heading + " ")
+        elif tag in ('p', 'div'):
+            if self.cell is None:
+                self._flush()
+        elif tag == 'br':
+            if self.pre or self.cell is not None:
+                self._out("\n")
+            else:
+                self._out("  ")
+                self._flush()
+        elif tag in ('ul', 'ol'):
+            self._flush()
+            self.lists.append([tag, 0])
+        elif tag == 'li':
+            self._flush()
+            kind = self.lists[-1] if self.lists else ['ul', 0]
+            kind[1] += 1
+            marker = f"{kind[1]}. " if kind[0] == 'ol' else "- "
+            self.current.append("  " * (len(self.lists) - 1) + marker)
+        elif tag == 'blockquote':
+            self._flush()
+            self.prefix += "> "
+        elif tag == 'pre':
+            if self.cell is None:
+                self._flush()
+                self.lines.append("```")
+            self.pre += 1
+        elif tag == 'hr':
+            self._flush()
+            self.lines.append("---")
+        elif tag == 'a':
+            self.link = attrs.get('href')
+            self._out("[")
+        elif tag == 'img':
+            self._out(f"![{attrs.get('alt') or ''}]({attrs.get('src', '')})")
+        elif tag == 'span':
+            style = attrs.get('style') or ""
+            marks = ""
+            if not self.heading and not self.pre and self.cell is None:
+                if re.search(r"font-weight:\s*(600|700|bold)", style):
+                    marks += "**"
+                if "font-style:italic" in style:
+                    marks += "*"
+            self.spans.append(marks)
+            self._out(marks)
+        elif tag in ('b', 'strong', 'i', 'em'):
+            self._out("**" if tag in ('b', 'strong') else "*")
+        elif tag == 'code' and not self.pre:
+            self._out("`")
+        elif tag == 'table':
+            self._flush()
+            self.table = []
+        elif tag == 'tr' and self.table is not None:
+            self.table.append([])
+        elif tag == 'td' and self.table is not None:
+            self.cell = []
+            if attrs.get('bgcolor', '').lower() == '#f0f0f0' and self.table:
+                self.table[-1].append(None)  # 代码列标记
+
+    def handle_endtag(self, tag):
+        if tag in _HEADING_TAGS:
+            self.heading = 0
+            self._flush()
+        elif tag == 'p':
+            if self.cell is None:
+                self._flush()
+        elif tag in ('ul', 'ol'):
+            self._flush()
+            if self.lists:
+                self.lists.pop()
+        elif tag == 'li':
+            self._flush()
+        elif tag == 'blockquote':
+            self._flush()
+            self.prefix = self.prefix[:-2]
+        elif tag == 'pre':
+            self.pre = max(0, self.pre - 1)
+            if self.cell is None:
+                self.lines.extend("".join(self.current).split("\n"))
+                self.current = []
+                self.lines.append("```")
+        elif tag == 'a':
+            self._out(f"]({self.link or ''})")
+            self.link = None
+        elif tag == 'span':
+            self._out(self.spans.pop()[::-1] if self.spans else "")
+        elif tag in ('b', 'strong', 'i', 'em'):
+            self._out("**" if tag in ('b', 'strong') else "*")
+        elif tag == 'code' and not self.pre:
+            self._out("`")
+        elif tag == 'td' and self.cell is not None:
+            self.table[-1].append("".join(self.cell).strip())
+            self.cell = None
+        elif tag == 'table' and self.table is not None:
+            self._write_table(self.table)
+            self.table = None
+
+    def handle_data(self, data):
+        if self.pre or self.cell is not None:
+            self._out(data)
+        else:
+            self._out(_MARKDOWN_SPECIAL.sub(r"\\\1", data.replace("\n", " ")))
+
+    def _write_table(self, rows):
+        # 带行号的代码块：每行为 [行号, None (代码列标记), 代码]
+        code = [row for row in rows if len(row) == 3 and row[0].isdigit() and row[1] is None]
+        if rows and len(code) == len(rows):
+            self.lines.append("```")
+            self.lines.extend(row[2] for row in code)
+            self.lines.append("```")
+            return
+        for row in rows:
+            cells = [cell.replace("\n", " ") for cell in row if cell is not None]
+            self.lines.append("| " + " | ".join(cells) + " |")
+
+    def result(self):
+        self._flush()
+        return "\n".join(self.lines).strip() + "\n"
+
+
+def html_to_markdown(content):
+    writer = _MarkdownWriter()
+    writer.feed(content or "")
+    writer.close()
+    return writer.result()
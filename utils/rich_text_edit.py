@@ -1,14 +1,115 @@
 from PyQt5.QtWidgets import QTextEdit
-from PyQt5.QtCore import QUrl, Qt, QMimeData
-from PyQt5.QtGui import QImage, QImageReader, QTextImageFormat, QFont, QColor, QTextCharFormat, QTextCursor
+from PyQt5.QtCore import QUrl, QMimeData, QSize, QPointF, QRectF
+from PyQt5.QtGui import QImage, QTextImageFormat, QFont, QColor, QTextCharFormat, QTextCursor, \
+    QTextDocument
 import os
-import tempfile
-import uuid
+
+from models.image_model import IMAGE_URL_SCHEME, image_key, image_url
+from utils.document_format import load_document
+from utils.image_ingest import ImageIngestor
+from utils.image_store import mime_for_format
+
+# 后台处理中的图片占位符 URL: glacier-pending:<任务号>
+PENDING_URL_SCHEME = "glacier-pending"
+
+
+_placeholder = None
+
+
+def _placeholder_image():
+    """尚无缩略图时显示的占位图，由 Qt 拉伸到图片的显示尺寸"""
+    global _placeholder
+    if _placeholder is None:
+        _placeholder = QImage(1, 1, QImage.Format_RGB32)
+        _placeholder.fill(QColor("#e8e8e8"))
+    return _placeholder
+
+
+def iter_image_fragments(document):
+    """遍历文档中的图片片段，产出 (fragment, QTextImageFormat)"""
+    block = document.begin()
+    while block.isValid():
+        it = block.begin()
+        while not it.atEnd():
+            fragment = it.fragment()
+            fmt = fragment.charFormat()
+            if fmt.isImageFormat():
+                yield fragment, fmt.toImageFormat()
+            it += 1
+        block = block.next()
+
+
+def _select_fragment(document, fragment):
+    cursor = QTextCursor(document)
+    cursor.setPosition(fragment.position())
+    cursor.setPosition(fragment.position() + fragment.length(), QTextCursor.KeepAnchor)
+    return cursor
+
+
+class NoteDocument(QTextDocument):
+    """
+    笔记文档：glacier-image: 图片从图片库解析，其余资源按 Qt 默认方式加载
+    图片都带有显示尺寸，排版时不需要解码；只有绘制到可见区域时才会加载，
+    先显示缩略图，完整图片在后台解码后替换
+    """
+
+    def __init__(self, image_store=None, parent=None):
+        super().__init__(parent)
+        self.image_store = image_store
+        # 已登记到本文档的完整图片大小，供文档缓存估算内存
+        self.loaded_image_bytes = 0
+
+    def loadResource(self, resource_type, url):
+        if resource_type == QTextDocument.ImageResource and url.scheme() == IMAGE_URL_SCHEME:
+            if self.image_store is None:
+                return None
+            key = url.path()
+            image = self.image_store.cached(key)
+            if image is None and self.image_store.async_db is None:
+                image = self.image_store.load(key)
+            if image is not None:
+                return image
+            self.image_store.request(key, self._on_image_loaded)
+            return self.image_store.thumbnail(key) or _placeholder_image()
+        return super().loadResource(resource_type, url)
+
+    def _on_image_loaded(self, key, image):
+        # 显式登记的资源优先于 loadResource 的缓存结果，随后重绘
+        self.addResource(QTextDocument.ImageResource, QUrl(image_url(key)), image)
+        self.loaded_image_bytes += image.sizeInBytes()
+        self.documentLayout().update.emit(QRectF(QPointF(0, 0), self.size()))
+
+    def apply_image_sizes(self):
+        """为缺少显示尺寸的图片 (旧笔记) 补全尺寸，避免排版时逐张解码"""
+        if self.image_store is None:
+            return
+        missing = []
+        for fragment, fmt in iter_image_fragments(self):
+            name = QUrl(fmt.name())
+            if name.scheme() == IMAGE_URL_SCHEME and (fmt.width() <= 0 or fmt.height() <= 0):
+                missing.append((fragment, fmt, name.path()))
+        if not missing:
+            return
+        sizes = self.image_store.image_sizes(key for _, _, key in missing)
+        for fragment, fmt, key in reversed(missing):
+            if key in sizes:
+                fmt.setWidth(sizes[key][0])
+                fmt.setHeight(sizes[key][1])
+                _select_fragment(self, fragment).setCharFormat(fmt)
 
 
 class RichTextEdit(QTextEdit):
     def __init__(self, parent=None):
         super().__init__(parent)
+        # 通过 set_document 换入的文档由 Python 持有，保留引用直到换出
+        self._current_document = None
+        # 图片库，未设置时插入的图片只保存在当前文档的内存中
+        self.image_store = None
+        # 插入的图片在后台解码，先插入占位符，完成后替换
+        self.image_ingestor = ImageIngestor(self)
+        self.image_ingestor.ready.connect(self._on_image_ready)
+        self.image_ingestor.failed.connect(self._on_image_failed)
+        self._pending_images = {}  # 任务号 -> 占位符所在的文档
         self.init_default_format()
         self.setAcceptDrops(True)
 
@@ -25,6 +126,32 @@ class RichTextEdit(QTextEdit):
         cursor.mergeCharFormat(fmt)
         self.setTextCursor(cursor)
 
+    def create_document(self, html):
+        """创建并解析一个可换入本编辑器的文档，不影响当前显示的文档"""
+        document = NoteDocument(self.image_store)
+        document.setDefaultFont(self.font())
+        load_document(document, html)
+        document.apply_image_sizes()
+        # 解析过程不应进入撤销栈，也不算作用户修改
+        document.clearUndoRedoStacks()
+        document.setModified(False)
+        return document
+
+    def set_image_store(self, image_store):
+        self.image_store = image_store
+        self.reset_document()
+
+    def set_document(self, document):
+        """换入已解析的文档 (含其撤销栈)，无需重新解析 HTML"""
+        self.setDocument(document)
+        self._current_document = document
+
+    def reset_document(self):
+        """
+        换入一个新的空白文档
+        不能直接 clear()，否则会清空缓存中仍被引用的文档
+        """
+        self.set_document(self.create_document(""))
 
     def dragEnterEvent(self, event):
         if event.mimeData().hasUrls():
@@ -45,25 +172,65 @@ class RichTextEdit(QTextEdit):
         if source.hasImage():
             image = source.imageData()
             if isinstance(image, QImage):
-                image = image.scaled(800, 600, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                temp_file_path = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4().hex}.jpg")
-                image.save(temp_file_path, "JPEG", quality=80)
-
-                image_format = QTextImageFormat()
-                image_format.setName(temp_file_path)
-                self.textCursor().insertImage(image_format)
+                self._insert_placeholder(*self.image_ingestor.submit_image(image))
             return
         super().insertFromMimeData(source)
 
     def insert_image(self, file_path: str):
-        image = QImage(file_path)
-        if image.isNull():
-            return
-        if image.sizeInBytes() > 3 * 1024 * 1024:
-            image = image.scaled(800, 600, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        temp_file_path = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4().hex}.jpg")
-        image.save(temp_file_path, "JPEG", quality=80)
+        """插入图片文件；解码在后台进行，先显示同尺寸的占位符"""
+        self._insert_placeholder(*self.image_ingestor.submit_file(file_path))
 
+    def _insert_placeholder(self, ticket, size):
+        if not size.isValid():
+            size = QSize(200, 150)
+        placeholder = QImage(size, QImage.Format_RGB32)
+        placeholder.fill(QColor("#e8e8e8"))
+        url = f"{PENDING_URL_SCHEME}:{ticket}"
+        document = self.document()
+        document.addResource(QTextDocument.ImageResource, QUrl(url), placeholder)
+        self._pending_images[ticket] = document
         image_format = QTextImageFormat()
-        image_format.setName(temp_file_path)
+        image_format.setName(url)
+        image_format.setWidth(size.width())
+        image_format.setHeight(size.height())
         self.textCursor().insertImage(image_format)
+
+    def _on_image_ready(self, ticket, image, data, fmt, thumb):
+        """
+        存入图片库并以 glacier-image: URL 替换占位符
+        解码结果直接登记到文档，无需再从图片库读取
+        """
+        document = self._pending_images.pop(ticket, None)
+        if document is None:
+            return
+        if self.image_store is not None:
+            key = self.image_store.store_bytes(data, mime_for_format(fmt), image.width(), image.height(), thumb)
+            self.image_store.cache.put(key, image)
+        else:
+            key = image_key(data)
+        url = image_url(key)
+        document.addResource(QTextDocument.ImageResource, QUrl(url), image)
+        for cursor, image_format in self._find_placeholders(document, ticket):
+            image_format.setName(url)
+            image_format.setWidth(image.width())
+            image_format.setHeight(image.height())
+            cursor.setCharFormat(image_format)
+
+    def _on_image_failed(self, ticket, error):
+        print(f"[insert_image] 图片解码失败: {error}")
+        document = self._pending_images.pop(ticket, None)
+        if document is None:
+            return
+        for cursor, _ in self._find_placeholders(document, ticket):
+            cursor.removeSelectedText()
+
+    @staticmethod
+    def _find_placeholders(document, ticket):
+        """返回选中各占位符的 (cursor, 图片格式)，从后往前排列，删除时不影响前面的位置"""
+        url = f"{PENDING_URL_SCHEME}:{ticket}"
+        found = [
+            (_select_fragment(document, fragment), fmt)
+            for fragment, fmt in iter_image_fragments(document)
+            if fmt.name() == url
+        ]
+        return reversed(found)
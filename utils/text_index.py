@@ -0,0 +1,87 @@
+# 全文检索相关的文本处理
+import html
+import re
+from html.parser import HTMLParser
+
+# 中日韩字符按单字切分建立索引，unicode61 分词器会把连续的 CJK 字符当作一个词
+_CJK = "぀-ヿ㐀-䶿一-鿿가-힯豈-﫿"
+_CJK_CHAR = re.compile(f"([{_CJK}])")
+_CJK_GAP = re.compile(f"([{_CJK}][\\x02\\x03]?) (?=[\\x02\\x03]?[{_CJK}])")
+_SPACES = re.compile(r"[ \t]+")
+
+# snippet() 使用的高亮标记，处理后替换为 HTML 标签
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+_BLOCK_TAGS = {'p', 'div', 'br', 'tr', 'li', 'pre', 'table', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+_SKIP_TAGS = {'head', 'style', 'script', 'title'}
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+        elif tag == 'td':
+            self.parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def html_to_text(content):
+    """从编辑器保存的 HTML 中提取纯文本；非 HTML 内容原样返回"""
+    if not content:
+        return ""
+    if "<" not in content:
+        return content
+    extractor = _TextExtractor()
+    extractor.feed(content)
+    extractor.close()
+    lines = (_SPACES.sub(" ", line).strip() for line in "".join(extractor.parts).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def segment_cjk(text):
+    """在每个 CJK 字符两侧插入空格，使其在 FTS 中成为独立词元"""
+    if not text:
+        return ""
+    return _SPACES.sub(" ", _CJK_CHAR.sub(r" \1 ", text)).strip()
+
+
+def build_match_query(query):
+    """
+    将用户输入转换为安全的 FTS5 MATCH 表达式
+    每个空白分隔的词作为短语 (CJK 按字切分后的相邻短语)，词之间为 AND，最后一个词按前缀匹配
+    输入为空时返回 None
+    """
+    terms = []
+    for word in query.split():
+        tokens = segment_cjk(word).split()
+        if tokens:
+            terms.append('"' + " ".join(tokens).replace('"', '""') + '"')
+    if not terms:
+        return None
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def format_snippet(snippet):
+    """去掉切分时插入的空格，转义后将高亮标记替换为 <b> 标签"""
+    text = _CJK_GAP.sub(r"\1", snippet or "")
+    text = text.replace(HIGHLIGHT_END + " " + HIGHLIGHT_START, " ")
+    text = html.escape(text)
+    return text.replace(HIGHLIGHT_START, "<b>").replace(HIGHLIGHT_END, "</b>")